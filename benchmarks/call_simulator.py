@@ -0,0 +1,656 @@
+"""
+End to end call simulator and latency benchmark.
+
+Runs the real AssistantManager/TaskManager pipeline (input handler, transcriber listener, LLM agent, synthesizer
+listener, output loop, pacing, marks) with every network dependency replaced by a local stand-in:
+
+* SimulatedTwilioCaller plays the Twilio media stream websocket: it streams 20 ms mu-law frames in real time (a tone,
+  or a recording given with --caller-audio), plays back whatever the agent sends on a simulated playback clock and
+  acknowledges marks when the audio before them has finished playing.
+* SimulatedTranscriber detects speech in the audio the input handler forwards and emits scripted interim and final
+  transcripts with configurable endpointing and result latency.
+* SimulatedLLM streams a response at a first token latency (optionally growing with the prompt) and token rate.
+* SimulatedSynthesizer returns mu-law audio after a fixed first byte latency.
+
+Voice to voice latency is measured on the caller side, from the last frame of the caller's utterance to the first
+frame of the agent's answer, and reported next to the per stage spans from the TurnTracer, CPU seconds and RSS per
+call and event loop lag. In ramp mode the concurrency is doubled until latency degrades, which gives the number of
+calls a single worker can carry.
+
+    python benchmarks/call_simulator.py --calls 10 --turns 5
+    python benchmarks/call_simulator.py --ramp --max-concurrency 128 --output results.json
+"""
+import os
+import time
+import json
+import uuid
+import copy
+import base64
+import random
+import asyncio
+import logging
+import argparse
+import resource
+from collections import deque
+
+import numpy as np
+
+from voiceaiagent.agent_manager import task_manager
+from voiceaiagent.agent_manager.assistant_manager import AssistantManager
+from voiceaiagent.transcriber.base_transcriber import BaseTranscriber
+from voiceaiagent.synthesizer.base_synthesizer import BaseSynthesizer
+from voiceaiagent.llms.llm import BaseLLM
+from voiceaiagent.helpers.utils import create_ws_data_packet
+from voiceaiagent.helpers.g711 import encode_ulaw, decode_ulaw
+from voiceaiagent.helpers.audio_codec import wav_to_pcm
+from voiceaiagent.helpers.loop_monitor import LoopMonitor
+
+SAMPLE_RATE = 8000
+FRAME_SECONDS = 0.02
+FRAME_BYTES = int(SAMPLE_RATE * FRAME_SECONDS)
+SILENCE_FRAME = b'\xff' * FRAME_BYTES
+SPEECH_THRESHOLD = 500  # mean absolute amplitude above which a chunk counts as speech
+
+DEFAULT_UTTERANCES = (
+    "hi I wanted to check the status of my order",
+    "it was placed last tuesday and I have not received any update",
+    "can you tell me when it will be delivered",
+    "okay and is there a way to change the delivery address",
+    "great thank you that is all I needed",
+)
+RESPONSE_TEXT = ("Sure, I can help you with that. Let me pull up the details for you. It looks like everything is on "
+                 "track and you should get an update shortly. Is there anything else you would like me to check for "
+                 "you today while we are at it?")
+
+
+class SimulationProfile:
+    """
+    Timing of the simulated caller and providers. Latencies are in ms and get +/- jitter applied per event.
+    llm_prefill_ms_per_1k_tokens adds to the first token latency with the size of the prompt (4 characters a token).
+    speculative_generation turns on the agent's speculative LLM generation on stable interim transcripts and
+    context_window_max_tokens bounds the prompt the agent sends.
+    """
+    def __init__(self, utterances=DEFAULT_UTTERANCES, words_per_second=2.5, user_pause_ms=600, response_timeout=15,
+                 transcriber_connect_ms=50, transcriber_latency_ms=150, endpointing_ms=400,
+                 llm_first_token_ms=350, llm_prefill_ms_per_1k_tokens=0, llm_tokens_per_second=50, response_words=30,
+                 tts_first_byte_ms=200, tts_seconds_per_char=0.065, jitter=0.1, seed=None,
+                 speculative_generation=False, context_window_max_tokens=None):
+        self.utterances = list(utterances)
+        self.words_per_second = words_per_second
+        self.user_pause_ms = user_pause_ms
+        self.response_timeout = response_timeout
+        self.transcriber_connect_ms = transcriber_connect_ms
+        self.transcriber_latency_ms = transcriber_latency_ms
+        self.endpointing_ms = endpointing_ms
+        self.llm_first_token_ms = llm_first_token_ms
+        self.llm_prefill_ms_per_1k_tokens = llm_prefill_ms_per_1k_tokens
+        self.llm_tokens_per_second = llm_tokens_per_second
+        self.response_words = response_words
+        self.tts_first_byte_ms = tts_first_byte_ms
+        self.tts_seconds_per_char = tts_seconds_per_char
+        self.jitter = jitter
+        self.speculative_generation = speculative_generation
+        self.context_window_max_tokens = context_window_max_tokens
+        self.rng = random.Random(seed)
+
+    def delay(self, latency_ms):
+        """latency_ms with jitter applied, in seconds."""
+        return max(latency_ms * self.rng.uniform(1 - self.jitter, 1 + self.jitter), 0) / 1000
+
+    def utterance(self, index):
+        return self.utterances[index % len(self.utterances)]
+
+    def speech_seconds(self, text):
+        return len(text.split()) / self.words_per_second
+
+
+def tone(seconds, frequency=220, amplitude=6000):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return encode_ulaw((amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)).tobytes()
+
+
+def load_caller_audio(path):
+    """Caller speech as 8 kHz mu-law: a WAV file is converted, anything else is taken to be raw mu-law."""
+    with open(path, 'rb') as audio_file:
+        data = audio_file.read()
+    if data[:4] == b'RIFF':
+        data = encode_ulaw(wav_to_pcm(data, target_sample_rate=SAMPLE_RATE)).tobytes()
+    return data
+
+
+def is_speech(mulaw_audio):
+    if not mulaw_audio:
+        return False
+    return float(np.abs(decode_ulaw(mulaw_audio).astype(np.int32)).mean()) > SPEECH_THRESHOLD
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def at(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 1)
+
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 1), "p50": at(0.5), "p90": at(0.9),
+            "p95": at(0.95), "p99": at(0.99), "max": round(ordered[-1], 1)}
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is the peak rather than the current size, but it's all there is off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+########################
+# Simulated providers
+########################
+
+class SimulatedTranscriber(BaseTranscriber):
+    """
+    Streaming transcriber driven by the audio it actually receives. A chunk above SPEECH_THRESHOLD starts an
+    utterance (the next line of the script); while speech continues interim transcripts reveal the utterance at
+    words_per_second (holding back the last word until it ends), the first silent chunk sends the complete interim and
+    endpointing_ms of silent audio later the final transcript. Every result reaches the task manager
+    transcriber_latency_ms after the audio that produced it, in order.
+    """
+    def __init__(self, telephony_provider, input_queue=None, output_queue=None, simulation=None, **kwargs):
+        super().__init__(input_queue)
+        self.provider = telephony_provider
+        self.transcriber_output_queue = output_queue
+        self.simulation = simulation or SimulationProfile()
+        self.transcription_task = None
+        self.audio_seconds = 0.0
+        self.utterances = 0
+        self.words = None
+        self.words_sent = 0
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+        self.final_sent = True
+        self.deliver_at = 0.0
+
+    def get_meta_info(self):
+        return self.meta_info
+
+    async def toggle_connection(self):
+        self.connection_on = False
+        if self.transcription_task is not None:
+            self.transcription_task.cancel()
+
+    async def run(self):
+        self.transcription_task = asyncio.create_task(self.transcribe())
+
+    def _emit(self, data):
+        loop = asyncio.get_running_loop()
+        # jitter must not reorder results
+        self.deliver_at = max(self.deliver_at, loop.time() + self.simulation.delay(self.simulation.transcriber_latency_ms))
+        loop.call_at(self.deliver_at, self.transcriber_output_queue.put_nowait, create_ws_data_packet(data, self.meta_info))
+
+    def _interim(self, words_sent):
+        self.words_sent = words_sent
+        self._emit({"type": "interim_transcript_received", "content": " ".join(self.words[:words_sent])})
+
+    def _process_chunk(self, audio):
+        duration = len(audio) / SAMPLE_RATE
+        self.audio_seconds += duration
+        if is_speech(audio):
+            if self.final_sent:
+                self.words = self.simulation.utterance(self.utterances).split()
+                self.utterances += 1
+                self.words_sent, self.speech_seconds, self.final_sent = 0, 0.0, False
+                self._emit("speech_started")
+            self.silence_seconds = 0.0
+            self.speech_seconds += duration
+            words_heard = min(int(self.speech_seconds * self.simulation.words_per_second), len(self.words) - 1)
+            if words_heard > self.words_sent:
+                self._interim(words_heard)
+        elif not self.final_sent:
+            if self.words_sent < len(self.words):
+                self._interim(len(self.words))
+            self.silence_seconds += duration
+            if self.silence_seconds * 1000 >= self.simulation.endpointing_ms:
+                self.final_sent = True
+                self._emit({"type": "transcript", "content": " ".join(self.words)})
+
+    async def transcribe(self):
+        start_time = time.perf_counter()
+        await asyncio.sleep(self.simulation.delay(self.simulation.transcriber_connect_ms))
+        self.connection_time = round((time.perf_counter() - start_time) * 1000)
+        try:
+            while True:
+                ws_data_packet = await self.input_queue.get()
+                if ws_data_packet['meta_info'].get('eos') is True:
+                    break
+                if self.meta_info is None:
+                    self.meta_info = ws_data_packet['meta_info']
+                    self.current_request_id = self.generate_request_id()
+                    self.meta_info['request_id'] = self.current_request_id
+                self._process_chunk(ws_data_packet['data'])
+        except asyncio.CancelledError:
+            return
+        meta_info = dict(self.meta_info or {}, transcriber_duration=self.audio_seconds)
+        await self.transcriber_output_queue.put(create_ws_data_packet("transcriber_connection_closed", meta_info))
+
+
+class SimulatedLLM(BaseLLM):
+    """
+    Streams response_words of canned text after llm_first_token_ms plus llm_prefill_ms_per_1k_tokens for the prompt,
+    one word per token at llm_tokens_per_second.
+    """
+    def __init__(self, max_tokens=100, buffer_size=40, model="simulated", simulation=None, **kwargs):
+        super().__init__(max_tokens, buffer_size)
+        self.model = model
+        self.simulation = simulation or SimulationProfile()
+        self.words = RESPONSE_TEXT.split()
+
+    def _response_tokens(self):
+        count = self.simulation.response_words
+        return [f" {self.words[i % len(self.words)]}" for i in range(count)]
+
+    def _first_token_ms(self, messages):
+        prompt_tokens = sum(len(message.get("content") or "") for message in messages) / 4
+        return self.simulation.llm_first_token_ms + prompt_tokens / 1000 * self.simulation.llm_prefill_ms_per_1k_tokens
+
+    async def generate_stream(self, messages, synthesize=True, request_json=False, meta_info=None):
+        start_time = time.time()
+        await asyncio.sleep(self.simulation.delay(self._first_token_ms(messages)))
+        latency_data = {
+            "turn_id": (meta_info or {}).get("turn_id"),
+            "model": self.model,
+            "first_token_latency_ms": round((time.time() - start_time) * 1000),
+            "total_stream_duration_ms": None
+        }
+        answer, buffer = "", ""
+        for i, token in enumerate(self._response_tokens()):
+            if i:
+                await asyncio.sleep(1 / self.simulation.llm_tokens_per_second)
+            answer += token
+            buffer += token
+            if synthesize and len(buffer) >= self.buffer_size:
+                split = buffer.rsplit(" ", 1)
+                yield split[0], False, latency_data, False, None, None
+                buffer = split[1] if len(split) > 1 else ""
+        latency_data["total_stream_duration_ms"] = round((time.time() - start_time) * 1000)
+        yield (buffer if synthesize else answer), True, latency_data, False, None, None
+
+    async def generate(self, messages, request_json=False, max_tokens=None):
+        await asyncio.sleep(self.simulation.delay(self._first_token_ms(messages)))
+        return json.dumps({"hangup": "No"}) if request_json else "".join(self._response_tokens()).strip()
+
+
+class SimulatedSynthesizer(BaseSynthesizer):
+    """Returns tts_seconds_per_char of mu-law audio per character of text, tts_first_byte_ms after it was pushed."""
+    def __init__(self, voice="simulated", audio_format="pcm", sampling_rate="8000", stream=False, buffer_size=40,
+                 caching=False, simulation=None, **kwargs):
+        super().__init__(kwargs.get("task_manager_instance", None), stream, buffer_size)
+        self.voice = voice
+        self.simulation = simulation or SimulationProfile()
+        self.first_chunk_generated = False
+        self.synthesized_characters = 0
+        self.audio = tone(2.0, frequency=330)
+
+    def get_synthesized_characters(self):
+        return self.synthesized_characters
+
+    def get_engine(self):
+        return "simulated"
+
+    def supports_websocket(self):
+        return False
+
+    def _audio_for(self, text):
+        length = max(int(len(text) * self.simulation.tts_seconds_per_char * SAMPLE_RATE), FRAME_BYTES)
+        repeats = length // len(self.audio) + 1
+        return (self.audio * repeats)[:length]
+
+    async def synthesize(self, text):
+        await asyncio.sleep(self.simulation.delay(self.simulation.tts_first_byte_ms))
+        return self._audio_for(text)
+
+    async def generate(self):
+        while True:
+            message = await self.internal_queue.get()
+            meta_info, text = message.get("meta_info"), message.get("data")
+            if not self.should_synthesize_response(meta_info.get('sequence_id')):
+                continue
+            audio = await self.synthesize(text)
+            self.synthesized_characters += len(text)
+            meta_info["is_first_chunk"] = not self.first_chunk_generated
+            self.first_chunk_generated = True
+            if meta_info.get("end_of_llm_stream"):
+                meta_info["end_of_synthesizer_stream"] = True
+                self.first_chunk_generated = False
+            meta_info['text'] = text
+            meta_info['format'] = 'mulaw'
+            meta_info["text_synthesized"] = f"{text} "
+            meta_info["mark_id"] = str(uuid.uuid4())
+            yield create_ws_data_packet(audio, meta_info)
+
+    async def push(self, message):
+        self.internal_queue.put_nowait(copy.deepcopy(message))
+
+
+def register_simulated_providers():
+    """Makes the stand-ins selectable as provider "simulated" in the registries the task manager looks up."""
+    task_manager.SUPPORTED_TRANSCRIBER_PROVIDERS["simulated"] = SimulatedTranscriber
+    task_manager.SUPPORTED_SYNTHESIZER_MODELS["simulated"] = SimulatedSynthesizer
+    task_manager.SUPPORTED_LLM_PROVIDERS["simulated"] = SimulatedLLM
+
+
+def build_agent_config(profile):
+    return {
+        "agent_name": "call_simulator",
+        "agent_welcome_message": "Hello, thanks for calling. How can I help you today?",
+        "tasks": [{
+            "task_type": "conversation",
+            "toolchain": {"execution": "parallel", "pipelines": [["transcriber", "llm", "synthesizer"]]},
+            "tools_config": {
+                "input": {"provider": "twilio", "format": "wav"},
+                "output": {"provider": "twilio", "format": "wav"},
+                "transcriber": {"provider": "simulated", "model": "simulated", "language": "en", "stream": True,
+                                "endpointing": profile.endpointing_ms, "sampling_rate": SAMPLE_RATE,
+                                "encoding": "mulaw"},
+                "synthesizer": {"provider": "simulated", "provider_config": {"voice": "simulated"}, "stream": True,
+                                "buffer_size": 40, "audio_format": "pcm", "caching": False},
+                "llm_agent": {"agent_type": "simple_llm_agent", "agent_flow_type": "streaming",
+                              "llm_config": {"provider": "simulated", "model": "simulated", "max_tokens": 100}},
+                "api_tools": None
+            },
+            "task_config": {"optimize_latency": True, "hangup_after_silence": 60, "incremental_delay": 900,
+                            "number_of_words_for_interruption": 1, "check_if_user_online": False,
+                            "trigger_user_online_message_after": 60,
+                            "speculative_generation": profile.speculative_generation,
+                            "context_window_max_tokens": profile.context_window_max_tokens}
+        }]
+    }
+
+
+PROMPT_RESPONSES = {"task_1": {"system_prompt": "You are a helpful customer support agent."}}
+
+
+########################
+# Simulated caller
+########################
+
+class SimulatedTwilioCaller:
+    """
+    The websocket handed to the task manager. receive_text()/send_text() are the server's side of it; run() is the
+    caller. Agent audio is "played" on a clock that advances by the duration of every media message, and each mark is
+    acknowledged once the clock passes the audio sent before it, like Twilio does. The caller waits for the agent to
+    finish speaking (and user_pause_ms more) before saying the next utterance.
+    """
+    def __init__(self, profile, speech_frames, turns):
+        self.profile = profile
+        self.speech_frames = speech_frames
+        self.turns = turns
+        self.stream_sid = str(uuid.uuid4())
+        self._to_server = asyncio.Queue()
+        self.playback_end = 0.0
+        self.pending_marks = deque()
+        self.awaiting_agent = True
+        self.awaiting_since = None
+        self.utterance_ended_at = None
+        self.idle_since = None
+        self.voice_to_voice_ms = []
+        self.missed_responses = 0
+        self.agent_audio_seconds = 0.0
+        self.closed = False
+
+    # Server side
+
+    async def receive_text(self):
+        return await self._to_server.get()
+
+    async def send_text(self, message):
+        packet = json.loads(message)
+        event = packet.get("event")
+        now = time.perf_counter()
+        if event == "media":
+            duration = len(base64.b64decode(packet["media"]["payload"])) / SAMPLE_RATE
+            if self.utterance_ended_at is not None:
+                self.voice_to_voice_ms.append((now - self.utterance_ended_at) * 1000)
+                self.utterance_ended_at = None
+            self.awaiting_agent = False
+            self.agent_audio_seconds += duration
+            self.playback_end = max(self.playback_end, now) + duration
+        elif event == "mark":
+            self.pending_marks.append((self.playback_end, packet["mark"]["name"]))
+        elif event == "clear":
+            self.pending_marks.clear()
+            self.playback_end = now
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def close(self):
+        self.closed = True
+
+    # Caller side
+
+    def _send(self, packet):
+        self._to_server.put_nowait(json.dumps(packet))
+
+    def _send_frame(self, payload, timestamp_ms, chunk):
+        self._send({"event": "media", "streamSid": self.stream_sid,
+                    "media": {"track": "inbound", "chunk": str(chunk), "timestamp": str(timestamp_ms),
+                              "payload": payload}})
+
+    def _acknowledge_played_marks(self, now):
+        while self.pending_marks and self.pending_marks[0][0] <= now:
+            _, name = self.pending_marks.popleft()
+            self._send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+
+    def _agent_idle_for(self, now):
+        if self.awaiting_agent or self.pending_marks or self.playback_end > now:
+            self.idle_since = None
+            return 0.0
+        if self.idle_since is None:
+            self.idle_since = now
+        return now - self.idle_since
+
+    async def run(self):
+        silence = base64.b64encode(SILENCE_FRAME).decode()
+        self._send({"event": "start", "streamSid": self.stream_sid,
+                    "start": {"callSid": str(uuid.uuid4()), "streamSid": self.stream_sid}})
+        started = next_tick = time.perf_counter()
+        self.awaiting_since = started
+        turns_done, speech_left, speech_offset, chunk = 0, 0, 0, 0
+        while not self.closed:
+            now = time.perf_counter()
+            self._acknowledge_played_marks(now)
+            chunk += 1
+            timestamp_ms = int((now - started) * 1000)
+            if speech_left:
+                self._send_frame(self.speech_frames[speech_offset % len(self.speech_frames)], timestamp_ms, chunk)
+                speech_offset += 1
+                speech_left -= 1
+                if not speech_left:
+                    self.utterance_ended_at = time.perf_counter()
+                    self.awaiting_agent, self.awaiting_since = True, self.utterance_ended_at
+                    turns_done += 1
+            else:
+                self._send_frame(silence, timestamp_ms, chunk)
+                if self.awaiting_agent and now - self.awaiting_since > self.profile.response_timeout:
+                    self.missed_responses += 1
+                    self.awaiting_agent, self.utterance_ended_at = False, None
+                if self._agent_idle_for(now) * 1000 >= self.profile.user_pause_ms:
+                    if turns_done == self.turns:
+                        break
+                    text = self.profile.utterance(turns_done)
+                    speech_left = max(int(self.profile.speech_seconds(text) / FRAME_SECONDS), 1)
+            next_tick += FRAME_SECONDS
+            await asyncio.sleep(max(next_tick - time.perf_counter(), 0))
+        self._send({"event": "stop", "streamSid": self.stream_sid})
+
+
+########################
+# Runner
+########################
+
+async def simulate_call(profile, speech_frames, turns):
+    caller = SimulatedTwilioCaller(profile, speech_frames, turns)
+    assistant_manager = AssistantManager(build_agent_config(profile), ws=caller, assistant_id="call_simulator",
+                                         prompt_responses=PROMPT_RESPONSES, simulation=profile)
+    caller_task = asyncio.create_task(caller.run())
+    output = None
+    try:
+        async for task_id, task_output in assistant_manager.run(local=True):
+            if task_id == 0:
+                output = task_output
+    finally:
+        caller.closed = True
+        await caller_task
+    return caller, output
+
+
+async def sample_rss(samples, interval=0.25):
+    while True:
+        samples.append(current_rss_bytes())
+        await asyncio.sleep(interval)
+
+
+async def run_step(profile, speech_frames, concurrency, turns, stagger):
+    loop_monitor = LoopMonitor().start()
+    rss_samples = [current_rss_bytes()]
+    rss_task = asyncio.create_task(sample_rss(rss_samples))
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+    async def staggered(index):
+        await asyncio.sleep(index * stagger)
+        return await simulate_call(profile, speech_frames, turns)
+
+    results = await asyncio.gather(*[staggered(i) for i in range(concurrency)], return_exceptions=True)
+    cpu_seconds, wall_seconds = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    rss_task.cancel()
+    await loop_monitor.stop()
+
+    voice_to_voice, spans, failed_calls, missed = [], {}, 0, 0
+    for result in results:
+        if isinstance(result, BaseException):
+            logging.error(f"Simulated call failed: {result!r}")
+            failed_calls += 1
+            continue
+        caller, output = result
+        voice_to_voice.extend(caller.voice_to_voice_ms)
+        missed += caller.missed_responses
+        for turn in (output or {}).get("latency_dict", {}).get("turn_timeline", []):
+            for name, span in turn["spans"].items():
+                if span["duration_ms"] is not None:
+                    spans.setdefault(name, []).append(span["duration_ms"])
+            first_audio = turn["spans"].get("first_audio_sent")
+            if first_audio and first_audio["duration_ms"] is not None:
+                spans.setdefault("voice_to_voice", []).append(first_audio["start_ms"] + first_audio["duration_ms"])
+
+    completed = concurrency - failed_calls
+    return {
+        "concurrency": concurrency,
+        "completed_calls": completed,
+        "failed_calls": failed_calls,
+        "missed_responses": missed,
+        "wall_seconds": round(wall_seconds, 2),
+        "voice_to_voice_ms": percentiles(voice_to_voice),
+        "server_spans_ms": {name: percentiles(values) for name, values in spans.items()},
+        "cpu_seconds_per_call": round(cpu_seconds / completed, 3) if completed else None,
+        "cpu_utilization": round(cpu_seconds / wall_seconds, 3),
+        "rss_mb_per_call": round((max(rss_samples) - rss_samples[0]) / concurrency / 2 ** 20, 2),
+        "peak_rss_mb": round(max(rss_samples) / 2 ** 20, 1),
+        "event_loop": {key: value for key, value in loop_monitor.get_stats().items() if key != "recent_slow_callbacks"}
+    }
+
+
+def is_degraded(step, baseline_p95, degradation, latency_budget_ms):
+    if step["failed_calls"] or step["missed_responses"] or step["voice_to_voice_ms"] is None:
+        return True
+    p95 = step["voice_to_voice_ms"]["p95"]
+    if latency_budget_ms is not None and p95 > latency_budget_ms:
+        return True
+    return p95 > baseline_p95 * (1 + degradation)
+
+
+def print_step(step):
+    v2v = step["voice_to_voice_ms"] or {}
+    print(f"concurrency {step['concurrency']:>4}  voice-to-voice p50 {v2v.get('p50')} p95 {v2v.get('p95')} "
+          f"p99 {v2v.get('p99')} ms  cpu/call {step['cpu_seconds_per_call']} s  rss/call {step['rss_mb_per_call']} MB  "
+          f"loop lag p99 {step['event_loop']['lag_p99_ms']} ms  failed {step['failed_calls']}  "
+          f"missed {step['missed_responses']}")
+
+
+async def main(args):
+    register_simulated_providers()
+    profile = SimulationProfile(words_per_second=args.words_per_second, user_pause_ms=args.user_pause_ms,
+                                transcriber_latency_ms=args.transcriber_latency_ms, endpointing_ms=args.endpointing_ms,
+                                llm_first_token_ms=args.llm_first_token_ms,
+                                llm_prefill_ms_per_1k_tokens=args.llm_prefill_ms_per_1k_tokens,
+                                llm_tokens_per_second=args.llm_tokens_per_second, response_words=args.response_words,
+                                tts_first_byte_ms=args.tts_first_byte_ms, jitter=args.jitter, seed=args.seed,
+                                speculative_generation=args.speculative,
+                                context_window_max_tokens=args.context_window_max_tokens)
+    caller_audio = load_caller_audio(args.caller_audio) if args.caller_audio else tone(1.0)
+    speech_frames = [base64.b64encode(caller_audio[i:i + FRAME_BYTES]).decode()
+                     for i in range(0, len(caller_audio) - FRAME_BYTES + 1, FRAME_BYTES)]
+
+    report = {"profile": {key: value for key, value in vars(profile).items() if key != "rng"}, "steps": []}
+    if not args.ramp:
+        step = await run_step(profile, speech_frames, args.calls, args.turns, args.stagger)
+        report["steps"].append(step)
+        print_step(step)
+    else:
+        concurrency, baseline_p95, max_ok = 1, None, None
+        while concurrency <= args.max_concurrency:
+            step = await run_step(profile, speech_frames, concurrency, args.turns, args.stagger)
+            report["steps"].append(step)
+            print_step(step)
+            if baseline_p95 is None and step["voice_to_voice_ms"] is not None:
+                baseline_p95 = step["voice_to_voice_ms"]["p95"]
+                report["baseline_p95_ms"] = baseline_p95
+            if baseline_p95 is None or is_degraded(step, baseline_p95, args.degradation, args.latency_budget_ms):
+                break
+            max_ok = concurrency
+            concurrency *= 2
+        report["max_concurrency_before_degradation"] = max_ok
+        print(f"max concurrency before voice-to-voice p95 degraded by more than {args.degradation:.0%}: {max_ok}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated end to end calls through TaskManager")
+    parser.add_argument("--calls", type=int, default=1, help="concurrent calls (ignored with --ramp)")
+    parser.add_argument("--turns", type=int, default=5, help="caller utterances per call")
+    parser.add_argument("--ramp", action="store_true", help="double concurrency until latency degrades")
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    parser.add_argument("--degradation", type=float, default=0.25,
+                        help="allowed p95 voice-to-voice increase over concurrency 1 before a step counts as degraded")
+    parser.add_argument("--latency-budget-ms", type=float, default=None, help="absolute p95 voice-to-voice limit")
+    parser.add_argument("--stagger", type=float, default=0.05, help="seconds between call starts within a step")
+    parser.add_argument("--caller-audio", default=None, help="WAV or raw 8 kHz mu-law file used as caller speech")
+    parser.add_argument("--words-per-second", type=float, default=2.5)
+    parser.add_argument("--user-pause-ms", type=float, default=600)
+    parser.add_argument("--transcriber-latency-ms", type=float, default=150)
+    parser.add_argument("--endpointing-ms", type=int, default=400)
+    parser.add_argument("--llm-first-token-ms", type=float, default=350)
+    parser.add_argument("--llm-prefill-ms-per-1k-tokens", type=float, default=0,
+                        help="first token latency added per 1000 prompt tokens")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=50)
+    parser.add_argument("--response-words", type=int, default=30)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=200)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--speculative", action="store_true",
+                        help="start LLM generation on stable interim transcripts before the final one")
+    parser.add_argument("--context-window-max-tokens", type=int, default=None,
+                        help="prompt token budget of the agent, older turns get summarized")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="library log level; production runs at INFO, pass INFO to include its cost")
+    parser.add_argument("--output", default=None, help="write the full report as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    # StreamingContextualAgent always builds an OpenAI client for hangup checks, which wants a key even if unused
+    os.environ.setdefault("OPENAI_API_KEY", "simulated")
+    asyncio.run(main(args))
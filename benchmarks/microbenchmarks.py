@@ -0,0 +1,267 @@
+"""
+Microbenchmarks for the helpers that run once per audio frame, synthesizer chunk or logged event.
+
+Every case is timed in a calibrated loop (enough iterations for --min-time seconds), repeated --repeats times, and
+reported as ns per call (median and best of the repeats). Results are printed as a table and can be written as JSON;
+with --compare they are checked against a stored baseline and the run fails if any case got slower than the
+baseline by more than --tolerance. Baselines are only comparable on the same machine and Python version, so
+regenerate benchmarks/baseline.json with --save-baseline on the reference machine before relying on it.
+
+    python benchmarks/microbenchmarks.py
+    python benchmarks/microbenchmarks.py --filter resample --output results.json
+    python benchmarks/microbenchmarks.py --compare benchmarks/baseline.json --tolerance 0.2
+    python benchmarks/microbenchmarks.py --save-baseline benchmarks/baseline.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import inspect
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+
+import numpy as np
+from pydub import AudioSegment
+
+# request logs are buffered per run and flushed from a background task; keep whatever reaches disk out of the tree
+os.environ.setdefault("REQUEST_LOG_DIR", tempfile.mkdtemp(prefix="microbenchmarks_"))
+
+from voiceaiagent.helpers.utils import (create_ws_data_packet, resample, convert_audio_to_wav, wav_bytes_to_pcm,
+                                        pcm_to_wav_bytes, raw_to_mulaw, yield_chunks_from_memory,
+                                        convert_to_request_log)
+from voiceaiagent.helpers.mark_event_meta_data import MarkEventMetaData
+from voiceaiagent.helpers.conversation_history import ConversationHistory
+from voiceaiagent.synthesizer.base_synthesizer import BaseSynthesizer
+from voiceaiagent.output_handlers.telephony_providers.twilio import TwilioOutputHandler
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+LLM_RESPONSE = ("Sure, I can help you with that. Your order was shipped on Tuesday and should reach you within two "
+                "to three business days; you'll get a tracking link by SMS (and email) once it's out for delivery. "
+                "Is there anything else I can do for you today?")
+
+
+def tone(seconds, sample_rate, frequency=220, amplitude=6000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16).tobytes()
+
+
+def meta_info():
+    """The meta_info of a synthesizer chunk in the middle of a turn, roughly as TaskManager builds it."""
+    return {"io": "twilio", "request_id": "0b6f7c6e-3d1a-4a4e-9b8e-2f9a3c1d5e7f", "sequence_id": 3, "turn_id": 2,
+            "stream_sid": "MZ18ad3ab5a668481ce02b83e7395059f0", "format": "mulaw", "text": "Sure, I can help",
+            "is_first_chunk": False, "end_of_llm_stream": False, "cached": False, "message_category": "agent_response",
+            "synthesizer_start_time": 1718000000.123, "llm_latency": 0.412, "text_synthesized": "Sure, I can help ",
+            "mark_id": "5e2b0d4c-1f3a-4e5b-8c7d-9a0b1c2d3e4f", "origin_time": 1718000000.0}
+
+
+def conversation_history(turns):
+    """A system prompt followed by turns user/assistant pairs, every fifth turn going through a tool call."""
+    history = ConversationHistory([{"role": "system", "content": "You are a helpful customer support agent. " * 40}])
+    for turn in range(turns):
+        history.append({"role": "user", "content": "I wanted to check the status of my order please"})
+        if turn % 5 == 4:
+            history.append({"role": "assistant", "content": None, "tool_calls": [
+                {"id": f"call_{turn}", "type": "function",
+                 "function": {"name": "get_order_status", "arguments": '{"order_id": "A1234"}'}}]})
+            history.append({"role": "tool", "tool_call_id": f"call_{turn}",
+                            "content": '{"status": "shipped", "eta_days": 2, "carrier": "ups"}'})
+        history.append({"role": "assistant", "content": LLM_RESPONSE})
+    return history
+
+
+class Case:
+    def __init__(self, name, func, description):
+        self.name = name
+        self.func = func
+        self.description = description
+        self.is_async = inspect.iscoroutinefunction(func)
+
+
+def build_cases():
+    wav_24k_200ms = pcm_to_wav_bytes(tone(0.2, 24000), sample_rate=24000)
+    wav_16k_1s = pcm_to_wav_bytes(tone(1.0, 16000), sample_rate=16000)
+    pcm_16k_1s = tone(1.0, 16000)
+    pcm_8k_20ms = tone(0.02, 8000)
+    pcm_8k_1s = tone(1.0, 8000)
+    mulaw_8k_1s = raw_to_mulaw(pcm_8k_1s).tobytes()
+    chunk_meta_info = meta_info()
+    synthesizer = BaseSynthesizer(stream=False)
+    marks = MarkEventMetaData()
+    output_handler = TwilioOutputHandler(mark_event_meta_data=marks)
+    output_handler.stream_sid = chunk_meta_info["stream_sid"]
+    request_meta_info = dict(chunk_meta_info, synthesizer_latency=0.231)
+    history = conversation_history(30)
+    mark_value = {"text_synthesized": "Sure, I can help ", "type": "agent_response", "is_first_chunk": False,
+                  "is_final_chunk": False, "sequence_id": 3, "duration": 0.8}
+
+    def mark_round_trip():
+        marks.update_data("5e2b0d4c-1f3a-4e5b-8c7d-9a0b1c2d3e4f", dict(mark_value))
+        marks.fetch_data("5e2b0d4c-1f3a-4e5b-8c7d-9a0b1c2d3e4f")
+
+    def conversation_turn():
+        # what TaskManager does with the history for one LLM request
+        messages = history.snapshot()
+        messages.append({"role": "assistant", "content": LLM_RESPONSE})
+        return list(messages)
+
+    async def form_media_message_mulaw():
+        await output_handler.form_media_message(pcm_8k_20ms[:160], audio_format="mulaw")
+
+    async def form_media_message_pcm():
+        await output_handler.form_media_message(pcm_8k_20ms, audio_format="wav")
+
+    cases = [
+        Case("create_ws_data_packet", lambda: create_ws_data_packet(pcm_8k_20ms, chunk_meta_info),
+             "20 ms frame with a 17 key meta_info"),
+        Case("create_ws_data_packet_no_meta", lambda: create_ws_data_packet("speech_started", None),
+             "event packet without meta_info"),
+        Case("resample_wav_24k_to_8k", lambda: resample(wav_24k_200ms, 8000, format="wav"),
+             "200 ms TTS chunk"),
+        Case("convert_audio_to_wav_wav", lambda: convert_audio_to_wav(wav_16k_1s, source_format="wav"),
+             "1 s WAV, in memory fast path"),
+        Case("wav_bytes_to_pcm", lambda: wav_bytes_to_pcm(wav_16k_1s), "1 s 16 kHz WAV"),
+        Case("pcm_to_wav_bytes", lambda: pcm_to_wav_bytes(pcm_16k_1s, sample_rate=16000), "1 s 16 kHz PCM"),
+        Case("raw_to_mulaw_20ms", lambda: raw_to_mulaw(pcm_8k_20ms), "20 ms 8 kHz frame"),
+        Case("raw_to_mulaw_1s", lambda: raw_to_mulaw(pcm_8k_1s), "1 s 8 kHz"),
+        Case("yield_chunks_from_memory", lambda: list(yield_chunks_from_memory(mulaw_8k_1s, chunk_size=160)),
+             "1 s mu-law into 20 ms chunks"),
+        Case("text_chunker", lambda: list(synthesizer.text_chunker(LLM_RESPONSE)),
+             f"{len(LLM_RESPONSE)} character LLM response"),
+        Case("mark_event_update_fetch", mark_round_trip, "update_data + fetch_data of one mark"),
+        Case("form_media_message_mulaw", form_media_message_mulaw, "20 ms mu-law frame"),
+        Case("form_media_message_pcm", form_media_message_pcm, "20 ms PCM frame, converted to mu-law"),
+        Case("convert_to_request_log", lambda: convert_to_request_log("Sure, I can help", request_meta_info,
+                                                                      "sonic-english", component="synthesizer",
+                                                                      run_id="microbenchmarks"),
+             "synthesizer response log, buffered"),
+        Case("conversation_history_turn", conversation_turn, f"{len(history)} message history, snapshot to request"),
+    ]
+    if shutil.which("ffmpeg"):
+        # compressed input goes through pydub/ffmpeg; only measurable where ffmpeg is installed
+        flac_1s = encode_with_ffmpeg(wav_16k_1s, "flac")
+        cases.append(Case("convert_audio_to_wav_flac", lambda: convert_audio_to_wav(flac_1s, source_format="flac"),
+                          "1 s FLAC, decoded with ffmpeg"))
+    return cases
+
+
+def encode_with_ffmpeg(wav_bytes, audio_format):
+    output = io.BytesIO()
+    AudioSegment.from_file(io.BytesIO(wav_bytes), format="wav").export(output, format=audio_format)
+    return output.getvalue()
+
+
+async def time_case(case, number):
+    func = case.func
+    if case.is_async:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            await func()
+        return time.perf_counter_ns() - start
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        func()
+    return time.perf_counter_ns() - start
+
+
+async def measure(case, repeats, min_time):
+    """Doubles the iteration count until one run takes min_time, then times repeats runs of that many calls."""
+    number = 1
+    while True:
+        elapsed = await time_case(case, number)
+        if elapsed >= min_time * 1e9 or number >= 10 ** 7:
+            break
+        number *= 2
+    timings = [await time_case(case, number) / number for _ in range(repeats)]
+    return {"ns_per_op": round(statistics.median(timings), 1), "ns_per_op_min": round(min(timings), 1),
+            "ops_per_second": round(1e9 / statistics.median(timings), 1), "iterations": number, "repeats": repeats,
+            "description": case.description}
+
+
+async def run_benchmarks(args):
+    results = {}
+    for case in build_cases():
+        if args.filter and not any(pattern in case.name for pattern in args.filter):
+            continue
+        results[case.name] = await measure(case, args.repeats, args.min_time)
+        # let the request log writer flush between cases so its backlog doesn't bleed into the next measurement
+        await asyncio.sleep(0)
+    return results
+
+
+def environment():
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "numpy": np.__version__, "machine": platform.machine(), "system": platform.system(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count(), "time": round(time.time())}
+
+
+def compare(results, baseline, tolerance):
+    """Ratio of every case to the baseline; a case regresses when it is more than tolerance slower."""
+    comparison, regressions = {}, []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        ratio = result["ns_per_op"] / reference["ns_per_op"]
+        comparison[name] = {"baseline_ns_per_op": reference["ns_per_op"], "ratio": round(ratio, 3)}
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return comparison, regressions
+
+
+def print_table(results, comparison):
+    print(f"{'case':34} {'ns/op':>12} {'best ns/op':>12} {'ops/s':>14} {'vs baseline':>12}")
+    for name, result in results.items():
+        ratio = comparison.get(name, {}).get("ratio")
+        print(f"{name:34} {result['ns_per_op']:>12,.0f} {result['ns_per_op_min']:>12,.0f} "
+              f"{result['ops_per_second']:>14,.0f} {f'{ratio:.2f}x' if ratio else '-':>12}")
+
+
+def main(args):
+    results = asyncio.run(run_benchmarks(args))
+    report = {"environment": environment(), "results": results}
+    comparison, regressions = {}, []
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        comparison, regressions = compare(results, baseline, args.tolerance)
+        report.update(baseline_environment=baseline.get("environment"), comparison=comparison,
+                      regressions=regressions)
+        if baseline.get("environment", {}).get("python") != report["environment"]["python"]:
+            print("warning: baseline was recorded on a different Python version", file=sys.stderr)
+
+    print_table(results, comparison)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({"environment": report["environment"], "results": results}, baseline_file, indent=2)
+    if regressions:
+        print(f"regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks for per frame/chunk helpers")
+    parser.add_argument("--filter", nargs="*", default=None, help="only run cases whose name contains one of these")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds each timed run should take at least")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, default=None,
+                        help="baseline JSON to compare against (benchmarks/baseline.json if no path is given)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case counts as regressed")
+    parser.add_argument("--save-baseline", default=None, help="write the results as a new baseline")
+    parser.add_argument("--output", default=None, help="write results (and the comparison) as JSON")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="library log level; production runs at INFO, pass INFO to include its cost")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    sys.exit(main(args))
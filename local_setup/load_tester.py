@@ -0,0 +1,475 @@
+"""
+Load tester for the /chat/v1/{agent_id} websocket of quickstart_server.
+
+Opens N concurrent sessions, each behaving like a caller: it streams 20 ms audio frames in real time (a tone while
+"speaking", silence otherwise), plays back the agent's audio on a simulated clock, acknowledges marks once the audio
+before them has played, and speaks again when the agent has been quiet for --pause-seconds. Two protocols are spoken:
+
+* default: {"type": "audio", "data": <base64 16 kHz PCM>} in, audio/mark/clear JSON messages out, like
+  quickstart_client.py
+* twilio: connected/start/media/mark/stop media stream events with 8 kHz mu-law payloads
+
+The agent's input provider has to match the protocol. Without real providers, point the server at
+local_setup/provider_emulators, whose transcriber picks up the tone as speech.
+
+Per reporting window it measures:
+
+* frame send jitter: how late each frame left the client compared to its 20 ms schedule
+* websocket ping round trip: time from acknowledging a mark to the pong of a websocket ping sent right behind it. The
+  pong is answered by the server's websocket layer, not the agent, so this is how long the server's event loop takes
+  to get back to the connection, not a round trip through the mark handling
+* mark ack delay: how much audio the server had queued ahead of playback when the mark arrived
+* first audio latency: connect to first agent audio (welcome message) and end of utterance to first agent audio
+* server CPU and RSS, read from /proc for --server-pid, and event loop lag from the server's /metrics/loop
+
+Modes:
+
+    python local_setup/load_tester.py --agent-id <id> --sessions 20 --duration 120
+    python local_setup/load_tester.py --agent-id <id> --protocol twilio --ramp --start-sessions 5 --step 5
+    python local_setup/load_tester.py --agent-id <id> --soak --sessions 50 --duration 3600 --server-pid 1234
+"""
+import os
+import time
+import json
+import uuid
+import base64
+import asyncio
+import logging
+import argparse
+from collections import deque
+
+import aiohttp
+import numpy as np
+import websockets
+from dotenv import load_dotenv
+
+from voiceaiagent.helpers.g711 import encode_ulaw
+from voiceaiagent.helpers.audio_codec import is_wav, parse_wav_header
+
+load_dotenv()
+
+FRAME_SECONDS = 0.02
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def tone_frames(sample_rate, mulaw, frequency=220, amplitude=6000):
+    """One second of tone cut into 20 ms frames, encoded for the protocol."""
+    t = np.arange(sample_rate) / sample_rate
+    pcm = (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+    audio = encode_ulaw(pcm).tobytes() if mulaw else pcm.tobytes()
+    frame_bytes = len(audio) // int(1 / FRAME_SECONDS)
+    return [base64.b64encode(audio[i:i + frame_bytes]).decode() for i in range(0, len(audio), frame_bytes)]
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 1)
+
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 1), "count": len(ordered)}
+
+
+class LoadWindow:
+    """Samples recorded by every session during one reporting window."""
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.send_lateness_ms = []
+        self.ws_ping_rtt_ms = []
+        self.mark_ack_delay_ms = []
+        self.welcome_latency_ms = []
+        self.response_latency_ms = []
+        self.connect_ms = []
+        self.frames_sent = 0
+        self.marks_acked = 0
+        self.missed_responses = 0
+        self.sessions_started = 0
+        self.sessions_ended = 0
+        self.errors = 0
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at
+        return {"seconds": round(elapsed, 1), "frames_per_second": round(self.frames_sent / elapsed, 1) if elapsed else None,
+                "send_lateness_ms": percentiles(self.send_lateness_ms), "ws_ping_rtt_ms": percentiles(self.ws_ping_rtt_ms),
+                "mark_ack_delay_ms": percentiles(self.mark_ack_delay_ms),
+                "welcome_latency_ms": percentiles(self.welcome_latency_ms),
+                "response_latency_ms": percentiles(self.response_latency_ms),
+                "connect_ms": percentiles(self.connect_ms), "marks_acked": self.marks_acked,
+                "missed_responses": self.missed_responses, "sessions_started": self.sessions_started,
+                "sessions_ended": self.sessions_ended, "errors": self.errors}
+
+
+class LoadTestSession:
+    """
+    One simulated caller. The sender ticks every 20 ms against an absolute schedule so a slow tick is recorded as
+    lateness instead of silently shifting every later frame; the receiver keeps the playback clock and the marks
+    waiting for it.
+    """
+    def __init__(self, tester, protocol):
+        self.tester = tester
+        self.protocol = protocol
+        self.args = tester.args
+        self.twilio = protocol == "twilio"
+        self.stream_sid = str(uuid.uuid4())
+        self.frames = tester.speech_frames[protocol]
+        self.silence = tester.silence_frames[protocol]
+        self.ws = None
+        self.connected_at = None
+        self.playback_end = 0.0
+        self.pending_marks = deque()
+        self.received_audio = False
+        self.awaiting_since = None
+        self.utterance_ended_at = None
+        self.idle_since = None
+        self.sequence_number = 0
+        self.closed = False
+        self.ping_tasks = set()
+
+    @property
+    def window(self):
+        return self.tester.window
+
+    def _output_seconds(self, audio):
+        if self.twilio:
+            return len(audio) / 8000
+        if is_wav(audio):
+            info = parse_wav_header(audio)
+            return info.data_length / (info.sample_rate * info.sample_width * info.num_channels)
+        return len(audio) / (self.args.output_sample_rate * 2)
+
+    async def _send(self, packet):
+        if self.twilio:
+            self.sequence_number += 1
+            packet = dict(packet, sequenceNumber=str(self.sequence_number), streamSid=self.stream_sid)
+        await self.ws.send(json.dumps(packet))
+
+    async def _send_frame(self, payload, timestamp_ms, chunk):
+        if self.twilio:
+            await self._send({"event": "media", "media": {"track": "inbound", "chunk": str(chunk),
+                                                          "timestamp": str(timestamp_ms), "payload": payload}})
+        else:
+            await self._send({"type": "audio", "data": payload})
+        self.window.frames_sent += 1
+
+    async def _acknowledge_mark(self, name, received_at):
+        if self.twilio:
+            await self._send({"event": "mark", "mark": {"name": name}})
+        else:
+            await self._send({"type": "mark", "name": name})
+        self.window.marks_acked += 1
+        self.window.mark_ack_delay_ms.append((time.perf_counter() - received_at) * 1000)
+        if self.window.marks_acked % self.args.ws_ping_every == 0:
+            ping_task = asyncio.create_task(self._measure_ws_ping_rtt())
+            self.ping_tasks.add(ping_task)
+            ping_task.add_done_callback(self.ping_tasks.discard)
+
+    async def _measure_ws_ping_rtt(self):
+        try:
+            sent_at = time.perf_counter()
+            pong_waiter = await self.ws.ping()
+            await asyncio.wait_for(pong_waiter, self.args.response_timeout)
+            self.window.ws_ping_rtt_ms.append((time.perf_counter() - sent_at) * 1000)
+        except Exception:
+            pass
+
+    def _on_audio(self, audio, now):
+        if not self.received_audio:
+            self.received_audio = True
+            self.window.welcome_latency_ms.append((now - self.connected_at) * 1000)
+        if self.utterance_ended_at is not None:
+            self.window.response_latency_ms.append((now - self.utterance_ended_at) * 1000)
+            self.utterance_ended_at = None
+            self.awaiting_since = None
+        self.playback_end = max(self.playback_end, now) + self._output_seconds(audio)
+
+    async def receiver(self):
+        async for message in self.ws:
+            packet = json.loads(message)
+            now = time.perf_counter()
+            kind = packet.get("event") if self.twilio else packet.get("type")
+            if kind == "media":
+                self._on_audio(base64.b64decode(packet["media"]["payload"]), now)
+            elif kind == "audio" and packet.get("data"):
+                self._on_audio(base64.b64decode(packet["data"]), now)
+            elif kind == "mark":
+                name = packet["mark"]["name"] if self.twilio else packet["name"]
+                self.pending_marks.append((self.playback_end, name, now))
+            elif kind == "clear":
+                self.pending_marks.clear()
+                self.playback_end = now
+
+    def _agent_idle_for(self, now):
+        if self.utterance_ended_at is not None or self.pending_marks or self.playback_end > now:
+            self.idle_since = None
+            return 0.0
+        if self.idle_since is None:
+            self.idle_since = now
+        return now - self.idle_since
+
+    async def sender(self, stop_at):
+        started = next_tick = time.perf_counter()
+        speech_left, speech_offset, chunk = 0, 0, 0
+        utterance_frames = max(int(self.args.utterance_seconds / FRAME_SECONDS), 1)
+        while not self.closed and time.perf_counter() < stop_at and not self.tester.stopping.is_set():
+            now = time.perf_counter()
+            self.window.send_lateness_ms.append((now - next_tick) * 1000)
+            while self.pending_marks and self.pending_marks[0][0] <= now:
+                _, name, received_at = self.pending_marks.popleft()
+                await self._acknowledge_mark(name, received_at)
+            chunk += 1
+            timestamp_ms = int((now - started) * 1000)
+            if speech_left:
+                await self._send_frame(self.frames[speech_offset % len(self.frames)], timestamp_ms, chunk)
+                speech_offset += 1
+                speech_left -= 1
+                if not speech_left:
+                    self.utterance_ended_at = self.awaiting_since = time.perf_counter()
+            else:
+                await self._send_frame(self.silence, timestamp_ms, chunk)
+                if self.awaiting_since is not None and now - self.awaiting_since > self.args.response_timeout:
+                    self.window.missed_responses += 1
+                    self.utterance_ended_at = self.awaiting_since = None
+                agent_greeted = self.received_audio or now - started >= self.args.welcome_wait
+                if agent_greeted and self._agent_idle_for(now) >= self.args.pause_seconds:
+                    speech_left = utterance_frames
+            next_tick += FRAME_SECONDS
+            await asyncio.sleep(max(next_tick - time.perf_counter(), 0))
+
+    async def run(self, stop_at):
+        self.window.sessions_started += 1
+        headers = {"Authorization": f"Bearer {self.args.api_key}"} if self.args.api_key else None
+        receiver_task = None
+        try:
+            connect_started = time.perf_counter()
+            self.ws = await websockets.connect(self.tester.uri, additional_headers=headers, open_timeout=None,
+                                               max_size=None)
+            self.connected_at = time.perf_counter()
+            self.window.connect_ms.append((self.connected_at - connect_started) * 1000)
+            if self.twilio:
+                await self.ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+                await self._send({"event": "start", "start": {
+                    "accountSid": "AC-load-test", "callSid": str(uuid.uuid4()), "streamSid": self.stream_sid,
+                    "tracks": ["inbound"], "customParameters": {},
+                    "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1}}})
+            receiver_task = asyncio.create_task(self.receiver())
+            sender_task = asyncio.create_task(self.sender(stop_at))
+            # the server hanging up ends the receiver, which ends the session
+            await asyncio.wait([receiver_task, sender_task], return_when=asyncio.FIRST_COMPLETED)
+            self.closed = True
+            await sender_task
+            if self.twilio and not receiver_task.done():
+                await self._send({"event": "stop", "stop": {"callSid": self.stream_sid}})
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            self.window.errors += 1
+            logging.error(f"Session failed: {e}")
+        finally:
+            self.closed = True
+            if receiver_task is not None:
+                receiver_task.cancel()
+            for ping_task in list(self.ping_tasks):
+                ping_task.cancel()
+            if self.ws is not None:
+                await self.ws.close()
+            self.window.sessions_ended += 1
+
+
+class ServerProcessMonitor:
+    """CPU seconds and RSS of the server processes from /proc, so this only works against a server on the same Linux box."""
+    def __init__(self, pids):
+        self.pids = pids
+        self.last_cpu, self.last_time = self._cpu_seconds(), time.perf_counter()
+
+    def _cpu_seconds(self):
+        total = 0.0
+        for pid in self.pids:
+            try:
+                with open(f"/proc/{pid}/stat") as stat_file:
+                    fields = stat_file.read().rsplit(")", 1)[1].split()
+                total += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+            except (OSError, IndexError, ValueError):
+                pass
+        return total
+
+    def _rss_bytes(self):
+        total = 0
+        for pid in self.pids:
+            try:
+                with open(f"/proc/{pid}/statm") as statm_file:
+                    total += int(statm_file.read().split()[1]) * PAGE_SIZE
+            except (OSError, IndexError, ValueError):
+                pass
+        return total
+
+    def sample(self):
+        cpu, now = self._cpu_seconds(), time.perf_counter()
+        percent = (cpu - self.last_cpu) / (now - self.last_time) * 100 if now > self.last_time else None
+        self.last_cpu, self.last_time = cpu, now
+        return {"cpu_percent": round(percent, 1) if percent is not None else None,
+                "rss_mb": round(self._rss_bytes() / 2 ** 20, 1)}
+
+
+class LoadTester:
+    def __init__(self, args):
+        self.args = args
+        self.uri = f"{args.server_url.rstrip('/')}/chat/v1/{args.agent_id}"
+        self.speech_frames = {"default": tone_frames(16000, mulaw=False), "twilio": tone_frames(8000, mulaw=True)}
+        self.silence_frames = {"default": base64.b64encode(b'\x00' * 640).decode(),
+                               "twilio": base64.b64encode(b'\xff' * 160).decode()}
+        self.window = LoadWindow()
+        self.stopping = asyncio.Event()
+        self.sessions = set()
+        self.server_monitor = ServerProcessMonitor(args.server_pid) if args.server_pid else None
+        self.reports = []
+
+    def _start_session(self, stop_at):
+        session = LoadTestSession(self, self.args.protocol)
+        task = asyncio.create_task(session.run(stop_at))
+        self.sessions.add(task)
+        task.add_done_callback(self.sessions.discard)
+
+    async def _keep_sessions(self, target, stop_at):
+        """Tops the number of live sessions up to target (at --connect-rate per second) until stop_at."""
+        while time.perf_counter() < stop_at and not self.stopping.is_set():
+            if len(self.sessions) < target():
+                self._start_session(stop_at)
+                await asyncio.sleep(1 / self.args.connect_rate)
+            else:
+                await asyncio.sleep(0.1)
+
+    async def _loop_stats(self, session):
+        if not self.args.metrics_url:
+            return None
+        try:
+            async with session.get(f"{self.args.metrics_url.rstrip('/')}/metrics/loop", timeout=5) as response:
+                stats = await response.json()
+            return {key: stats.get(key) for key in ("lag_p50_ms", "lag_p99_ms", "lag_max_ms", "slow_callback_count")}
+        except Exception as e:
+            logging.error(f"Could not fetch loop metrics: {e}")
+            return None
+
+    async def report(self, http_session, **extra):
+        window, self.window = self.window, LoadWindow()
+        report = {"time": round(time.time(), 1), "active_sessions": len(self.sessions), **extra, **window.summary()}
+        if self.server_monitor is not None:
+            report["server"] = self.server_monitor.sample()
+        loop_stats = await self._loop_stats(http_session)
+        if loop_stats is not None:
+            report["server_loop"] = loop_stats
+        self.reports.append(report)
+        print(json.dumps(report), flush=True)
+        return report
+
+    def is_degraded(self, report, baseline):
+        latency = (report["response_latency_ms"] or report["welcome_latency_ms"] or {}).get("p95")
+        baseline_latency = baseline and (baseline["response_latency_ms"] or baseline["welcome_latency_ms"] or {}).get("p95")
+        if latency is not None and baseline_latency and latency > baseline_latency * (1 + self.args.degradation):
+            return "latency"
+        lateness = (report["send_lateness_ms"] or {}).get("p95")
+        if lateness is not None and lateness > self.args.max_send_lateness_ms:
+            return "send_jitter"
+        cpu = report.get("server", {}).get("cpu_percent")
+        if cpu is not None and cpu > self.args.max_cpu_percent:
+            return "server_cpu"
+        if report["missed_responses"] or report["errors"]:
+            return "failures"
+        return None
+
+    async def run_fixed(self, http_session):
+        """--sessions for --duration seconds, reporting every --report-interval. With --soak ended calls are replaced."""
+        stop_at = time.perf_counter() + self.args.duration
+        if self.args.soak:
+            filler = asyncio.create_task(self._keep_sessions(lambda: self.args.sessions, stop_at))
+        else:
+            filler = None
+            for _ in range(self.args.sessions):
+                self._start_session(stop_at)
+                await asyncio.sleep(1 / self.args.connect_rate)
+        while time.perf_counter() < stop_at and (self.sessions or filler is not None):
+            await asyncio.sleep(min(self.args.report_interval, max(stop_at - time.perf_counter(), 0)))
+            await self.report(http_session, mode="soak" if self.args.soak else "fixed")
+        if filler is not None:
+            filler.cancel()
+
+    async def run_ramp(self, http_session):
+        """Adds --step sessions every --step-seconds until a step degrades; the last good step is the capacity."""
+        target, baseline, capacity = self.args.start_sessions, None, None
+        stop_at = time.perf_counter() + 10 ** 9
+        filler = asyncio.create_task(self._keep_sessions(lambda: target, stop_at))
+        while target <= self.args.max_sessions:
+            await asyncio.sleep(self.args.warmup_seconds)
+            self.window = LoadWindow()
+            await asyncio.sleep(self.args.step_seconds)
+            report = await self.report(http_session, mode="ramp", target_sessions=target)
+            baseline = baseline or report
+            reason = self.is_degraded(report, baseline if baseline is not report else None)
+            if reason is not None:
+                print(json.dumps({"capacity_sessions": capacity, "degraded_at": target, "reason": reason}), flush=True)
+                break
+            capacity = target
+            target += self.args.step
+        else:
+            print(json.dumps({"capacity_sessions": capacity, "degraded_at": None}), flush=True)
+        self.stopping.set()
+        filler.cancel()
+
+    async def run(self):
+        async with aiohttp.ClientSession() as http_session:
+            if self.args.ramp:
+                await self.run_ramp(http_session)
+            else:
+                await self.run_fixed(http_session)
+        self.stopping.set()
+        if self.sessions:
+            await asyncio.wait(list(self.sessions))
+        if self.args.output:
+            with open(self.args.output, "w") as output_file:
+                json.dump(self.reports, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent websocket load tester for quickstart_server")
+    parser.add_argument("--server-url", default=os.getenv("VOICEAIAGENT_WS_SERVER_URL", "ws://localhost:5001"))
+    parser.add_argument("--agent-id", default=os.getenv("ASSISTANT_ID"))
+    parser.add_argument("--api-key", default=os.getenv("VOICEAIAGENT_API_KEY"))
+    parser.add_argument("--protocol", choices=("default", "twilio"), default="default",
+                        help="must match the input provider of the agent")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions in fixed and soak mode")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run in fixed and soak mode")
+    parser.add_argument("--soak", action="store_true", help="replace sessions the server ends to hold --sessions")
+    parser.add_argument("--ramp", action="store_true", help="add sessions step by step until latency degrades")
+    parser.add_argument("--start-sessions", type=int, default=5)
+    parser.add_argument("--step", type=int, default=5)
+    parser.add_argument("--max-sessions", type=int, default=500)
+    parser.add_argument("--warmup-seconds", type=float, default=10, help="settle time after each ramp step")
+    parser.add_argument("--step-seconds", type=float, default=30, help="measurement time of each ramp step")
+    parser.add_argument("--degradation", type=float, default=0.5,
+                        help="allowed p95 latency increase over the first step before a step counts as degraded")
+    parser.add_argument("--max-send-lateness-ms", type=float, default=20,
+                        help="p95 frame lateness above which the client itself is saturated")
+    parser.add_argument("--max-cpu-percent", type=float, default=90)
+    parser.add_argument("--connect-rate", type=float, default=10, help="new sessions per second")
+    parser.add_argument("--utterance-seconds", type=float, default=2.0)
+    parser.add_argument("--pause-seconds", type=float, default=0.8, help="silence after the agent stops before speaking")
+    parser.add_argument("--response-timeout", type=float, default=15)
+    parser.add_argument("--welcome-wait", type=float, default=5,
+                        help="seconds to wait for a welcome message before speaking first")
+    parser.add_argument("--output-sample-rate", type=int, default=24000,
+                        help="sample rate of raw PCM the server sends on the default protocol (WAV is parsed)")
+    parser.add_argument("--ws-ping-every", type=int, default=5,
+                        help="measure the websocket ping round trip after every Nth mark ack")
+    parser.add_argument("--report-interval", type=float, default=10)
+    parser.add_argument("--server-pid", type=int, action="append", help="server process to sample CPU/RSS of, repeatable")
+    parser.add_argument("--metrics-url", default=None, help="http base URL of the server for /metrics/loop")
+    parser.add_argument("--output", default=None, help="write all reports as JSON")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    if not args.agent_id:
+        parser.error("--agent-id (or ASSISTANT_ID) is required")
+    asyncio.run(LoadTester(args).run())
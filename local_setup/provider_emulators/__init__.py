@@ -0,0 +1,40 @@
+"""
+Local stand-ins for the provider APIs, speaking enough of each protocol to drive the real client classes:
+
+* deepgram: /v1/listen websocket (DeepgramTranscriber streaming), /v1/listen and /v1/speak over HTTP
+* elevenlabs: /v1/text-to-speech/{voice}/multi-stream-input websocket and /v1/text-to-speech/{voice} over HTTP
+* cartesia: /tts/websocket and /tts/bytes
+* openai: /v1/chat/completions, streamed (SSE) and not
+
+All of them are served by one aiohttp app. Point the clients at it with the base URL env vars, e.g.
+
+    DEEPGRAM_BASE_URL=http://localhost:8765 ELEVENLABS_BASE_URL=http://localhost:8765
+    CARTESIA_BASE_URL=http://localhost:8765 OPENAI_BASE_URL=http://localhost:8765/v1
+
+Latency, jitter and failure injection are set with EmulatorConfig; GET /emulator/stats returns request, error,
+disconnect and stall counts per provider.
+"""
+from aiohttp import web
+
+from .base import EmulatorConfig
+from . import deepgram, elevenlabs, cartesia, openai
+
+PROVIDERS = {
+    "deepgram": deepgram,
+    "elevenlabs": elevenlabs,
+    "cartesia": cartesia,
+    "openai": openai,
+}
+
+
+def create_app(config=None, providers=tuple(PROVIDERS)):
+    config = config or EmulatorConfig()
+    app = web.Application()
+    for provider in providers:
+        PROVIDERS[provider].register(app, config)
+
+    async def stats(request):
+        return web.json_response(config.get_stats())
+
+    app.router.add_get("/emulator/stats", stats)
+    return app
@@ -0,0 +1,41 @@
+"""
+    python -m local_setup.provider_emulators --port 8765
+    python -m local_setup.provider_emulators --providers deepgram,openai --latency-ms 300 --error-rate 0.05
+"""
+import logging
+import argparse
+
+from aiohttp import web
+
+from . import create_app, PROVIDERS
+from .base import EmulatorConfig
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Deepgram, ElevenLabs, Cartesia and OpenAI emulators")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--providers", default=",".join(PROVIDERS), help="comma separated subset to serve")
+    parser.add_argument("--latency-ms", type=float, default=150, help="transcript result and HTTP response latency")
+    parser.add_argument("--jitter-ms", type=float, default=30)
+    parser.add_argument("--first-byte-ms", type=float, default=200, help="TTS time to first audio")
+    parser.add_argument("--first-token-ms", type=float, default=350, help="LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--chars-per-second", type=float, default=15, help="speaking rate of the synthesized audio")
+    parser.add_argument("--words-per-second", type=float, default=2.5, help="speaking rate assumed for transcripts")
+    parser.add_argument("--endpointing-ms", type=int, default=None, help="override the endpointing clients ask for")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance a request or handshake gets a 503")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="chance per message of dropping the stream")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="chance per message of holding it back")
+    parser.add_argument("--stall-ms", type=float, default=3000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+    config = EmulatorConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, first_byte_ms=args.first_byte_ms,
+                            first_token_ms=args.first_token_ms, tokens_per_second=args.tokens_per_second,
+                            chars_per_second=args.chars_per_second, words_per_second=args.words_per_second,
+                            endpointing_ms=args.endpointing_ms, error_rate=args.error_rate,
+                            disconnect_rate=args.disconnect_rate, stall_rate=args.stall_rate,
+                            stall_ms=args.stall_ms, seed=args.seed)
+    web.run_app(create_app(config, args.providers.split(",")), host=args.host, port=args.port)
@@ -0,0 +1,193 @@
+import io
+import time
+import random
+import asyncio
+from collections import Counter
+
+import numpy as np
+from aiohttp import web, WSCloseCode
+from pydub import AudioSegment
+
+from voiceaiagent.helpers.g711 import encode_ulaw, decode_ulaw, encode_alaw, decode_alaw
+from voiceaiagent.helpers.audio_codec import pcm_to_wav
+from voiceaiagent.helpers.logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+SPEECH_THRESHOLD = 500  # mean absolute amplitude above which a chunk counts as speech
+SYNTHESIS_SPEEDUP = 4  # emulated TTS produces audio this many times faster than real time
+WORDS_PER_AUDIO_CHUNK = 4
+
+DEFAULT_TRANSCRIPTS = (
+    "hi I wanted to check the status of my order",
+    "it was placed last tuesday and I have not received any update",
+    "can you tell me when it will be delivered",
+    "okay and is there a way to change the delivery address",
+    "great thank you that is all I needed",
+)
+
+DEFAULT_RESPONSE = ("Sure, I can help you with that. Your order has been shipped and should reach you within two to "
+                    "three business days. Is there anything else I can do for you?")
+
+
+class EmulatorConfig:
+    """
+    Timing and failure behaviour shared by the emulators. Latencies are in ms and get +/- jitter_ms applied per event.
+    error_rate is the chance a request or websocket handshake is refused with a 503, disconnect_rate the chance a
+    websocket is dropped before each message it would send, stall_rate the chance a message is held back for stall_ms.
+    """
+    def __init__(self, latency_ms=150, jitter_ms=30, first_byte_ms=200, first_token_ms=350, tokens_per_second=50,
+                 chars_per_second=15, words_per_second=2.5, endpointing_ms=None, interim_interval_ms=400,
+                 error_rate=0.0, disconnect_rate=0.0, stall_rate=0.0, stall_ms=3000, transcripts=DEFAULT_TRANSCRIPTS,
+                 response=DEFAULT_RESPONSE, json_response='{"hangup": "No"}', seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.first_byte_ms = first_byte_ms
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+        self.chars_per_second = chars_per_second
+        self.words_per_second = words_per_second
+        # None means use the endpointing the client asked for
+        self.endpointing_ms = endpointing_ms
+        self.interim_interval_ms = interim_interval_ms
+        self.error_rate = error_rate
+        self.disconnect_rate = disconnect_rate
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.transcripts = list(transcripts)
+        self.response = response
+        self.json_response = json_response
+        self.rng = random.Random(seed)
+        self.stats = Counter()
+
+    def delay(self, latency_ms=None):
+        """latency_ms (latency_ms of the config by default) with jitter applied, in seconds."""
+        latency_ms = self.latency_ms if latency_ms is None else latency_ms
+        return max(latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+
+    def should_fail(self, provider):
+        failed = self.rng.random() < self.error_rate
+        self.stats[f"{provider}.{'errors' if failed else 'requests'}"] += 1
+        return failed
+
+    def should_disconnect(self, provider):
+        if self.rng.random() < self.disconnect_rate:
+            self.stats[f"{provider}.disconnects"] += 1
+            return True
+        return False
+
+    async def stall(self, provider):
+        if self.rng.random() < self.stall_rate:
+            self.stats[f"{provider}.stalls"] += 1
+            await asyncio.sleep(self.stall_ms / 1000)
+
+    def transcript(self, index):
+        return self.transcripts[index % len(self.transcripts)]
+
+    def get_stats(self):
+        return dict(self.stats)
+
+
+def error_response(provider):
+    logger.info(f"Injecting a failure into a {provider} request")
+    return web.json_response({"error": f"{provider} emulator injected failure"}, status=503)
+
+
+async def drop_websocket(ws):
+    await ws.close(code=WSCloseCode.INTERNAL_ERROR, message=b"emulator injected disconnect")
+
+
+class OrderedSender:
+    """
+    Sends websocket messages after a jittered delay without letting the jitter reorder them: every message is due
+    no earlier than the one queued before it. Disconnect and stall injection happen here, before each message.
+    """
+    def __init__(self, ws, config, provider):
+        self.ws = ws
+        self.config = config
+        self.provider = provider
+        self.queue = asyncio.Queue()
+        self.last_due = 0.0
+        self.task = asyncio.create_task(self._run())
+
+    def send_json(self, message, latency_ms=None):
+        self.last_due = max(time.monotonic() + self.config.delay(latency_ms), self.last_due)
+        self.queue.put_nowait((self.last_due, message))
+
+    async def _run(self):
+        while True:
+            due, message = await self.queue.get()
+            await asyncio.sleep(max(due - time.monotonic(), 0))
+            await self.config.stall(self.provider)
+            if self.ws.closed:
+                return
+            if self.config.should_disconnect(self.provider):
+                await drop_websocket(self.ws)
+                return
+            await self.ws.send_json(message)
+
+    async def drain(self):
+        while not self.queue.empty() and not self.task.done():
+            await asyncio.sleep(0.01)
+
+    def cancel(self):
+        self.task.cancel()
+
+
+def decode_audio(data, encoding):
+    if encoding == "mulaw":
+        return decode_ulaw(data)
+    if encoding == "alaw":
+        return decode_alaw(data)
+    return np.frombuffer(data[:len(data) - len(data) % 2], dtype=np.int16)
+
+
+def is_speech(samples):
+    if len(samples) == 0:
+        return False
+    return float(np.abs(samples.astype(np.int32)).mean()) > SPEECH_THRESHOLD
+
+
+def encode_mp3(pcm, sample_rate, bitrate="128k"):
+    """int16 mono pcm as a bare MP3 stream (no ID3 tag or Xing header), so streamed chunks concatenate cleanly."""
+    segment = AudioSegment(pcm.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+    output = io.BytesIO()
+    segment.export(output, format="mp3", bitrate=bitrate, parameters=["-id3v2_version", "0", "-write_xing", "0"])
+    return output.getvalue()
+
+
+def synthesize_audio(seconds, encoding="mulaw", sample_rate=8000, frequency=220, amplitude=6000):
+    """
+    A tone standing in for speech. mulaw/alaw and linear16/pcm come back raw, mp3 as real MP3 (encoded through ffmpeg,
+    which the clients need to decode it anyway) and anything else as a WAV file.
+    """
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pcm = (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+    if encoding in ("mulaw", "pcm_mulaw", "ulaw"):
+        return encode_ulaw(pcm).tobytes()
+    if encoding in ("alaw", "pcm_alaw"):
+        return encode_alaw(pcm).tobytes()
+    if encoding in ("linear16", "pcm", "pcm_s16le"):
+        return pcm.tobytes()
+    if encoding == "mp3":
+        return encode_mp3(pcm, sample_rate)
+    return pcm_to_wav(pcm.tobytes(), sample_rate)
+
+
+def bytes_per_second(encoding, sample_rate):
+    return sample_rate * (1 if encoding in ("mulaw", "pcm_mulaw", "ulaw", "alaw", "pcm_alaw") else 2)
+
+
+def speech_seconds(text, config):
+    return max(len(text), 1) / config.chars_per_second
+
+
+def speech_chunks(text, config, encoding, sample_rate):
+    """Splits text into groups of a few words and yields (chunk_text, audio, seconds) for each, the way TTS streams."""
+    words = text.split(" ")
+    for i in range(0, len(words), WORDS_PER_AUDIO_CHUNK):
+        chunk_text = " ".join(words[i:i + WORDS_PER_AUDIO_CHUNK])
+        if i + WORDS_PER_AUDIO_CHUNK < len(words):
+            chunk_text += " "
+        seconds = speech_seconds(chunk_text, config)
+        yield chunk_text, synthesize_audio(seconds, encoding, sample_rate), seconds
@@ -0,0 +1,96 @@
+import base64
+import asyncio
+
+from aiohttp import web, WSMsgType
+
+from voiceaiagent.helpers.logger_config import configure_logger
+from .base import (SYNTHESIS_SPEEDUP, error_response, drop_websocket, synthesize_audio, speech_seconds,
+                   speech_chunks)
+
+logger = configure_logger(__name__)
+
+PROVIDER = "cartesia"
+
+
+class CartesiaStream:
+    """
+    One /tts/websocket connection. Every transcript message is synthesized as it arrives, in order: the first one of a
+    context after first_byte_ms, the others after latency_ms, audio chunks at SYNTHESIS_SPEEDUP times real time. A
+    message without continue ends the context with a done message; cancel drops everything queued for the context.
+    """
+    def __init__(self, ws, config):
+        self.ws = ws
+        self.config = config
+        self.jobs = asyncio.Queue()
+        self.started_contexts = set()
+        self.cancelled_contexts = set()
+        self.task = asyncio.create_task(self._generate())
+
+    def handle(self, message):
+        context_id = message.get("context_id")
+        if message.get("cancel"):
+            self.cancelled_contexts.add(context_id)
+            return
+        self.jobs.put_nowait(message)
+
+    async def _generate(self):
+        while True:
+            message = await self.jobs.get()
+            context_id = message.get("context_id")
+            if context_id in self.cancelled_contexts:
+                continue
+            first = context_id not in self.started_contexts
+            self.started_contexts.add(context_id)
+            await asyncio.sleep(self.config.delay(self.config.first_byte_ms if first else None))
+            output_format = message.get("output_format", {})
+            transcript = message.get("transcript", "")
+            chunks = speech_chunks(transcript, self.config, output_format.get("encoding", "pcm_mulaw"),
+                                   output_format.get("sample_rate", 8000)) if transcript.strip() else ()
+            for _, audio, seconds in chunks:
+                await self.config.stall(PROVIDER)
+                if context_id in self.cancelled_contexts or self.ws.closed:
+                    break
+                if self.config.should_disconnect(PROVIDER):
+                    await drop_websocket(self.ws)
+                    return
+                await self.ws.send_json({"type": "chunk", "context_id": context_id, "status_code": 206,
+                                         "done": False, "step_time": seconds * 1000 / SYNTHESIS_SPEEDUP,
+                                         "data": base64.b64encode(audio).decode("utf-8")})
+                await asyncio.sleep(seconds / SYNTHESIS_SPEEDUP)
+            if not message.get("continue") and context_id not in self.cancelled_contexts and not self.ws.closed:
+                await self.ws.send_json({"type": "done", "context_id": context_id, "status_code": 206, "done": True})
+                self.started_contexts.discard(context_id)
+
+    def cancel(self):
+        self.task.cancel()
+
+
+def register(app, config):
+    async def tts_websocket(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        stream = CartesiaStream(ws, config)
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    break
+                stream.handle(message.json())
+        finally:
+            stream.cancel()
+        return ws
+
+    async def tts_bytes(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        payload = await request.json()
+        await asyncio.sleep(config.delay(config.first_byte_ms))
+        await config.stall(PROVIDER)
+        output_format = payload.get("output_format", {})
+        audio = synthesize_audio(speech_seconds(payload.get("transcript", ""), config),
+                                 output_format.get("encoding", "mp3"), output_format.get("sample_rate", 44100))
+        return web.Response(body=audio, content_type="application/octet-stream")
+
+    app.router.add_get("/tts/websocket", tts_websocket)
+    app.router.add_post("/tts/bytes", tts_bytes)
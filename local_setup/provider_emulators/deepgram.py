@@ -0,0 +1,149 @@
+import uuid
+import asyncio
+
+from aiohttp import web, WSMsgType
+
+from voiceaiagent.helpers.logger_config import configure_logger
+from .base import (OrderedSender, error_response, decode_audio, is_speech, synthesize_audio, bytes_per_second,
+                   speech_seconds)
+
+logger = configure_logger(__name__)
+
+PROVIDER = "deepgram"
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        return default
+
+
+class DeepgramStream:
+    """
+    One /v1/listen websocket. Speech is detected from the energy of the audio the client streams; while the caller
+    speaks, interim Results reveal the scripted transcript at words_per_second, and once the audio has been silent for
+    the endpointing the client asked for a final Results (is_final and speech_final) is sent, followed by UtteranceEnd
+    after utterance_end_ms. Every message is delayed by the configured latency, in order.
+    """
+    def __init__(self, ws, config, params):
+        self.config = config
+        self.encoding = params.get("encoding", "linear16")
+        self.sample_rate = _int_param(params, "sample_rate", 16000)
+        endpointing_ms = config.endpointing_ms if config.endpointing_ms is not None else _int_param(params, "endpointing", 300)
+        self.endpointing = endpointing_ms / 1000
+        self.utterance_end = _int_param(params, "utterance_end_ms", 1000) / 1000
+        self.vad_events = params.get("vad_events") == "true"
+        self.interim_results = params.get("interim_results") == "true"
+        self.request_id = str(uuid.uuid4())
+        self.sender = OrderedSender(ws, config, PROVIDER)
+        self.utterance_index = 0
+        self.audio_seconds = 0.0
+        self.speech_start = None
+        self.last_speech = None
+        self.last_interim = None
+        self.awaiting_utterance_end = False
+
+    def _words(self, count):
+        words = self.config.transcript(self.utterance_index).split()[:count]
+        step = (self.last_speech - self.speech_start) / max(len(words), 1)
+        return [{"word": word, "punctuated_word": word, "start": round(self.speech_start + i * step, 3),
+                 "end": round(self.speech_start + (i + 1) * step, 3), "confidence": 0.99}
+                for i, word in enumerate(words)]
+
+    def _send_results(self, is_final):
+        count = None
+        if not is_final:
+            count = int((self.last_speech - self.speech_start) * self.config.words_per_second)
+            if count == 0:
+                return
+        words = self._words(count)
+        self.sender.send_json({
+            "type": "Results", "channel_index": [0, 1], "start": round(self.speech_start, 3),
+            "duration": round(self.audio_seconds - self.speech_start, 3), "is_final": is_final,
+            "speech_final": is_final, "from_finalize": False,
+            "channel": {"alternatives": [{"transcript": " ".join(word["word"] for word in words),
+                                          "confidence": 0.99, "words": words}]},
+            "metadata": {"request_id": self.request_id}})
+
+    def _end_utterance(self):
+        self._send_results(is_final=True)
+        self.utterance_index += 1
+        self.speech_start = None
+        self.awaiting_utterance_end = True
+
+    def feed(self, data):
+        samples = decode_audio(data, self.encoding)
+        chunk_start = self.audio_seconds
+        self.audio_seconds += len(samples) / self.sample_rate
+        if is_speech(samples):
+            self.awaiting_utterance_end = False
+            if self.speech_start is None:
+                self.speech_start = self.last_interim = chunk_start
+                if self.vad_events:
+                    self.sender.send_json({"type": "SpeechStarted", "channel": [0], "timestamp": round(chunk_start, 3)})
+            self.last_speech = self.audio_seconds
+            if self.interim_results and self.audio_seconds - self.last_interim >= self.config.interim_interval_ms / 1000:
+                self.last_interim = self.audio_seconds
+                self._send_results(is_final=False)
+        elif self.speech_start is not None and self.audio_seconds - self.last_speech >= self.endpointing:
+            self._end_utterance()
+        elif self.awaiting_utterance_end and self.audio_seconds - self.last_speech >= self.utterance_end:
+            self.awaiting_utterance_end = False
+            self.sender.send_json({"type": "UtteranceEnd", "channel": [0, 1], "last_word_end": round(self.last_speech, 3)})
+
+    async def close(self):
+        if self.speech_start is not None:
+            self._end_utterance()
+        self.sender.send_json({"type": "Metadata", "transaction_key": "deprecated", "request_id": self.request_id,
+                               "duration": round(self.audio_seconds, 3), "channels": 1})
+        await self.sender.drain()
+        self.sender.cancel()
+
+
+def register(app, config):
+    async def listen_websocket(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        stream = DeepgramStream(ws, config, request.query)
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.BINARY:
+                    stream.feed(message.data)
+                elif message.type == WSMsgType.TEXT:
+                    if message.json().get("type") == "CloseStream":
+                        await stream.close()
+                        break
+                else:
+                    break
+        finally:
+            stream.sender.cancel()
+        await ws.close()
+        return ws
+
+    async def listen_http(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        audio = await request.read()
+        await asyncio.sleep(config.delay())
+        await config.stall(PROVIDER)
+        transcript = config.transcript(config.stats[f"{PROVIDER}.requests"])
+        return web.json_response({
+            "metadata": {"request_id": str(uuid.uuid4()), "duration": len(audio) / bytes_per_second("linear16", 16000)},
+            "results": {"channels": [{"alternatives": [{"transcript": transcript, "confidence": 0.99}]}]}})
+
+    async def speak(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        payload = await request.json()
+        await asyncio.sleep(config.delay(config.first_byte_ms))
+        await config.stall(PROVIDER)
+        audio = synthesize_audio(speech_seconds(payload.get("text", ""), config), request.query.get("encoding", "mulaw"),
+                                 int(request.query.get("sample_rate", 8000)))
+        return web.Response(body=audio, content_type="application/octet-stream")
+
+    app.router.add_get("/v1/listen", listen_websocket)
+    app.router.add_post("/v1/listen", listen_http)
+    app.router.add_post("/v1/speak", speak)
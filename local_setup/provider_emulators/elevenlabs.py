@@ -0,0 +1,119 @@
+import base64
+import asyncio
+
+from aiohttp import web, WSMsgType
+
+from voiceaiagent.helpers.logger_config import configure_logger
+from .base import (SYNTHESIS_SPEEDUP, error_response, drop_websocket, synthesize_audio, speech_seconds,
+                   speech_chunks)
+
+logger = configure_logger(__name__)
+
+PROVIDER = "elevenlabs"
+ENCODINGS = {"ulaw": "mulaw", "alaw": "alaw", "pcm": "linear16", "mp3": "mp3"}
+
+
+def parse_output_format(output_format):
+    """
+    ulaw_8000 -> (mulaw, 8000), pcm_16000 -> (linear16, 16000), mp3_44100_128 -> (mp3, 44100). Raises ValueError for
+    formats the emulator can't produce (opus) rather than answering with audio in some other encoding.
+    """
+    parts = (output_format or "mp3_44100_128").split("_")
+    if parts[0] not in ENCODINGS:
+        raise ValueError(f"unsupported output_format {output_format}")
+    sample_rate = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 44100
+    return ENCODINGS[parts[0]], sample_rate
+
+
+def unsupported_format_response(error):
+    return web.json_response({"detail": {"status": "invalid_output_format", "message": str(error)}}, status=400)
+
+
+class ElevenlabsStream:
+    """
+    One multi-stream-input websocket. Text is buffered until the client flushes, then synthesized in order: the first
+    chunk after first_byte_ms, the rest at SYNTHESIS_SPEEDUP times real time, each with the alignment chars it covers
+    (which is what the client matches to detect the end of a response). close_context drops whatever is buffered or
+    still being generated and is answered with isFinal.
+    """
+    def __init__(self, ws, config, encoding, sample_rate):
+        self.ws = ws
+        self.config = config
+        self.encoding, self.sample_rate = encoding, sample_rate
+        self.text = ""
+        self.jobs = asyncio.Queue()
+        self.generation = 0
+        self.task = asyncio.create_task(self._generate())
+
+    def handle(self, message):
+        if message.get("close_context"):
+            self.text = ""
+            self.generation += 1
+            self.jobs.put_nowait((self.generation, None, message.get("context_id")))
+            return
+        self.text += message.get("text", "")
+        if message.get("flush") and self.text.strip():
+            self.jobs.put_nowait((self.generation, self.text.strip(), None))
+            self.text = ""
+
+    async def _generate(self):
+        while True:
+            generation, text, closed_context = await self.jobs.get()
+            if text is None:
+                await self.ws.send_json({"isFinal": True, "contextId": closed_context})
+                continue
+            await asyncio.sleep(self.config.delay(self.config.first_byte_ms))
+            for chunk_text, audio, seconds in speech_chunks(text, self.config, self.encoding, self.sample_rate):
+                await self.config.stall(PROVIDER)
+                if generation != self.generation or self.ws.closed:
+                    break
+                if self.config.should_disconnect(PROVIDER):
+                    await drop_websocket(self.ws)
+                    return
+                chars = list(chunk_text)
+                step = int(seconds * 1000 / max(len(chars), 1))
+                await self.ws.send_json({
+                    "audio": base64.b64encode(audio).decode("utf-8"), "isFinal": None,
+                    "alignment": {"chars": chars, "charStartTimesMs": [i * step for i in range(len(chars))],
+                                  "charDurationsMs": [step] * len(chars)}})
+                await asyncio.sleep(seconds / SYNTHESIS_SPEEDUP)
+
+    def cancel(self):
+        self.task.cancel()
+
+
+def register(app, config):
+    async def multi_stream_input(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        try:
+            encoding, sample_rate = parse_output_format(request.query.get("output_format"))
+        except ValueError as e:
+            return unsupported_format_response(e)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        stream = ElevenlabsStream(ws, config, encoding, sample_rate)
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    break
+                stream.handle(message.json())
+        finally:
+            stream.cancel()
+        return ws
+
+    async def text_to_speech(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        try:
+            encoding, sample_rate = parse_output_format(request.query.get("output_format"))
+        except ValueError as e:
+            return unsupported_format_response(e)
+        payload = await request.json()
+        await asyncio.sleep(config.delay(config.first_byte_ms))
+        await config.stall(PROVIDER)
+        audio = synthesize_audio(speech_seconds(payload.get("text", ""), config), encoding, sample_rate)
+        return web.Response(body=audio, content_type="application/octet-stream")
+
+    app.router.add_get("/v1/text-to-speech/{voice_id}/multi-stream-input", multi_stream_input)
+    app.router.add_post("/v1/text-to-speech/{voice_id}", text_to_speech)
@@ -0,0 +1,70 @@
+import re
+import time
+import json
+import uuid
+import asyncio
+
+from aiohttp import web
+
+from voiceaiagent.helpers.logger_config import configure_logger
+from .base import error_response
+
+logger = configure_logger(__name__)
+
+PROVIDER = "openai"
+
+
+def tokenize(text):
+    """Rough stand-in for BPE tokens: words with their leading space, punctuation on its own."""
+    return re.findall(r" ?\w+|[^\w\s]| ", text)
+
+
+def _chunk(completion_id, created, model, delta, finish_reason=None):
+    return {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "system_fingerprint": "emulator",
+            "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}]}
+
+
+def register(app, config):
+    def response_text(payload):
+        response_format = payload.get("response_format") or {}
+        return config.json_response if response_format.get("type") == "json_object" else config.response
+
+    async def chat_completions(request):
+        if config.should_fail(PROVIDER):
+            return error_response(PROVIDER)
+        payload = await request.json()
+        model = payload.get("model", "gpt-4o-mini")
+        completion_id, created = f"chatcmpl-{uuid.uuid4().hex}", int(time.time())
+        text = response_text(payload)
+        tokens = tokenize(text)
+        await asyncio.sleep(config.delay(config.first_token_ms))
+        await config.stall(PROVIDER)
+
+        if not payload.get("stream"):
+            return web.json_response({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(tokenize(json.dumps(payload.get("messages", [])))),
+                          "completion_tokens": len(tokens), "total_tokens": len(tokens)}})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(chunk):
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        await send(_chunk(completion_id, created, model, {"role": "assistant", "content": ""}))
+        for token in tokens:
+            if config.should_disconnect(PROVIDER):
+                # cut the stream mid response, the client sees an incomplete chunked body
+                request.transport.close()
+                return response
+            await send(_chunk(completion_id, created, model, {"content": token}))
+            await asyncio.sleep(1 / config.tokens_per_second)
+        await send(_chunk(completion_id, created, model, {}, finish_reason="stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
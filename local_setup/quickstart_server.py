@@ -5,13 +5,17 @@ import traceback
 import json
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Body
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import redis.asyncio as redis
 from dotenv import load_dotenv
 from voiceaiagent.helpers.utils import store_file
+from voiceaiagent.helpers.audio_asset_store import get_audio_asset_store
+from voiceaiagent.helpers.metrics import get_metrics_registry, get_call_metrics
+from voiceaiagent.helpers.loop_monitor import get_loop_monitor
 from voiceaiagent.prompts import *
 from voiceaiagent.helpers.logger_config import configure_logger
 from voiceaiagent.models import *
-from voiceaiagent.llms import LiteLLM
+from voiceaiagent.llms import LiteLLM, get_llm_client_registry
 from voiceaiagent.agent_manager.assistant_manager import AssistantManager
 
 # Get the agent data directory from environment variable, defaulting to local agent_data
@@ -35,6 +39,41 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def preload_audio_assets():
+    # decode fillers, backchannels and ambient tracks once per process instead of on every call
+    await asyncio.get_running_loop().run_in_executor(None, get_audio_asset_store().preload)
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    get_loop_monitor().start()
+
+
+@app.on_event("startup")
+async def preconnect_llm_clients():
+    # warm the shared LLM connection pool (LLM_PRECONNECT_URLS) so the first turn of the first call skips the handshake
+    await get_llm_client_registry().preconnect()
+
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await get_llm_client_registry().close()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: active calls, queue depths, turn latency histograms and cache hit rates."""
+    get_call_metrics()
+    return PlainTextResponse(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/loop")
+async def loop_metrics():
+    """Event loop lag percentiles and the most recent callbacks that blocked the loop."""
+    return get_loop_monitor().get_stats()
+
+
 class CreateAgentPayload(BaseModel):
     agent_config: AgentModel
     agent_prompts: Optional[Dict[str, Dict[str, str]]]
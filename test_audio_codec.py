@@ -0,0 +1,40 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from voiceaiagent.helpers.audio_codec import resample_array
+
+torch = pytest.importorskip("torch")
+torchaudio = pytest.importorskip("torchaudio")
+
+SAMPLE_RATES = [8000, 16000, 22050, 24000, 44100]
+# Both sides build float32 kernels and accumulate in float32, in a different order; differences stay within one int16
+# step, so the int16 audio we send is the same to within one LSB
+TOLERANCE = 1 / 32768
+
+
+def make_signal(sample_rate, seconds=0.25, num_channels=1):
+    rng = np.random.default_rng(sample_rate)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    tones = sum(np.sin(2 * np.pi * freq * t) for freq in (220.0, 1000.0, 3300.0)) / 4
+    noise = rng.uniform(-0.2, 0.2, size=(num_channels, len(t)))
+    return (tones + noise).astype(np.float32)
+
+
+@pytest.mark.parametrize("orig_sample_rate,target_sample_rate", list(itertools.permutations(SAMPLE_RATES, 2)))
+def test_resample_matches_torchaudio(orig_sample_rate, target_sample_rate):
+    samples = make_signal(orig_sample_rate)[0]
+    expected = torchaudio.functional.resample(torch.from_numpy(samples), orig_sample_rate, target_sample_rate).numpy()
+    resampled = resample_array(samples, orig_sample_rate, target_sample_rate)
+    assert resampled.shape == expected.shape
+    np.testing.assert_allclose(resampled, expected, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("orig_sample_rate,target_sample_rate", [(8000, 16000), (44100, 16000), (22050, 24000)])
+def test_resample_multichannel_matches_torchaudio(orig_sample_rate, target_sample_rate):
+    samples = make_signal(orig_sample_rate, num_channels=2)
+    expected = torchaudio.functional.resample(torch.from_numpy(samples), orig_sample_rate, target_sample_rate).numpy()
+    resampled = resample_array(samples, orig_sample_rate, target_sample_rate)
+    assert resampled.shape == expected.shape
+    np.testing.assert_allclose(resampled, expected, rtol=0, atol=TOLERANCE)
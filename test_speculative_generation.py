@@ -0,0 +1,27 @@
+from voiceaiagent.helpers.speculative_generation import transcripts_match
+
+
+def test_same_words_match():
+    assert transcripts_match("I want to cancel my order.", "i want to cancel my order")
+    assert transcripts_match("Hi, I wanted to check   the status", "hi I wanted to check the status")
+
+
+def test_filler_words_are_ignored():
+    assert transcripts_match("i can come tomorrow", "um i can come tomorrow uh")
+    assert transcripts_match("hmm yes please", "yes please")
+
+
+def test_negation_does_not_match():
+    assert not transcripts_match("i can come tomorrow", "i can't come tomorrow")
+    assert not transcripts_match("yes i want to cancel my order", "no i want to cancel my order")
+    assert not transcripts_match("i want to cancel", "i don't want to cancel")
+
+
+def test_numbers_do_not_match():
+    assert not transcripts_match("the fifteenth", "the fifth")
+    assert not transcripts_match("my number is 555 123 4567", "my number is 555 123 4568")
+
+
+def test_extension_with_words_does_not_match():
+    assert not transcripts_match("i want to cancel", "i want to cancel my subscription")
+    assert not transcripts_match("i want to cancel my order", "i want to cancel")
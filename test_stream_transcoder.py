@@ -0,0 +1,62 @@
+import io
+import shutil
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from voiceaiagent.helpers.stream_transcoder import StreamTranscoder
+
+if shutil.which(AudioSegment.converter) is None:
+    pytest.skip("ffmpeg is needed to decode mp3", allow_module_level=True)
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1024
+
+
+def mp3_chunks(seconds, amplitude):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    pcm = (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    output = io.BytesIO()
+    AudioSegment(pcm.tobytes(), frame_rate=SAMPLE_RATE, sample_width=2, channels=1).export(
+        output, format="mp3", parameters=["-id3v2_version", "0", "-write_xing", "0"])
+    audio = output.getvalue()
+    return [audio[i:i + CHUNK_SIZE] for i in range(0, len(audio), CHUNK_SIZE)]
+
+
+def peak(pcm):
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    return int(np.abs(samples.astype(np.int32)).max()) if len(samples) else 0
+
+
+def test_flush_keeps_each_utterance_to_itself():
+    transcoder = StreamTranscoder("mp3", SAMPLE_RATE, output_format="pcm")
+    try:
+        first = b"".join(transcoder.transcode(chunk) for chunk in mp3_chunks(0.5, 12000)) + transcoder.flush()
+        second = b"".join(transcoder.transcode(chunk) for chunk in mp3_chunks(0.5, 0)) + transcoder.flush()
+    finally:
+        transcoder.close()
+    # the whole of the first utterance comes out with it, none of it with the silent one after it
+    assert len(first) >= 0.5 * SAMPLE_RATE * 2
+    assert peak(second) < 100
+
+
+def test_reset_while_decoding_drops_the_interrupted_utterance():
+    transcoder = StreamTranscoder("mp3", SAMPLE_RATE, output_format="pcm")
+    interrupted = mp3_chunks(1, 12000)
+    try:
+        transcoder.transcode(interrupted[0])
+        decode = transcoder._decoder.decode
+
+        def interrupted_decode(chunk, timeout):
+            # the interruption lands on the loop while the worker thread is still decoding this chunk
+            pcm = decode(chunk, timeout)
+            transcoder.reset()
+            return pcm
+
+        transcoder._decoder.decode = interrupted_decode
+        assert transcoder.transcode(interrupted[1]) == b""
+        audio = b"".join(transcoder.transcode(chunk) for chunk in mp3_chunks(0.5, 0)) + transcoder.flush()
+    finally:
+        transcoder.close()
+    assert peak(audio) < 100
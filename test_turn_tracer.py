@@ -0,0 +1,37 @@
+import time
+
+from voiceaiagent.helpers.turn_tracer import TurnTracer
+
+
+def start_turn(tracer, sequence_id, transcript_received_at):
+    # Same steps TaskManager takes when a final transcript comes in
+    tracer.start_turn(sequence_id, start_time=tracer.take_speech_end(transcript_received_at))
+    tracer.end_span(sequence_id, "endpointing", transcript_received_at)
+
+
+def test_turn_without_interim_results_starts_at_the_transcript():
+    tracer = TurnTracer()
+    transcript_received_at = time.time()
+    start_turn(tracer, "seq-1", transcript_received_at)
+    assert tracer.turns["seq-1"]["start"] == transcript_received_at
+    assert tracer.histograms["endpointing"].max == 0
+
+
+def test_turn_is_backdated_to_the_last_interim_result():
+    tracer = TurnTracer()
+    spoke_at = time.time()
+    tracer.note_user_speech(spoke_at - 0.2)
+    tracer.note_user_speech(spoke_at)
+    start_turn(tracer, "seq-1", spoke_at + 0.5)
+    assert tracer.turns["seq-1"]["start"] == spoke_at
+    assert 499 < tracer.histograms["endpointing"].max < 501
+
+
+def test_interim_results_do_not_leak_into_the_next_turn():
+    tracer = TurnTracer()
+    spoke_at = time.time()
+    tracer.note_user_speech(spoke_at)
+    start_turn(tracer, "seq-1", spoke_at + 0.3)
+    start_turn(tracer, "seq-2", spoke_at + 30)
+    assert tracer.turns["seq-2"]["start"] == spoke_at + 30
+    assert tracer.histograms["endpointing"].max < 301
@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from voiceaiagent.helpers.vad import VADEngine
+
+
+class CountingSession:
+    """Stands in for the silero v5 export: scores each frame with how many frames its slot has seen so far."""
+    def __init__(self, fail_batches=0):
+        self.batch_sizes = []
+        self.fail_batches = fail_batches
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in ("input", "state", "sr")]
+
+    def run(self, _, ort_inputs):
+        if self.fail_batches:
+            self.fail_batches -= 1
+            raise RuntimeError("inference failed")
+        self.batch_sizes.append(len(ort_inputs["input"]))
+        state = ort_inputs["state"]
+        return state[0, :, :1].copy(), state + 1
+
+
+def frame(engine):
+    return np.zeros(engine.frame_size, dtype=np.float32)
+
+
+def test_pending_frames_of_all_streams_share_one_batch():
+    async def run():
+        session = CountingSession()
+        engine = VADEngine(session=session)
+        streams = [engine.register_stream() for _ in range(10)]
+        futures = [engine.submit(stream, frame(engine)) for stream in streams]
+        await asyncio.gather(*futures)
+        return session.batch_sizes, engine.get_stats()
+
+    batch_sizes, stats = asyncio.run(run())
+    assert batch_sizes == [10]
+    assert stats["frames"] == 10 and stats["batches"] == 1
+
+
+def test_streams_keep_their_own_state():
+    async def run():
+        engine = VADEngine(session=CountingSession(), initial_capacity=2)
+        first, second = engine.register_stream(), engine.register_stream()
+        first_probabilities = await first.process(np.zeros(engine.frame_size * 3, dtype=np.float32))
+        # outgrows the initial capacity while the first two streams hold state
+        third = engine.register_stream()
+        second_probabilities = await second.process(np.zeros(engine.frame_size, dtype=np.float32))
+        third_probabilities = await third.process(np.zeros(engine.frame_size * 2, dtype=np.float32))
+        after_more = await first.process(np.zeros(engine.frame_size, dtype=np.float32))
+        first.reset()
+        after_reset = await first.process(np.zeros(engine.frame_size, dtype=np.float32))
+        return first_probabilities, second_probabilities, third_probabilities, after_more, after_reset
+
+    first, second, third, after_more, after_reset = asyncio.run(run())
+    assert first == [0, 1, 2]
+    assert second == [0]
+    assert third == [0, 1]
+    assert after_more == [3]
+    assert after_reset == [0]
+
+
+def test_failed_batch_still_applies_deferred_resets():
+    async def run():
+        session = CountingSession()
+        engine = VADEngine(session=session)
+        stream = engine.register_stream()
+        await stream.process(frame(engine))
+        session.fail_batches = 1
+        failed = engine.submit(stream, frame(engine))
+        await asyncio.sleep(0)
+        # the batch is running, so the reset only applies once it is done
+        stream.reset()
+        after_reset = engine.submit(stream, frame(engine))
+        try:
+            await failed
+        except RuntimeError:
+            pass
+        return await after_reset
+
+    assert asyncio.run(run()) == 0
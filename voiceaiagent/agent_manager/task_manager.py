@@ -13,7 +13,9 @@ import pytz
 
 import aiohttp
 
-from bolna.constants import ACCIDENTAL_INTERRUPTION_PHRASES, DEFAULT_USER_ONLINE_MESSAGE, DEFAULT_USER_ONLINE_MESSAGE_TRIGGER_DURATION, FILLER_DICT, DEFAULT_LANGUAGE_CODE, DEFAULT_TIMEZONE
+from bolna.constants import ACCIDENTAL_INTERRUPTION_PHRASES, DEFAULT_USER_ONLINE_MESSAGE, DEFAULT_USER_ONLINE_MESSAGE_TRIGGER_DURATION, FILLER_DICT, DEFAULT_LANGUAGE_CODE, DEFAULT_TIMEZONE, \
+    DEFAULT_MAX_BUFFERED_OUTPUT_SECONDS, DEFAULT_OUTPUT_PACING_LEAD_MS, DEFAULT_SPECULATIVE_STABILITY_MS, \
+    DEFAULT_CONTEXT_WINDOW_RECENT_TURNS
 from bolna.helpers.function_calling_helpers import trigger_api, computed_api_response
 from bolna.memory.cache.vector_cache import VectorCache
 from .base_manager import BaseManager
@@ -21,7 +23,18 @@ from bolna.agent_types import *
 from bolna.providers import *
 from bolna.prompts import *
 from bolna.helpers.utils import compute_function_pre_call_message, get_date_time_from_timezone, get_route_info, calculate_audio_duration, create_ws_data_packet, get_file_names_in_directory, get_raw_audio_bytes, is_valid_md5, \
-    get_required_input_types, format_messages, get_prompt_responses, resample, save_audio_file_to_s3, update_prompt_with_context, get_md5_hash, clean_json_string, wav_bytes_to_pcm, convert_to_request_log, yield_chunks_from_memory, process_task_cancellation
+    get_required_input_types, format_messages, get_prompt_responses, save_audio_file_to_s3, update_prompt_with_context, get_md5_hash, clean_json_string, convert_to_request_log, yield_chunks_from_memory, process_task_cancellation
+from bolna.helpers.audio_asset_store import get_audio_asset_store
+from bolna.helpers.output_credit_queue import OutputCreditQueue
+from bolna.helpers.audio_pacer import AudioPacer
+from bolna.helpers.call_recorder import CallRecorder
+from bolna.helpers.request_log_writer import close_request_log_writer
+from bolna.helpers.turn_tracer import TurnTracer
+from bolna.helpers.speculative_generation import SpeculativeGeneration
+from bolna.helpers.conversation_history import ConversationHistory
+from bolna.helpers.context_window import ContextWindow
+from bolna.helpers.metrics import get_call_metrics
+from bolna.helpers.loop_monitor import current_run_id
 from bolna.helpers.logger_config import configure_logger
 from semantic_router import Route
 from semantic_router.layer import RouteLayer
@@ -44,6 +57,7 @@ class TaskManager(BaseManager):
         self.llm_latencies = {'connection_latency_ms': None, 'turn_latencies': []}
         self.transcriber_latencies = {'connection_latency_ms': None, 'turn_latencies': []}
         self.synthesizer_latencies = {'connection_latency_ms': None, 'turn_latencies': []}
+        self.turn_tracer = TurnTracer()
 
         self.task_config = task
 
@@ -100,16 +114,7 @@ class TaskManager(BaseManager):
 
         # Recording
         self.should_record = False
-        self.conversation_recording = {
-            "input": {
-                'data': b'',
-                'started': time.time()
-            },
-            "output": [],
-            "metadata": {
-                "started": 0
-            }
-        }
+        self.conversation_recording = None
 
         self.welcome_message_audio = self.kwargs.pop('welcome_message_audio', None)
         self.observable_variables = {}
@@ -138,14 +143,17 @@ class TaskManager(BaseManager):
             else:
                 self.should_record = self.task_config["tools_config"]["output"]["provider"] == 'default' and self.enforce_streaming #In this case, this is a websocket connection and we should record
 
+            if self.should_record:
+                self.conversation_recording = CallRecorder()
+
             self.__setup_input_handlers(turn_based_conversation, input_queue, self.should_record)
         self.__setup_output_handlers(turn_based_conversation, output_queue)
 
         # Agent stuff
         # Need to maintain current conversation history and overall persona/history kinda thing.
         # Soon we will maintain a separate history for this
-        self.history = [] if conversation_history is None else conversation_history
-        self.interim_history = copy.deepcopy(self.history.copy())
+        self.history = ConversationHistory(conversation_history)
+        self.interim_history = ConversationHistory(self.history)
         logger.info(f'History {self.history}')
         self.label_flow = []
 
@@ -170,6 +178,13 @@ class TaskManager(BaseManager):
         self.llm_response_generated = False
         self.turn_id = 0
 
+        # Speculative LLM generation on stable interim transcripts
+        self.speculative_generation = False
+        self.speculation = None
+        self.speculation_timer_task = None
+        self.speculation_stats = {"started": 0, "promoted": 0, "discarded": 0, "wasted_prompt_tokens": 0,
+                                  "wasted_completion_tokens": 0}
+
         # Call conversations
         self.call_sid = None
         self.stream_sid = None
@@ -191,6 +206,7 @@ class TaskManager(BaseManager):
 
         self.llm_config_map = {}
         self.llm_agent_map = {}
+        self.context_windows = {}
         if self.__is_multiagent():
             for agent, config in self.task_config["tools_config"]["llm_agent"]['llm_config']['agent_map'].items():
                 self.llm_config_map[agent] = config.copy()
@@ -222,12 +238,15 @@ class TaskManager(BaseManager):
                     self.llm_config = {
                         "model": self.llm_agent_config['model'],
                         "max_tokens": self.llm_agent_config['max_tokens'],
-                        "provider": self.llm_agent_config['provider']
+                        "provider": self.llm_agent_config['provider'],
+                        "context_window_max_tokens": self.llm_agent_config.get('context_window_max_tokens')
                     }
 
         # Output stuff
         self.output_task = None
-        self.buffered_output_queue = asyncio.Queue()
+        self.audio_pacer = None
+        self.output_state_changed = asyncio.Event() # Set whenever anything the output loop's speaking delay depends on changes
+        self.buffered_output_queue = OutputCreditQueue(DEFAULT_MAX_BUFFERED_OUTPUT_SECONDS, self.__get_output_message_duration)
 
         # Memory
         self.cache = cache
@@ -256,7 +275,16 @@ class TaskManager(BaseManager):
             self.nitro = True
             self.conversation_config = task.get("task_config", {})
             logger.info(f"Conversation config {self.conversation_config}")
+            # null in the task config means the default, has_credit() compares against it on every chunk
+            self.buffered_output_queue.max_buffered_seconds = self.conversation_config.get("max_buffered_output_seconds") or DEFAULT_MAX_BUFFERED_OUTPUT_SECONDS
+            output_pacing_lead_ms = self.conversation_config.get("output_pacing_lead_ms")
+            if output_pacing_lead_ms is None:  # null in the task config means the default, 0 turns pacing off
+                output_pacing_lead_ms = DEFAULT_OUTPUT_PACING_LEAD_MS
+            if self.tools["output"].get_provider() in SUPPORTED_OUTPUT_TELEPHONY_HANDLERS.keys() and output_pacing_lead_ms > 0:
+                self.audio_pacer = AudioPacer(output_pacing_lead_ms / 1000)
             self.generate_precise_transcript = self.conversation_config.get('generate_precise_transcript', False)
+            self.speculative_generation = self.conversation_config.get("speculative_generation", False)
+            self.speculative_stability_ms = self.conversation_config.get("speculative_stability_ms", DEFAULT_SPECULATIVE_STABILITY_MS)
 
             self.trigger_user_online_message_after = self.conversation_config.get("trigger_user_online_message_after", DEFAULT_USER_ONLINE_MESSAGE_TRIGGER_DURATION)
             self.check_if_user_online = self.conversation_config.get("check_if_user_online", True)
@@ -344,6 +372,7 @@ class TaskManager(BaseManager):
                     #self.num_files = list_number_of_wav_files_in_directory(self.backchanneling_audios)
                     try:
                         self.filenames = get_file_names_in_directory(self.backchanneling_audios)
+                        get_audio_asset_store().load_directory(self.backchanneling_audios)
                         logger.info(f"Backchanneling audio location {self.backchanneling_audios}")
                     except Exception as e:
                         logger.error(f"Something went wrong an putting should backchannel to false {e}")
@@ -371,6 +400,7 @@ class TaskManager(BaseManager):
                     logger.info("Not using fillers to decrease latency")
                 else:
                     self.filler_preset_directory = f"{os.getenv('FILLERS_PRESETS_DIR')}/{self.synthesizer_voice.lower()}"
+                    get_audio_asset_store().load_directory(self.filler_preset_directory)
 
         # setting transcriber
         self.__setup_transcriber()
@@ -390,6 +420,7 @@ class TaskManager(BaseManager):
                 'agent_type': self.llm_agent_config.get("agent_type","simple_llm_agent")
             }
             self.__setup_tasks(**agent_params)
+            self.__setup_context_window(None, self.llm_config, agent_params['agent_type'])
 
         elif self.__is_multiagent():
             # Setup task for multiagent conversation
@@ -405,6 +436,7 @@ class TaskManager(BaseManager):
                 }
                 llm_agent = self.__setup_tasks(**agent_params)
                 self.llm_agent_map[agent] = llm_agent
+                self.__setup_context_window(agent, self.llm_config_map[agent], agent_type)
 
         elif self.task_config["task_type"] == "webhook":
             if "webhookURL" in self.task_config["tools_config"]["api_tools"]:
@@ -532,6 +564,7 @@ class TaskManager(BaseManager):
 
                 input_kwargs["observable_variables"] = self.observable_variables
             self.tools["input"] = input_handler_class(**input_kwargs)
+            self.tools["input"].turn_tracer = self.turn_tracer
         else:
             raise "Other input handlers not supported yet"
 
@@ -650,6 +683,24 @@ class TaskManager(BaseManager):
             self.summarized_data = None
         logger.info("prompt and config setup completed")
 
+    def __setup_context_window(self, agent, llm_config, agent_type):
+        # Only agents that send the whole history to the LLM need it bounded
+        if not self._is_conversation_task() or agent_type != "simple_llm_agent":
+            return
+        max_tokens = llm_config.get("context_window_max_tokens") or self.conversation_config.get("context_window_max_tokens")
+        if not max_tokens:
+            return
+        recent_turns = self.conversation_config.get("context_window_recent_turns", DEFAULT_CONTEXT_WINDOW_RECENT_TURNS)
+        summarizer = SummarizationContextualAgent(self.__setup_llm(llm_config))
+        logger.info(f"Keeping the prompt of agent {agent} within {max_tokens} tokens, last {recent_turns} turns verbatim")
+        self.context_windows[agent] = ContextWindow(llm_config["model"], max_tokens, recent_turns, summarizer)
+
+    def __get_context_messages(self, agent=None):
+        """This turn's messages for agent, the history bounded by its context window if it has one."""
+        if agent not in self.context_windows:
+            return self.history.snapshot()
+        return self.context_windows[agent].get_messages(self.history)
+
 
     ########################
     # Helper methods
@@ -731,16 +782,14 @@ class TaskManager(BaseManager):
                 'content': ""
             }
 
-        if len(self.system_prompt['content']) == 0:
-            self.history = [] if len(self.history) == 0 else self.history
-        else:
-            self.history = [self.system_prompt] if len(self.history) == 0 else [self.system_prompt] + self.history
+        if len(self.system_prompt['content']) != 0:
+            self.history = ConversationHistory([self.system_prompt, *self.history])
 
         #If history is empty and agent welcome message is not empty add it to history
         if task_id == 0 and len(self.history) == 1 and len(self.kwargs['agent_welcome_message']) != 0:
             self.history.append({'role': 'assistant', 'content': self.kwargs['agent_welcome_message']})
 
-        self.interim_history = copy.deepcopy(self.history)
+        self.interim_history = ConversationHistory(self.history)
 
     def __prefill_prompts(self, task, prompt, task_type):
         if self.context_data and 'recipient_data' in self.context_data and self.context_data[
@@ -817,10 +866,10 @@ class TaskManager(BaseManager):
                 spoken_so_far = self.get_partial_combined_text(cleared_mark_events_data, diff_ts)
 
                 if self.history[-1]['role'] == 'assistant':
-                    self.history[-1]['content'] = self.update_transcript_for_interruption(self.history[-1]['content'], spoken_so_far)
+                    self.history.update(-1, content=self.update_transcript_for_interruption(self.history[-1]['content'], spoken_so_far))
 
                 if self.interim_history[-1]['role'] == 'assistant':
-                    self.interim_history[-1]['content'] = self.update_transcript_for_interruption(self.interim_history[-1]['content'], spoken_so_far)
+                    self.interim_history.update(-1, content=self.update_transcript_for_interruption(self.interim_history[-1]['content'], spoken_so_far))
 
     async def __cleanup_downstream_tasks(self):
         current_ts = time.time()
@@ -828,6 +877,8 @@ class TaskManager(BaseManager):
         start_time = time.time()
         await self.tools["synthesizer"].handle_interruption()
         await self.tools["output"].handle_interruption()
+        if self.audio_pacer is not None:
+            self.audio_pacer.reset()
 
         if self.generate_precise_transcript:
             await self.sync_history(self.mark_event_meta_data.fetch_cleared_mark_event_data().items(), current_ts)
@@ -861,7 +912,7 @@ class TaskManager(BaseManager):
         logger.info(f"Synth Task cancelled seconds")
         if not self.buffered_output_queue.empty():
             logger.info(f"Output queue was not empty and hence emptying it")
-            self.buffered_output_queue = asyncio.Queue()
+            self.buffered_output_queue.clear()
 
         #restart output task
         self.output_task = asyncio.create_task(self.__process_output_loop())
@@ -1036,7 +1087,7 @@ class TaskManager(BaseManager):
 
     async def _process_conversation_preprocessed_task(self, message, sequence, meta_info):
         if self.task_config["tools_config"]["llm_agent"]['agent_flow_type'] == "preprocessed":
-            messages = copy.deepcopy(self.history)
+            messages = self.history.snapshot()
             # TODO revisit this
             messages.append({'role': 'user', 'content': message['data']})
             logger.info(f"Starting LLM Agent {messages}")
@@ -1055,7 +1106,7 @@ class TaskManager(BaseManager):
                         self._synthesize(create_ws_data_packet(next_state['audio'], meta_info, is_md5_hash=True))))
             logger.info(f"Interim history after the LLM task {messages}")
             self.llm_response_generated = True
-            self.interim_history = copy.deepcopy(messages)
+            self.interim_history = ConversationHistory(messages)
             # if self.callee_silent:
             #     logger.info("When we got utterance end, maybe LLM was still generating response. So, copying into history")
             #     self.history = copy.deepcopy(self.interim_history)
@@ -1086,7 +1137,7 @@ class TaskManager(BaseManager):
         start_time = time.perf_counter()
         filler_class = self.filler_classifier.classify(message['data'])
         logger.info(f"doing the classification task in {time.perf_counter() - start_time}")
-        new_meta_info = copy.deepcopy(meta_info)
+        new_meta_info = meta_info.derive()
         self.current_filler = filler_class
         should_bypass_synth = 'bypass_synth' in meta_info and meta_info['bypass_synth'] == True
         filler = random.choice((FILLER_DICT[filler_class]))
@@ -1201,19 +1252,21 @@ class TaskManager(BaseManager):
             else:
                 messages.append({"role": "assistant", "content": llm_response})
                 self.history.append({"role": "assistant", "content": llm_response})
-                self.interim_history = copy.deepcopy(messages)
+                self.interim_history = ConversationHistory(messages)
                 # if self.callee_silent:
                 #     logger.info("##### When we got utterance end, maybe LLM was still generating response. So, copying into history")
                 #     self.history = copy.deepcopy(self.interim_history)
                 #self.__update_transcripts()
 
-    async def __do_llm_generation(self, messages, meta_info, next_step, should_bypass_synth=False, should_trigger_function_call=False):
+    async def __do_llm_generation(self, messages, meta_info, next_step, should_bypass_synth=False, should_trigger_function_call=False, llm_stream=None):
         llm_response, function_tool, function_tool_message = '', '', ''
         synthesize = True
         if should_bypass_synth:
             synthesize = False
 
-        async for llm_message in self.tools['llm_agent'].generate(messages, synthesize=synthesize, meta_info=meta_info):
+        if llm_stream is None:
+            llm_stream = self.tools['llm_agent'].generate(messages, synthesize=synthesize, meta_info=meta_info)
+        async for llm_message in llm_stream:
             data, end_of_llm_stream, latency, trigger_function_call, function_tool, function_tool_message = llm_message
 
             if trigger_function_call:
@@ -1225,10 +1278,12 @@ class TaskManager(BaseManager):
                 self.llm_latencies['turn_latencies'].append(latency)
 
             llm_response += " " + data
+            self.turn_tracer.end_span(meta_info.get('sequence_id'), "llm_first_token")
 
             logger.info(f"Got a response from LLM {llm_response}")
             if end_of_llm_stream:
                 meta_info["end_of_llm_stream"] = True
+                self.turn_tracer.end_span(meta_info.get('sequence_id'), "llm_completion")
 
             if self.stream:
                 text_chunk = self.__process_stop_words(data, meta_info)
@@ -1241,7 +1296,7 @@ class TaskManager(BaseManager):
                     logger.info("Got a pre function call message")
                     messages.append({'role':'assistant', 'content': filler_message})
                     self.history.append({'role': 'assistant', 'content': filler_message})
-                    self.interim_history = copy.deepcopy(messages)
+                    self.interim_history = ConversationHistory(messages)
 
                 await self._handle_llm_output(next_step, text_chunk, should_bypass_synth, meta_info)
             else:
@@ -1256,11 +1311,14 @@ class TaskManager(BaseManager):
         if self.stream and llm_response != filler_message:
             self.__store_into_history(meta_info, messages, llm_response, should_trigger_function_call= should_trigger_function_call)
 
-    async def _process_conversation_task(self, message, sequence, meta_info):
+    async def _process_conversation_task(self, message, sequence, meta_info, speculation=None):
         should_bypass_synth = 'bypass_synth' in meta_info and meta_info['bypass_synth'] is True
         next_step = self._get_next_step(sequence, "llm")
-        meta_info['llm_start_time'] = time.time()
+        meta_info['llm_start_time'] = time.time() if speculation is None else speculation.started_at
+        self.turn_tracer.start_span(meta_info.get('sequence_id'), "llm_first_token", meta_info['llm_start_time'])
+        self.turn_tracer.start_span(meta_info.get('sequence_id'), "llm_completion", meta_info['llm_start_time'])
         route = None
+        current_agent = None
 
         if self.__is_multiagent():
             tasks = [(lambda: get_route_info(message['data'], self.agent_routing))]
@@ -1290,10 +1348,10 @@ class TaskManager(BaseManager):
                 cache_response = self.route_responses_dict[route][relevant_utterance]
                 convert_to_request_log(message=message['data'], meta_info=meta_info, component="llm", direction="request", model=self.llm_config["model"], run_id=self.run_id)
                 convert_to_request_log(message=message['data'], meta_info=meta_info, component="llm", direction="response", model=self.llm_config["model"], is_cached=True, run_id= self.run_id)
-                messages = copy.deepcopy(self.history)
+                messages = self.history.snapshot()
                 # TODO revisit this
-                messages += [{'role': 'user', 'content': message['data']},{'role': 'assistant', 'content': cache_response}]
-                self.interim_history = copy.deepcopy(messages)
+                messages.extend([{'role': 'user', 'content': message['data']},{'role': 'assistant', 'content': cache_response}])
+                self.interim_history = ConversationHistory(messages)
                 self.llm_response_generated = True
                 # if self.callee_silent:
                 #     logger.info("##### When we got utterance end, maybe LLM was still generating response. So, copying into history")
@@ -1312,12 +1370,18 @@ class TaskManager(BaseManager):
         else:
             if self.turn_based_conversation:
                 self.history.append({"role": "user", "content": message['data']})
-            messages = copy.deepcopy(self.history)
+            llm_stream = None
+            if speculation is not None:
+                # The request already went out on the interim transcript, carry on from what it has produced so far
+                messages = speculation.messages
+                llm_stream = speculation.replay()
+            else:
+                messages = self.__get_context_messages(current_agent)
             # messages.append({'role': 'user', 'content': message['data']})
             ### TODO CHECK IF THIS IS EVEN REQUIRED
             convert_to_request_log(message=format_messages(messages, use_system_prompt=True), meta_info=meta_info, component="llm", direction="request", model=self.llm_config["model"], run_id= self.run_id)
 
-            await self.__do_llm_generation(messages, meta_info, next_step, should_bypass_synth)
+            await self.__do_llm_generation(messages, meta_info, next_step, should_bypass_synth, llm_stream=llm_stream)
             # TODO : Write a better check for completion prompt
 
             if self.agent_type not in ["graph_agent", "knowledgebase_agent"]:
@@ -1373,14 +1437,14 @@ class TaskManager(BaseManager):
                 logger.error(f"Something went wrong with LLM queue {e}")
                 break
 
-    async def _run_llm_task(self, message):
+    async def _run_llm_task(self, message, speculation=None):
         sequence, meta_info = self._extract_sequence_and_meta(message)
 
         try:
             if self._is_extraction_task() or self._is_summarization_task():
                 await self._process_followup_task(message)
             elif self._is_conversation_task():
-                await self._process_conversation_task(message, sequence, meta_info)
+                await self._process_conversation_task(message, sequence, meta_info, speculation)
             else:
                 logger.error("unsupported task type: {}".format(self.task_config["task_type"]))
             self.llm_task = None
@@ -1408,7 +1472,7 @@ class TaskManager(BaseManager):
             skip_append_to_data = False
         return sequence
 
-    async def _handle_transcriber_output(self, next_task, transcriber_message, meta_info):
+    async def _handle_transcriber_output(self, next_task, transcriber_message, meta_info, speculation=None):
         self.history.append({"role": "user", "content": transcriber_message})
 
         convert_to_request_log(message=transcriber_message, meta_info= meta_info, model = "deepgram", run_id= self.run_id)
@@ -1417,7 +1481,7 @@ class TaskManager(BaseManager):
             meta_info["origin"] = "transcriber"
             transcriber_package = create_ws_data_packet(transcriber_message, meta_info)
             self.llm_task = asyncio.create_task(
-                self._run_llm_task(transcriber_package))
+                self._run_llm_task(transcriber_package, speculation))
             if self.use_fillers:
                 self.filler_task = asyncio.create_task(self.__filler_classification_task(transcriber_package))
 
@@ -1427,6 +1491,77 @@ class TaskManager(BaseManager):
         else:
             logger.info(f"Need to separate out output task")
 
+    def __can_speculate(self):
+        return self.stream and self._is_conversation_task() and self.agent_type == "simple_llm_agent" and \
+            not self.__is_multiagent() and self.route_layer is None and not self.hangup_triggered and \
+            not self.conversation_ended and not self.tools["input"].is_audio_being_played_to_user() and \
+            (self.llm_task is None or self.llm_task.done())
+
+    def __schedule_speculation(self, utterance, meta_info):
+        # Restarted on every new interim result, so it only fires once the utterance stopped changing
+        if self.speculation_timer_task is not None:
+            self.speculation_timer_task.cancel()
+        self.speculation_timer_task = asyncio.create_task(self.__speculate_when_stable(utterance, meta_info))
+
+    async def __speculate_when_stable(self, utterance, meta_info):
+        await asyncio.sleep(self.speculative_stability_ms / 1000)
+        if self.speculation is not None:
+            if self.speculation.matches(utterance):
+                return
+            self.__discard_speculation()
+        if not self.__can_speculate():
+            return
+
+        # A shadow sequence: it is not in sequence_ids until promoted, so none of it can reach the caller before that
+        self.curr_sequence_id += 1
+        speculative_meta_info = meta_info.derive(sequence_id=self.curr_sequence_id, turn_id=self.turn_id, origin="transcriber")
+        messages = self.__get_context_messages()
+        messages.append({"role": "user", "content": utterance})
+        logger.info(f"Starting speculative generation on interim transcript {utterance}")
+        self.speculation = SpeculativeGeneration(utterance, messages, speculative_meta_info, self.tools['llm_agent'].generate(
+            messages, synthesize=True, meta_info=speculative_meta_info))
+        self.speculation_stats["started"] += 1
+
+    def __take_speculation(self, transcript):
+        """The speculative generation to continue for this final transcript, None (discarding it) if it diverged."""
+        if self.speculation_timer_task is not None:
+            self.speculation_timer_task.cancel()
+            self.speculation_timer_task = None
+        speculation = self.speculation
+        if speculation is None:
+            return None
+        if not speculation.matches(transcript):
+            logger.info(f"Final transcript {transcript} diverged from speculative one {speculation.transcript}")
+            self.__discard_speculation()
+            return None
+        logger.info(f"Promoting speculative generation for sequence id {speculation.meta_info['sequence_id']}")
+        self.speculation = None
+        self.speculation_stats["promoted"] += 1
+        get_call_metrics().speculative_generations.labels("promoted").inc()
+        return speculation
+
+    def __discard_speculation(self):
+        speculation, self.speculation = self.speculation, None
+        if speculation is None:
+            return None
+        self.speculation_stats["discarded"] += 1
+        get_call_metrics().speculative_generations.labels("discarded").inc()
+        return asyncio.create_task(self.__account_discarded_speculation(speculation))
+
+    async def __account_discarded_speculation(self, speculation):
+        await speculation.cancel()
+        # tokenizing the whole prompt is O(history), keep it off the event loop
+        prompt_tokens, completion_tokens = await asyncio.get_running_loop().run_in_executor(
+            None, speculation.count_tokens, self.llm_config["model"])
+        self.speculation_stats["wasted_prompt_tokens"] += prompt_tokens
+        self.speculation_stats["wasted_completion_tokens"] += completion_tokens
+        get_call_metrics().speculative_wasted_tokens.labels("prompt").inc(prompt_tokens)
+        get_call_metrics().speculative_wasted_tokens.labels("completion").inc(completion_tokens)
+
+    def __get_speculation_stats(self):
+        resolved = self.speculation_stats["promoted"] + self.speculation_stats["discarded"]
+        return dict(self.speculation_stats, hit_rate=round(self.speculation_stats["promoted"] / resolved, 3) if resolved else None)
+
     async def _listen_transcriber(self):
         temp_transcriber_message = ""
         try:
@@ -1457,6 +1592,7 @@ class TaskManager(BaseManager):
                     # Whenever interim results would be received from Deepgram, this condition would get triggered
                     elif isinstance(message.get("data"), dict) and message["data"].get("type", "") == "interim_transcript_received":
                         self.time_since_last_spoken_human_word = time.time()
+                        self.turn_tracer.note_user_speech(self.time_since_last_spoken_human_word)
                         if temp_transcriber_message == message["data"].get("content"):
                             logger.info("Received the same transcript as the previous one we have hence continuing")
                             continue
@@ -1477,6 +1613,7 @@ class TaskManager(BaseManager):
                             if interim_transcript_len > self.number_of_words_for_interruption or \
                                     message["data"].get("content").strip() in self.accidental_interruption_phrases:
                                 logger.info(f"Condition for interruption hit")
+                                get_call_metrics().interruptions.inc()
                                 self.turn_id += 1
                                 self.tools["input"].update_is_audio_being_played(False)
                                 await self.__cleanup_downstream_tasks()
@@ -1492,6 +1629,10 @@ class TaskManager(BaseManager):
                         # TODO check where this needs to be added post understanding it's usage
                         self.let_remaining_audio_pass_through = False
                         self.llm_response_generated = False
+                        self.output_state_changed.set()
+
+                        if self.speculative_generation and next_task == "llm":
+                            self.__schedule_speculation(message["data"].get("utterance", message["data"].get("content")), meta_info)
 
                     # Whenever speech_final or UtteranceEnd is received from Deepgram, this condition would get triggered
                     elif isinstance(message.get("data"), dict) and message["data"].get("type", "") == "transcript":
@@ -1502,6 +1643,11 @@ class TaskManager(BaseManager):
                             logger.info(f"Continuing the loop and ignoring the transcript received ({message['data'].get('content')}) in speech final as it is false interruption")
                             continue
 
+                        transcript_received_at = time.time()
+                        # The turn starts when the user stopped talking, i.e. the last interim result of this utterance.
+                        # Transcribers without interim results (bodhi, whisper) only have the final transcript to go by
+                        speech_ended_at = self.turn_tracer.take_speech_end(transcript_received_at)
+
                         self.callee_speaking = False
                         # self.callee_silent = True
                         temp_transcriber_message = ""
@@ -1521,10 +1667,19 @@ class TaskManager(BaseManager):
                         self.time_since_first_interim_result = -1
                         self.required_delay_before_speaking = max(
                             self.minimum_wait_duration - self.incremental_delay, 0)
+                        self.output_state_changed.set()
 
                         transcriber_message = message["data"].get("content")
-                        meta_info = self.__get_updated_meta_info(meta_info)
-                        await self._handle_transcriber_output(next_task, transcriber_message, meta_info)
+                        speculation = self.__take_speculation(transcriber_message) if self.speculative_generation else None
+                        if speculation is not None:
+                            # Promote the shadow sequence the speculative response was generated under
+                            meta_info = meta_info.derive(sequence_id=speculation.meta_info["sequence_id"], turn_id=self.turn_id)
+                            self.sequence_ids.add(meta_info["sequence_id"])
+                        else:
+                            meta_info = self.__get_updated_meta_info(meta_info)
+                        self.turn_tracer.start_turn(meta_info["sequence_id"], self.turn_id, start_time=speech_ended_at)
+                        self.turn_tracer.end_span(meta_info["sequence_id"], "endpointing", transcript_received_at)
+                        await self._handle_transcriber_output(next_task, transcriber_message, meta_info, speculation)
 
                     elif message["data"] == "transcriber_connection_closed":
                         logger.info(f"Transcriber connection has been closed")
@@ -1546,6 +1701,7 @@ class TaskManager(BaseManager):
 
     async def __process_http_transcription(self, message):
         meta_info = self.__get_updated_meta_info(message["meta_info"])
+        self.turn_tracer.start_turn(meta_info["sequence_id"], self.turn_id)
 
         sequence = message["meta_info"].get('sequence', meta_info['sequence_id'])
         next_task = self._get_next_step(sequence, "transcriber")
@@ -1557,9 +1713,16 @@ class TaskManager(BaseManager):
     #################################################################
     # Synthesizer task
     #################################################################
+    def __get_output_message_duration(self, message):
+        data = message.get("data")
+        if not isinstance(data, (bytes, bytearray)):
+            return 0
+        return calculate_audio_duration(len(data), self.sampling_rate, format=message["meta_info"].get("format", "wav"))
+
     def __enqueue_chunk(self, chunk, i, number_of_chunks, meta_info):
-        meta_info['chunk_id'] = i
-        copied_meta_info = copy.deepcopy(meta_info)
+        packet = create_ws_data_packet(chunk, meta_info)
+        copied_meta_info = packet["meta_info"]
+        copied_meta_info['chunk_id'] = i
         if i == 0 and "is_first_chunk" in meta_info and meta_info["is_first_chunk"]:
             logger.info("Sending first chunk")
             copied_meta_info["is_first_chunk_of_entire_response"] = True
@@ -1573,7 +1736,7 @@ class TaskManager(BaseManager):
             copied_meta_info["is_first_chunk_of_entire_response"] = True
             copied_meta_info["is_final_chunk_of_entire_response"] = True
 
-        self.buffered_output_queue.put_nowait(create_ws_data_packet(chunk, copied_meta_info))
+        self.buffered_output_queue.put_nowait(packet)
 
     def is_sequence_id_in_current_ids(self, sequence_id):
         return sequence_id in self.sequence_ids
@@ -1592,18 +1755,18 @@ class TaskManager(BaseManager):
                         if is_first_message or (not self.conversation_ended and sequence_id in self.sequence_ids):
                             logger.info(f"Processing message with sequence_id: {sequence_id}")
 
+                            self.turn_tracer.end_span(sequence_id, "tts_first_byte")
                             if self.stream:
-                                if meta_info.get("is_first_chunk", False):
-                                    first_chunk_generation_timestamp = time.time()
-
                                 if self.tools["output"].process_in_chunks(self.yield_chunks):
                                     number_of_chunks = math.ceil(len(message['data']) / self.output_chunk_size)
                                     for chunk_idx, chunk in enumerate(
                                             yield_chunks_from_memory(message['data'], chunk_size=self.output_chunk_size)
                                     ):
+                                        # Back pressure: only run ahead of the output loop by max_buffered_seconds of audio
+                                        await self.buffered_output_queue.wait_for_credit()
                                         self.__enqueue_chunk(chunk, chunk_idx, number_of_chunks, meta_info)
                                 else:
-                                    self.buffered_output_queue.put_nowait(message)
+                                    await self.buffered_output_queue.put(message)
                             else:
                                 # Non-streaming output
                                 logger.info("Stream not enabled, sending entire audio")
@@ -1624,7 +1787,7 @@ class TaskManager(BaseManager):
                             logger.info(f"Skipping message with sequence_id: {sequence_id}")
 
                         # Give control to other tasks
-                        await asyncio.sleep(0.2)
+                        await asyncio.sleep(0)
 
                 except asyncio.CancelledError:
                     logger.info("Synthesizer task was cancelled.")
@@ -1645,7 +1808,7 @@ class TaskManager(BaseManager):
             await self.tools["synthesizer"].cleanup()
 
     async def __send_preprocessed_audio(self, meta_info, text):
-        meta_info = copy.deepcopy(meta_info)
+        meta_info = meta_info.derive()
         yield_in_chunks = self.yield_chunks
         try:
             #TODO: Either load IVR audio into memory before call or user s3 iter_cunks
@@ -1662,12 +1825,10 @@ class TaskManager(BaseManager):
                 await self.tools["output"].handle(create_ws_data_packet(audio_chunk, meta_info))
             else:
                 if meta_info.get('message_category', None ) == 'filler':
-                    logger.info(f"Getting {text} filler from local fs")
-                    audio = await get_raw_audio_bytes(f'{self.filler_preset_directory}/{text}.wav', local= True, is_location=True)
+                    logger.info(f"Getting {text} filler from the audio asset store")
                     yield_in_chunks = False
                     if not self.turn_based_conversation and self.task_config['tools_config']['output'] != "default":
-                        logger.info(f"Got to convert it to pcm")
-                        audio_chunk = wav_bytes_to_pcm(resample(audio, format = "wav", target_sample_rate = 8000 ))
+                        audio_chunk = get_audio_asset_store().get(f'{self.filler_preset_directory}/{text}.wav', audio_format="pcm", sample_rate=8000)
                         meta_info["format"] = "pcm"
                 else:
                     start_time = time.perf_counter()
@@ -1677,7 +1838,7 @@ class TaskManager(BaseManager):
                     logger.info(f"Time to get response from S3 {time.perf_counter() - start_time }")
                     if not self.buffered_output_queue.empty():
                         logger.info(f"Output queue was not empty and hence emptying it")
-                        self.buffered_output_queue = asyncio.Queue()
+                        self.buffered_output_queue.clear()
                     meta_info["format"] = "pcm"
                     if 'message_category' in meta_info and meta_info['message_category'] == "agent_welcome_message":
                         if audio_chunk is None:
@@ -1711,6 +1872,7 @@ class TaskManager(BaseManager):
         text = message["data"]
         meta_info["type"] = "audio"
         meta_info["synthesizer_start_time"] = time.time()
+        self.turn_tracer.start_span(meta_info.get("sequence_id"), "tts_first_byte", meta_info["synthesizer_start_time"])
         try:
             if not self.conversation_ended and ('is_first_message' in meta_info and meta_info['is_first_message'] or message["meta_info"]["sequence_id"] in self.sequence_ids):
                 if meta_info["is_md5_hash"]:
@@ -1748,6 +1910,7 @@ class TaskManager(BaseManager):
         next_task = self._get_next_step(sequence, "transcriber")
         await self._handle_transcriber_output(next_task, message, meta_info)
         self.time_since_first_interim_result = (time.time() * 1000) - 1000
+        self.output_state_changed.set()
 
     """
     When the welcome message is playing we accumulate the transcript in the self.transcriber_message variable and once 
@@ -1770,45 +1933,60 @@ class TaskManager(BaseManager):
 
     #Currently this loop only closes in case of interruption
     # but it shouldn't be the case.
+    def __get_remaining_delay_before_speaking(self):
+        """Seconds the output loop still has to hold audio back since the first interim result, 0 if it can speak."""
+        if not self.let_remaining_audio_pass_through and not self.tools["input"].welcome_message_played():
+            return 0
+        if self.time_since_first_interim_result == -1:
+            return 0
+        time_since_first_interim_result = (time.time() * 1000) - self.time_since_first_interim_result
+        return max(self.required_delay_before_speaking - time_since_first_interim_result, 0) / 1000
+
+    async def __wait_until_allowed_to_speak(self):
+        # Sleep until either the required delay runs out or the transcript state changes, instead of polling
+        while True:
+            remaining_delay = self.__get_remaining_delay_before_speaking()
+            if remaining_delay <= 0:
+                return
+            logger.info(f"##### Holding audio for {round(remaining_delay * 1000)} ms, required delay before speaking is {self.required_delay_before_speaking}")
+            self.output_state_changed.clear()
+            try:
+                await asyncio.wait_for(self.output_state_changed.wait(), timeout=remaining_delay)
+            except asyncio.TimeoutError:
+                pass
+
     async def __process_output_loop(self):
         try:
             while True:
-                if (not self.let_remaining_audio_pass_through) and self.tools["input"].welcome_message_played():
-                    time_since_first_interim_result = (time.time() * 1000) - self.time_since_first_interim_result if self.time_since_first_interim_result != -1 else -1
-                    logger.info(f"##### It's been {time_since_first_interim_result} ms since first  interim result and required time to wait for it is {self.required_delay_before_speaking}. Hence sleeping for 100ms. self.time_since_first_interim_result {self.time_since_first_interim_result}")
-                    if time_since_first_interim_result != -1 and time_since_first_interim_result < self.required_delay_before_speaking:
-                        await asyncio.sleep(0.1) #sleep for 100ms and continue
-                        continue
-                    else:
-                        logger.info(f"First interim result hasn't been gotten yet and hence sleeping ")
-                        await asyncio.sleep(0.1)
-
-                    logger.info(f"##### Got to wait {self.required_delay_before_speaking} ms before speaking and alreasy waited {time_since_first_interim_result} since the first interim result")
-
-                elif self.let_remaining_audio_pass_through:
-                    time_since_first_interim_result = (time.time() *1000)- self.time_since_first_interim_result if self.time_since_first_interim_result != -1 else -1
-                    logger.info(f"##### In elif been {time_since_first_interim_result} ms since first  interim result and required time to wait for it is {self.required_delay_before_speaking}. Hence sleeping for 100ms. self.time_since_first_interim_result {self.time_since_first_interim_result}")
-                    if time_since_first_interim_result != -1 and time_since_first_interim_result < self.required_delay_before_speaking:
-                        await asyncio.sleep(0.1) #sleep for 100ms and continue
-                        continue
-                else:
-                    logger.info(f"Started transmitting at {time.time()}")
-
                 message = await self.buffered_output_queue.get()
+                await self.__wait_until_allowed_to_speak()
+                logger.info(f"Started transmitting at {time.time()}")
 
                 logger.info("Start response is True and hence starting to speak {} Current sequence ids {}".format(message['meta_info'], self.sequence_ids))
                 if "end_of_conversation" in message['meta_info']:
                     await self.__process_end_of_conversation()
 
                 if 'sequence_id' in message['meta_info'] and message["meta_info"]["sequence_id"] in self.sequence_ids:
-                    self.tools["input"].update_is_audio_being_played(True)
-                    await self.tools["output"].handle(message)
                     try:
                         duration = calculate_audio_duration(len(message["data"]), self.sampling_rate, format = message['meta_info']['format'])
-                        self.conversation_recording['output'].append({'data': message['data'], "start_time": time.time(), "duration": duration})
                     except Exception as e:
                         duration = 0.256
                         logger.info("Exception in __process_output_loop: {}".format(str(e)))
+
+                    if self.audio_pacer is not None:
+                        # Don't run more than the configured lead ahead of what the caller is actually hearing
+                        await self.audio_pacer.wait_for_slot()
+
+                    self.tools["input"].update_is_audio_being_played(True)
+                    await self.tools["output"].handle(message)
+                    self.turn_tracer.end_span(message["meta_info"]["sequence_id"], "first_audio_sent")
+                    if self.audio_pacer is not None:
+                        self.audio_pacer.on_sent(duration)
+                    try:
+                        if self.conversation_recording is not None:
+                            self.conversation_recording.record_output(message['data'], message['meta_info'].get('format', 'wav'))
+                    except Exception as e:
+                        logger.info("Exception in __process_output_loop: {}".format(str(e)))
                 else:
                     logger.info(f'{message["meta_info"]["sequence_id"]} is not in {self.sequence_ids} and hence not speaking')
                     continue
@@ -1907,10 +2085,11 @@ class TaskManager(BaseManager):
             if self.callee_speaking and time.time() - self.callee_speaking_start_time > self.backchanneling_start_delay:
                 filename = random.choice(self.filenames)
                 logger.info(f"Should send a random backchanneling words and sending them {filename}")
-                audio = await get_raw_audio_bytes(f"{self.backchanneling_audios}/{filename}", local= True, is_location=True)
+                audio_location = f"{self.backchanneling_audios}/{filename}"
                 if not self.turn_based_conversation and self.task_config['tools_config']['output'] != "default":
-                    audio = resample(audio, target_sample_rate= 8000, format="wav")
-                    audio = wav_bytes_to_pcm(audio)
+                    audio = get_audio_asset_store().get(audio_location, audio_format="pcm", sample_rate=8000)
+                else:
+                    audio = await get_raw_audio_bytes(audio_location, local= True, is_location=True)
                 await self.tools["output"].handle(create_ws_data_packet(audio, self.__get_updated_meta_info()))
             else:
                 logger.info(f"Callee isn't speaking and hence not sending or {time.time() - self.callee_speaking_start_time} is not greater than {self.backchanneling_start_delay}")
@@ -1968,10 +2147,11 @@ class TaskManager(BaseManager):
 
     async def __start_transmitting_ambient_noise(self):
         try:
-            audio = await get_raw_audio_bytes(f'{os.getenv("AMBIENT_NOISE_PRESETS_DIR")}/{self.soundtrack}', local=True, is_location=True)
-            audio = resample(audio, self.sampling_rate, format = "wav")
+            audio_location = f'{os.getenv("AMBIENT_NOISE_PRESETS_DIR")}/{self.soundtrack}'
             if self.task_config["tools_config"]["output"]["provider"] in SUPPORTED_OUTPUT_TELEPHONY_HANDLERS.keys():
-                audio = wav_bytes_to_pcm(audio)
+                audio = get_audio_asset_store().get(audio_location, audio_format="pcm", sample_rate=self.sampling_rate)
+            else:
+                audio = get_audio_asset_store().get(audio_location, audio_format="wav", sample_rate=self.sampling_rate)
             logger.info(f"Length of audio {len(audio)} {self.sampling_rate}")
             # TODO whenever this feature is redone ensure to have a look at the metadata of other messages which have the sequence_id of -1. Fields such as end_of_synthesizer_stream and end_of_llm_stream would need to be added here
             if self.should_record:
@@ -2013,7 +2193,7 @@ class TaskManager(BaseManager):
                 system_prompt = self.system_prompt['content']
                 system_prompt = update_prompt_with_context(system_prompt, self.context_data)
                 self.system_prompt['content'] = system_prompt
-                self.history[0]['content'] = system_prompt
+                self.history.update(0, content=system_prompt)
 
             if self.call_hangup_message and self.context_data:
                 self.call_hangup_message = update_prompt_with_context(self.call_hangup_message, self.context_data)
@@ -2023,7 +2203,7 @@ class TaskManager(BaseManager):
             logger.info(f"Updated agent welcome message after context data replacement - {agent_welcome_message}")
             self.kwargs["agent_welcome_message"] = agent_welcome_message
             if len(self.history) == 2 and agent_welcome_message and self.history[1]["role"] == "assistant":
-                self.history[1]["content"] = agent_welcome_message
+                self.history.update(1, content=agent_welcome_message)
 
             await self.tools["output"].send_init_acknowledgement()
             self.first_message_task = asyncio.create_task(self.__first_message())
@@ -2031,6 +2211,9 @@ class TaskManager(BaseManager):
             logger.error(f"Error occurred in handling init event - {e}")
 
     async def run(self):
+        current_run_id.set(self.run_id)
+        if self._is_conversation_task():
+            get_call_metrics().call_started(self)
         try:
             if self._is_conversation_task():
                 # Create transcriber and synthesizer tasks
@@ -2112,10 +2295,13 @@ class TaskManager(BaseManager):
                 tasks_to_cancel.append(process_task_cancellation(self.synthesizer_monitor_task, 'synthesizer_monitor_task'))
 
             if self._is_conversation_task():
+                if self.speculation is not None:
+                    await self.__discard_speculation()
                 self.transcriber_latencies['connection_latency_ms'] = self.tools["transcriber"].connection_time
                 self.synthesizer_latencies['connection_latency_ms'] = self.tools["synthesizer"].connection_time
+                get_call_metrics().call_ended(self)
                 output = {
-                    "messages": self.history,
+                    "messages": self.history.to_list(),
                     "conversation_time": time.time() - self.start_time,
                     "label_flow": self.label_flow,
                     "call_sid": self.call_sid,
@@ -2128,11 +2314,22 @@ class TaskManager(BaseManager):
                         "synthesizer_latencies": self.synthesizer_latencies
                     }
                 }
+                if self.audio_pacer is not None:
+                    output["latency_dict"]["output_pacing"] = self.audio_pacer.get_stats()
+                output["latency_dict"]["turn_timeline"] = self.turn_tracer.get_timeline()
+                output["latency_dict"]["turn_latency_histograms"] = self.turn_tracer.get_histograms()
+                if self.speculative_generation:
+                    output["latency_dict"]["speculative_generation"] = self.__get_speculation_stats()
+                if self.context_windows:
+                    output["latency_dict"]["context_window"] = {agent or "default": context_window.get_stats() for agent, context_window in self.context_windows.items()}
 
                 tasks_to_cancel.append(process_task_cancellation(self.output_task,'output_task'))
                 tasks_to_cancel.append(process_task_cancellation(self.hangup_task,'hangup_task'))
                 tasks_to_cancel.append(process_task_cancellation(self.backchanneling_task, 'backchanneling_task'))
                 tasks_to_cancel.append(process_task_cancellation(self.ambient_noise_task, 'ambient_noise_task'))
+                tasks_to_cancel.append(process_task_cancellation(self.speculation_timer_task, 'speculation_timer_task'))
+                for context_window in self.context_windows.values():
+                    tasks_to_cancel.append(process_task_cancellation(context_window.summary_task, 'context_window_summary_task'))
                 # tasks_to_cancel.append(process_task_cancellation(self.initial_silence_task, 'initial_silence_task'))
                 tasks_to_cancel.append(process_task_cancellation(self.first_message_task, 'first_message_task'))
                 tasks_to_cancel.append(
@@ -2140,7 +2337,9 @@ class TaskManager(BaseManager):
 
                 output['recording_url'] = ""
                 if self.should_record:
-                    output['recording_url'] = await save_audio_file_to_s3(self.conversation_recording, self.sampling_rate, self.assistant_id, self.run_id)
+                    output['recording_url'] = await save_audio_file_to_s3(self.conversation_recording, self.assistant_id, self.run_id)
+
+                await close_request_log_writer(self.run_id)
 
                 if self.task_config['tools_config']['output']['provider'] == "daily":
                     logger.info("calling release function")
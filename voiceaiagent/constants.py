@@ -69,3 +69,9 @@ DEFAULT_USER_ONLINE_MESSAGE = "Hey, are you still there?"
 DEFAULT_USER_ONLINE_MESSAGE_TRIGGER_DURATION = 6
 DEFAULT_LANGUAGE_CODE = 'en'
 DEFAULT_TIMEZONE = 'America/Los_Angeles'
+DEFAULT_MAX_BUFFERED_OUTPUT_SECONDS = 10
+DEFAULT_OUTPUT_PACING_LEAD_MS = 400
+DEFAULT_SPECULATIVE_STABILITY_MS = 300
+DEFAULT_CONTEXT_WINDOW_RECENT_TURNS = 6
+CONTEXT_WINDOW_SUMMARY_TRIGGER = 0.8  # share of the token budget at which older turns start getting summarized
+CONTEXT_WINDOW_SUMMARY_MAX_TOKENS = 300
@@ -0,0 +1,151 @@
+import os
+import mmap
+import hashlib
+import tempfile
+import threading
+
+from .logger_config import configure_logger
+from .audio_codec import wav_to_array, array_to_wav, to_int16, _resample_interleaved
+from .g711 import encode_ulaw
+
+logger = configure_logger(__name__)
+
+ASSET_DIRECTORY_ENV_VARS = ("BACKCHANNELING_PRESETS_DIR", "FILLERS_PRESETS_DIR", "AMBIENT_NOISE_PRESETS_DIR")
+
+# (format, sample_rate) pairs every asset is decoded into up front: telephony pcm, twilio mulaw and web wav
+DEFAULT_VARIANTS = (("pcm", 8000), ("mulaw", 8000), ("wav", 24000))
+
+# Sources and decoded variants above this size live in files mapped read-only instead of on the heap, so every
+# worker process on the box shares the same page cache copy of long ambient tracks
+MMAP_THRESHOLD_BYTES = int(os.getenv("AUDIO_ASSET_MMAP_THRESHOLD_BYTES", 1024 * 1024))
+
+
+class AudioAssetStore:
+    """
+    Process wide store of preset audio (fillers, backchannels, ambient noise). Each file is read and transcoded once,
+    then the same read-only buffers are handed to every call. Small variants are bytes, large ones are read-only mmap
+    objects; both support len() and slicing to bytes, which is all the output path needs.
+    """
+    def __init__(self, variants=DEFAULT_VARIANTS, mmap_threshold=MMAP_THRESHOLD_BYTES, cache_dir=None):
+        self.variants = tuple((audio_format, int(sample_rate)) for audio_format, sample_rate in variants)
+        self.mmap_threshold = mmap_threshold
+        self.cache_dir = cache_dir or os.getenv("AUDIO_ASSET_CACHE_DIR",
+                                                os.path.join(tempfile.gettempdir(), "bolna_audio_assets"))
+        self._assets = {}
+        self._loaded_directories = set()
+        self._lock = threading.RLock()
+
+    def preload(self, directories=None):
+        if directories is None:
+            directories = [os.getenv(env_var) for env_var in ASSET_DIRECTORY_ENV_VARS]
+        for directory in directories:
+            if directory:
+                self.load_directory(directory)
+
+    def load_directory(self, directory):
+        directory = os.path.abspath(directory)
+        with self._lock:
+            if directory in self._loaded_directories:
+                return
+            if not os.path.isdir(directory):
+                logger.error(f"Audio asset directory {directory} does not exist")
+                return
+            count = 0
+            for root, _, files in os.walk(directory):
+                for file_name in sorted(files):
+                    if file_name.lower().endswith(".wav") and self.load(os.path.join(root, file_name)) is not None:
+                        count += 1
+            self._loaded_directories.add(directory)
+            logger.info(f"Loaded {count} audio assets from {directory}")
+
+    def load(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._assets:
+                return self._assets[path]
+            if not os.path.isfile(path):
+                return None
+            try:
+                self._assets[path] = self._decode(path, self.variants)
+            except Exception as e:
+                logger.error(f"Could not load audio asset {path}: {e}")
+                return None
+            return self._assets[path]
+
+    def get(self, path, audio_format="pcm", sample_rate=8000):
+        """Returns the asset at path in the requested format and rate, or None if the file doesn't exist."""
+        asset = self.load(path)
+        if asset is None:
+            return None
+        key = (audio_format, int(sample_rate))
+        if key not in asset:
+            # a rate nobody preloaded (e.g. ambient noise at 16k), decode it once and keep it for the next call
+            with self._lock:
+                if key not in asset:
+                    asset.update(self._decode(os.path.abspath(path), (key,)))
+        return asset[key]
+
+    def _read_source(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > self.mmap_threshold:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return f.read()
+
+    def _decode(self, path, variants):
+        source = self._read_source(path)
+        decoded = {}
+        try:
+            samples, info = wav_to_array(source)
+            for audio_format, sample_rate in variants:
+                if info.sample_rate != sample_rate:
+                    pcm = _resample_interleaved(samples, info.num_channels, info.sample_rate, sample_rate)
+                else:
+                    pcm = to_int16(samples)
+                if audio_format == "pcm":
+                    data = pcm.tobytes()
+                elif audio_format == "mulaw":
+                    data = encode_ulaw(pcm).tobytes()
+                elif audio_format == "wav":
+                    data = array_to_wav(pcm, sample_rate, info.num_channels)
+                else:
+                    raise ValueError(f"Unsupported audio asset format {audio_format}")
+                decoded[(audio_format, sample_rate)] = self._share(path, audio_format, sample_rate, data)
+            del samples, pcm
+        finally:
+            if isinstance(source, mmap.mmap):
+                try:
+                    source.close()
+                except BufferError:
+                    # a failed decode can still hold a view on the map, it is released with the last reference
+                    pass
+        return decoded
+
+    def _share(self, path, audio_format, sample_rate, data):
+        if len(data) <= self.mmap_threshold:
+            return data
+
+        stat = os.stat(path)
+        key = hashlib.md5(f"{path}:{stat.st_mtime_ns}:{stat.st_size}:{audio_format}:{sample_rate}".encode()).hexdigest()
+        cache_path = os.path.join(self.cache_dir, f"{key}.{audio_format}")
+        try:
+            if not os.path.isfile(cache_path):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, cache_path)
+            with open(cache_path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            logger.error(f"Could not memory map {cache_path}, keeping {path} on the heap: {e}")
+            return data
+
+
+_audio_asset_store = None
+
+
+def get_audio_asset_store():
+    global _audio_asset_store
+    if _audio_asset_store is None:
+        _audio_asset_store = AudioAssetStore()
+    return _audio_asset_store
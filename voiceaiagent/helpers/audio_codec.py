@@ -0,0 +1,300 @@
+import io
+import math
+import struct
+import functools
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pydub import AudioSegment
+
+from .logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Same defaults as torchaudio.transforms.Resample (sinc_interp_hann) so the output matches what we used to produce
+RESAMPLE_LOWPASS_FILTER_WIDTH = 6
+RESAMPLE_ROLLOFF = 0.99
+
+WavInfo = namedtuple("WavInfo", ["audio_format", "num_channels", "sample_rate", "sample_width", "data_offset", "data_length"])
+
+_PCM_DTYPES = {1: np.uint8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+_FLOAT_DTYPES = {4: np.dtype('<f4'), 8: np.dtype('<f8')}
+
+
+def is_wav(audio_bytes):
+    return len(audio_bytes) >= 12 and audio_bytes[0:4] == b'RIFF' and audio_bytes[8:12] == b'WAVE'
+
+
+def parse_wav_header(wav_bytes):
+    """
+    Walks the RIFF chunks of an in-memory WAV file and returns a WavInfo describing where the samples live.
+    Streaming writers (ffmpeg pipes, some TTS providers) put 0 or 0xFFFFFFFF in the data chunk size, in which case
+    everything after the data chunk header is treated as samples.
+    """
+    view = memoryview(wav_bytes)
+    if not is_wav(view):
+        raise ValueError("Audio is not a RIFF/WAVE buffer")
+
+    offset, fmt = 12, None
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size, = struct.unpack_from('<I', view, offset + 4)
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            audio_format, num_channels, sample_rate, _, _, bits_per_sample = struct.unpack_from('<HHIIHH', view, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                audio_format, = struct.unpack_from('<H', view, body + 24)
+            fmt = (audio_format, num_channels, sample_rate, bits_per_sample // 8)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk found before fmt chunk")
+            available = len(view) - body
+            data_length = available if chunk_size == 0 or chunk_size > available else chunk_size
+            return WavInfo(*fmt, body, data_length)
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV buffer has no data chunk")
+
+
+def build_wav_header(data_length, sample_rate, num_channels=1, sample_width=2, audio_format=WAVE_FORMAT_PCM):
+    block_align = num_channels * sample_width
+    return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_length, b'WAVE', b'fmt ', 16, audio_format,
+                       num_channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+                       b'data', data_length)
+
+
+def _sample_dtype(info):
+    dtypes = _FLOAT_DTYPES if info.audio_format == WAVE_FORMAT_IEEE_FLOAT else _PCM_DTYPES
+    if info.audio_format not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT) or info.sample_width not in dtypes:
+        raise ValueError(f"Unsupported WAV encoding format={info.audio_format} sample_width={info.sample_width}")
+    return dtypes[info.sample_width]
+
+
+def wav_to_array(wav_bytes):
+    """
+    Returns (samples, info) where samples is a read-only view over the data chunk of wav_bytes (no copy).
+    Multi-channel audio is returned interleaved, exactly as stored.
+    """
+    info = parse_wav_header(wav_bytes)
+    dtype = np.dtype(_sample_dtype(info))
+    count = info.data_length // dtype.itemsize
+    samples = np.frombuffer(wav_bytes, dtype=dtype, count=count, offset=info.data_offset)
+    return samples, info
+
+
+def int16_to_float32(samples, out=None):
+    if out is None:
+        out = np.empty(samples.shape, dtype=np.float32)
+    np.multiply(samples, np.float32(1 / 32768), out=out, casting='unsafe')
+    return out
+
+
+def float32_to_int16(samples, out=None):
+    if out is None:
+        out = np.empty(samples.shape, dtype=np.int16)
+    scaled = np.multiply(samples, np.float32(32767), dtype=np.float32)
+    np.clip(scaled, -32768, 32767, out=scaled)
+    np.copyto(out, scaled, casting='unsafe')
+    return out
+
+
+def to_float32(samples):
+    """Converts any supported sample dtype to float32 in [-1, 1]. float32 input is returned as is."""
+    if samples.dtype == np.float32:
+        return samples
+    if samples.dtype == np.int16:
+        return int16_to_float32(samples)
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / 128
+    if samples.dtype == np.int32:
+        return (samples / 2 ** 31).astype(np.float32)
+    return samples.astype(np.float32)
+
+
+def to_int16(samples):
+    """Converts any supported sample dtype to int16. int16 input is returned as is."""
+    if samples.dtype == np.int16:
+        return samples
+    if samples.dtype == np.uint8:
+        return ((samples.astype(np.int16) - 128) << 8).astype(np.int16)
+    if samples.dtype == np.int32:
+        return (samples >> 16).astype(np.int16)
+    return float32_to_int16(samples)
+
+
+@functools.lru_cache(maxsize=64)
+def get_resample_kernel(orig_freq, new_freq):
+    """
+    Polyphase windowed-sinc kernel for a reduced (orig_freq, new_freq) pair, shaped (taps, new_freq).
+    Kernels are built once per rate pair and shared read-only across every call in the process.
+    """
+    base_freq = min(orig_freq, new_freq) * RESAMPLE_ROLLOFF
+    width = math.ceil(RESAMPLE_LOWPASS_FILTER_WIDTH * orig_freq / base_freq)
+    idx = np.arange(-width, width + orig_freq, dtype=np.float64) / orig_freq
+    t = np.arange(0, -new_freq, -1, dtype=np.float64)[:, None] / new_freq + idx[None, :]
+    t *= base_freq
+    np.clip(t, -RESAMPLE_LOWPASS_FILTER_WIDTH, RESAMPLE_LOWPASS_FILTER_WIDTH, out=t)
+    window = np.cos(t * math.pi / RESAMPLE_LOWPASS_FILTER_WIDTH / 2) ** 2
+    t *= math.pi
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kernel = np.where(t == 0, 1.0, np.sin(t) / t)
+    kernel *= window * (base_freq / orig_freq)
+    kernel = np.ascontiguousarray(kernel.T, dtype=np.float32)
+    kernel.setflags(write=False)
+    return kernel, width
+
+
+def resample_array(samples, orig_sample_rate, target_sample_rate):
+    """
+    Resamples float32 audio shaped (frames,) or (channels, frames). Output length is ceil(frames * target / orig).
+    """
+    orig_sample_rate, target_sample_rate = int(orig_sample_rate), int(target_sample_rate)
+    if orig_sample_rate == target_sample_rate:
+        return samples
+
+    gcd = math.gcd(orig_sample_rate, target_sample_rate)
+    orig_freq, new_freq = orig_sample_rate // gcd, target_sample_rate // gcd
+    kernel, width = get_resample_kernel(orig_freq, new_freq)
+
+    waveform = np.atleast_2d(samples)
+    num_channels, length = waveform.shape
+    padded = np.pad(waveform, ((0, 0), (width, width + orig_freq)))
+    frames = sliding_window_view(padded, kernel.shape[0], axis=-1)[:, ::orig_freq]
+    resampled = np.matmul(frames, kernel).reshape(num_channels, -1)
+    target_length = -(-new_freq * length // orig_freq)
+    resampled = resampled[:, :target_length]
+    return resampled[0] if samples.ndim == 1 else resampled
+
+
+def _resample_interleaved(samples, num_channels, orig_sample_rate, target_sample_rate):
+    audio = to_float32(samples)
+    if num_channels > 1:
+        audio = audio[:len(audio) - len(audio) % num_channels].reshape(-1, num_channels).T
+    resampled = resample_array(audio, orig_sample_rate, target_sample_rate)
+    if num_channels > 1:
+        resampled = resampled.T.ravel()
+    return to_int16(resampled)
+
+
+def pcm_to_wav(pcm_bytes, sample_rate, num_channels=1, sample_width=2):
+    if len(pcm_bytes) % sample_width:
+        pcm_bytes = bytes(pcm_bytes) + b'\x00' * (sample_width - len(pcm_bytes) % sample_width)
+    return build_wav_header(len(pcm_bytes), sample_rate, num_channels, sample_width) + pcm_bytes
+
+
+def array_to_wav(samples, sample_rate, num_channels=1):
+    samples = to_int16(samples)
+    return build_wav_header(samples.nbytes, sample_rate, num_channels, 2) + samples.tobytes()
+
+
+def wav_to_pcm(wav_bytes, target_sample_rate=None):
+    """Returns the 16 bit PCM payload of a WAV file, optionally resampled, without re-encoding a WAV in between."""
+    samples, info = wav_to_array(wav_bytes)
+    if target_sample_rate is not None and int(target_sample_rate) != info.sample_rate:
+        return _resample_interleaved(samples, info.num_channels, info.sample_rate, target_sample_rate).tobytes()
+    if samples.dtype == np.int16:
+        return wav_bytes[info.data_offset:info.data_offset + samples.nbytes]
+    return to_int16(samples).tobytes()
+
+
+def resample_wav(wav_bytes, target_sample_rate):
+    samples, info = wav_to_array(wav_bytes)
+    if info.sample_rate == int(target_sample_rate):
+        return wav_bytes
+    logger.info(f"Resampling from {info.sample_rate} to {target_sample_rate}")
+    resampled = _resample_interleaved(samples, info.num_channels, info.sample_rate, target_sample_rate)
+    return array_to_wav(resampled, int(target_sample_rate), info.num_channels)
+
+
+def convert_to_wav(audio_bytes, source_format=None, target_sample_rate=None):
+    """
+    Converts encoded audio (mp3, flac, webm, wav...) into a 16 bit PCM WAV, optionally resampled.
+    WAV input is handled in memory; compressed formats still need ffmpeg through pydub for the decode itself,
+    but the result is wrapped and resampled here instead of being exported and reloaded.
+    """
+    if source_format == "wav" or is_wav(audio_bytes):
+        if target_sample_rate is None:
+            return audio_bytes
+        return resample_wav(audio_bytes, target_sample_rate)
+
+    segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format=source_format)
+    if segment.sample_width != 2:
+        segment = segment.set_sample_width(2)
+    if target_sample_rate is None or int(target_sample_rate) == segment.frame_rate:
+        return pcm_to_wav(segment.raw_data, segment.frame_rate, segment.channels)
+
+    samples = np.frombuffer(segment.raw_data, dtype=np.int16)
+    resampled = _resample_interleaved(samples, segment.channels, segment.frame_rate, target_sample_rate)
+    return array_to_wav(resampled, int(target_sample_rate), segment.channels)
+
+
+def merge_wav(wav_chunks):
+    """Concatenates WAV files into one, resampling later chunks to the rate of the first one if they differ."""
+    pcm_chunks, sample_rate, num_channels = [], None, 1
+    for wav_bytes in wav_chunks:
+        samples, info = wav_to_array(wav_bytes)
+        if sample_rate is None:
+            sample_rate, num_channels = info.sample_rate, info.num_channels
+        if info.sample_rate != sample_rate:
+            samples = _resample_interleaved(samples, info.num_channels, info.sample_rate, sample_rate)
+        pcm_chunks.append(to_int16(samples).tobytes())
+
+    pcm = b''.join(pcm_chunks)
+    return build_wav_header(len(pcm), sample_rate or 8000, num_channels) + pcm
+
+
+class StreamingResampler:
+    """
+    Chunk-by-chunk version of resample_array. The kernel tail is carried between calls, so feeding a signal in pieces
+    gives the same samples as resampling it in one go, with no clicks at chunk boundaries.
+    """
+    def __init__(self, orig_sample_rate, target_sample_rate, num_channels=1):
+        self.orig_sample_rate, self.target_sample_rate = int(orig_sample_rate), int(target_sample_rate)
+        self.num_channels = num_channels
+        gcd = math.gcd(self.orig_sample_rate, self.target_sample_rate)
+        self.orig_freq, self.new_freq = self.orig_sample_rate // gcd, self.target_sample_rate // gcd
+        self.kernel, self.width = get_resample_kernel(self.orig_freq, self.new_freq)
+        self.reset()
+
+    def reset(self):
+        self._pending = np.zeros((self.num_channels, self.width), dtype=np.float32)
+        self._input_frames = 0
+        self._output_frames = 0
+
+    def _emit(self):
+        taps = self.kernel.shape[0]
+        pending_frames = self._pending.shape[1]
+        if pending_frames < taps:
+            return np.empty((self.num_channels, 0), dtype=np.float32)
+
+        blocks = (pending_frames - taps) // self.orig_freq + 1
+        window = self._pending[:, :(blocks - 1) * self.orig_freq + taps]
+        frames = sliding_window_view(window, taps, axis=-1)[:, ::self.orig_freq]
+        resampled = np.matmul(frames, self.kernel).reshape(self.num_channels, -1)
+        self._pending = self._pending[:, blocks * self.orig_freq:]
+        self._output_frames += resampled.shape[1]
+        return resampled
+
+    def process(self, samples):
+        """Takes float32 audio shaped (channels, frames) and returns whatever output is already fully determined."""
+        if self.orig_sample_rate == self.target_sample_rate:
+            return samples
+        self._pending = np.concatenate((self._pending, samples), axis=1)
+        self._input_frames += samples.shape[1]
+        return self._emit()
+
+    def flush(self):
+        """Resamples the held back tail, trims to ceil(frames * target / orig) overall and resets for the next stream."""
+        if self.orig_sample_rate == self.target_sample_rate:
+            return np.empty((self.num_channels, 0), dtype=np.float32)
+        target_length = -(-self.new_freq * self._input_frames // self.orig_freq)
+        already_emitted = self._output_frames
+        self._pending = np.pad(self._pending, ((0, 0), (0, self.width + self.orig_freq)))
+        resampled = self._emit()[:, :max(target_length - already_emitted, 0)]
+        self.reset()
+        return resampled
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+from .logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+
+class AudioPacer:
+    """
+    Real time pacing for telephony output. Tracks when the far end will finish playing what we've already sent and
+    holds the next chunk back until no more than lead_seconds of audio is queued at the provider. Keeping the lead
+    small means a barge-in only has a few hundred ms to clear on the provider side instead of the whole response.
+    """
+    def __init__(self, lead_seconds=0.4):
+        self.lead_seconds = lead_seconds
+        self.playback_ends_at = 0.0
+        self.stats = {"chunks_paced": 0, "total_wait_seconds": 0.0, "max_buffered_ahead_seconds": 0.0}
+
+    def get_buffered_ahead(self):
+        """Seconds of sent audio the provider still has to play."""
+        return max(self.playback_ends_at - time.monotonic(), 0.0)
+
+    async def wait_for_slot(self):
+        wait = self.get_buffered_ahead() - self.lead_seconds
+        if wait > 0:
+            self.stats["total_wait_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    def on_sent(self, duration):
+        now = time.monotonic()
+        self.playback_ends_at = max(self.playback_ends_at, now) + duration
+        self.stats["chunks_paced"] += 1
+        self.stats["max_buffered_ahead_seconds"] = max(self.stats["max_buffered_ahead_seconds"],
+                                                       self.playback_ends_at - now)
+
+    def reset(self):
+        # The provider's buffer was cleared, nothing we sent earlier is going to play anymore
+        self.playback_ends_at = 0.0
+
+    def get_stats(self):
+        return dict(self.stats, buffered_ahead_seconds=self.get_buffered_ahead(), lead_seconds=self.lead_seconds)
@@ -0,0 +1,172 @@
+import time
+import tempfile
+
+import numpy as np
+
+from .logger_config import configure_logger
+from .audio_codec import build_wav_header, wav_to_array, is_wav, resample_array, to_float32, to_int16
+from .stream_transcoder import StreamTranscoder
+from .capture_buffer import CaptureBuffer
+
+logger = configure_logger(__name__)
+
+WAV_HEADER_SIZE = 44
+INPUT_CHANNEL = 0
+OUTPUT_CHANNEL = 1
+
+
+class CallRecorder:
+    """
+    Records both legs of a call into a stereo 16 bit WAV spool file (caller on the left channel, agent on the right)
+    while the call is running. The file is memory mapped and grown in steps of grow_seconds, so a call's footprint
+    stays flat no matter how long it runs; gaps between frames are never written and read back as silence.
+
+    Caller audio is decoded incrementally (webm from the browser by default) and laid down back to back from the time
+    the first chunk arrived. Until the decoder has produced its first samples the raw chunks are also kept in a
+    CaptureBuffer, so a container that can't be decoded as a stream is still decoded in one pass at the end. Agent
+    frames are placed at the time they were sent, or right after the previous frame if that one is still playing.
+    finalize() only has to write the header, after which the file can be streamed out.
+    """
+    def __init__(self, sample_rate=24000, input_format="webm", input_sample_rate=None, grow_seconds=30,
+                 spool_dir=None):
+        self.sample_rate = sample_rate
+        self.grow_frames = int(grow_seconds * sample_rate)
+        self.started = 0
+        self.num_frames = 0
+        self.input_position = None
+        self.input_start_position = None
+        self.output_position = 0
+        # record_input runs on the event loop, so take whatever ffmpeg has decoded so far instead of waiting for it
+        self.input_transcoder = StreamTranscoder(input_format, sample_rate, source_sample_rate=input_sample_rate,
+                                                 output_format="pcm", decode_wait=0)
+        self.input_capture = CaptureBuffer(spool_dir=spool_dir)
+        self._file = tempfile.TemporaryFile(prefix="call_recording_", suffix=".wav", dir=spool_dir)
+        self._buffer = None
+        self._capacity = 0
+        self.stats = {"input_chunks": 0, "output_frames": 0}
+
+    def _frame_at(self, timestamp):
+        return max(int(round((timestamp - self.started) * self.sample_rate)), 0)
+
+    def _ensure_capacity(self, end):
+        if end <= self._capacity:
+            return
+        capacity = max(end, self._capacity + self.grow_frames)
+        if self._buffer is not None:
+            self._buffer.flush()
+            self._buffer = None
+        # extending the file leaves a hole, so untouched regions cost no disk and read back as zeros
+        self._file.truncate(WAV_HEADER_SIZE + capacity * 4)
+        self._buffer = np.memmap(self._file, dtype='<i2', mode='r+', offset=WAV_HEADER_SIZE, shape=(capacity, 2))
+        self._capacity = capacity
+
+    def _write(self, channel, position, samples):
+        if not len(samples):
+            return position
+        end = position + len(samples)
+        self._ensure_capacity(end)
+        self._buffer[position:end, channel] = samples
+        self.num_frames = max(self.num_frames, end)
+        return end
+
+    def _to_mono(self, data, audio_format):
+        if audio_format == "wav" or is_wav(data):
+            samples, info = wav_to_array(data)
+            sample_rate, num_channels = info.sample_rate, info.num_channels
+        else:
+            samples = np.frombuffer(data, dtype='<i2', count=len(data) // 2)
+            sample_rate, num_channels = self.sample_rate, 1
+        if num_channels > 1:
+            samples = samples[:len(samples) - len(samples) % num_channels:num_channels]
+        if sample_rate != self.sample_rate:
+            return to_int16(resample_array(to_float32(samples), sample_rate, self.sample_rate))
+        return to_int16(samples)
+
+    def record_input(self, data, timestamp=None):
+        timestamp = timestamp or time.time()
+        if not self.started:
+            self.started = timestamp
+        if self.input_position is None:
+            self.input_position = self.input_start_position = self._frame_at(timestamp)
+        self.stats["input_chunks"] += 1
+        if self.input_capture is not None:
+            self.input_capture.append(data)
+        try:
+            pcm = self.input_transcoder.transcode(data)
+        except Exception as e:
+            logger.error(f"Could not decode recorded input audio {e}")
+            return
+        if pcm and self.input_capture is not None:
+            # streaming decode works for this input, the raw copy is no longer needed
+            self.input_capture.close()
+            self.input_capture = None
+        self.input_position = self._write(INPUT_CHANNEL, self.input_position, np.frombuffer(pcm, dtype='<i2'))
+
+    def record_output(self, data, audio_format="wav", timestamp=None):
+        timestamp = timestamp or time.time()
+        if not self.started:
+            self.started = timestamp
+        try:
+            samples = self._to_mono(data, audio_format)
+        except Exception as e:
+            logger.error(f"Could not record output frame {e}")
+            return
+        self.stats["output_frames"] += 1
+        position = max(self.output_position, self._frame_at(timestamp))
+        self.output_position = self._write(OUTPUT_CHANNEL, position, samples)
+
+    def is_empty(self):
+        return self.num_frames == 0
+
+    def finalize(self):
+        """
+        Flushes the input decoder, trims the spool file, writes the WAV header and returns the file positioned at
+        its start. Blocking, run it off the event loop.
+        """
+        try:
+            pcm = self.input_transcoder.finish()
+            if self.input_position is not None:
+                self.input_position = self._write(INPUT_CHANNEL, self.input_position,
+                                                  np.frombuffer(pcm, dtype='<i2'))
+        except Exception as e:
+            logger.error(f"Could not flush recorded input audio {e}")
+
+        if self.input_capture is not None and len(self.input_capture) and \
+                self.input_position == self.input_start_position:
+            self._decode_captured_input()
+
+        if self._buffer is not None:
+            self._buffer.flush()
+            self._buffer = None
+        data_length = self.num_frames * 4
+        self._file.truncate(WAV_HEADER_SIZE + data_length)
+        self._file.seek(0)
+        self._file.write(build_wav_header(data_length, self.sample_rate, num_channels=2))
+        self._file.flush()
+        self._file.seek(0)
+        logger.info(f"Finalized call recording of {self.num_frames / self.sample_rate:.2f}s {self.stats}")
+        return self._file
+
+    def _decode_captured_input(self):
+        logger.info(f"Decoding {len(self.input_capture)} bytes of captured input in one pass")
+        transcoder = StreamTranscoder(self.input_transcoder.source_format, self.sample_rate,
+                                      source_sample_rate=self.input_transcoder.source_sample_rate,
+                                      output_format="pcm")
+        try:
+            for chunk in self.input_capture.iter_chunks():
+                pcm = transcoder.transcode(chunk)
+                self.input_position = self._write(INPUT_CHANNEL, self.input_position, np.frombuffer(pcm, dtype='<i2'))
+            pcm = transcoder.finish()
+            self.input_position = self._write(INPUT_CHANNEL, self.input_position, np.frombuffer(pcm, dtype='<i2'))
+        except Exception as e:
+            logger.error(f"Could not decode captured input audio {e}")
+        finally:
+            transcoder.close()
+
+    def close(self):
+        self.input_transcoder.close()
+        if self.input_capture is not None:
+            self.input_capture.close()
+            self.input_capture = None
+        self._buffer = None
+        self._file.close()
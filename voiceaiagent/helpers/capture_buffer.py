@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+from .logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+DEFAULT_SPILL_THRESHOLD_BYTES = int(os.getenv("CAPTURE_BUFFER_SPILL_THRESHOLD_BYTES", 4 * 1024 * 1024))
+
+
+class CaptureBuffer:
+    """
+    Append only buffer for captured audio. Frames go into a bytearray, which grows in place (amortised O(1) per
+    append) instead of copying everything captured so far the way bytes += does. Once it holds more than
+    spill_threshold bytes its contents move to an anonymous temp file and later frames are appended there, so a
+    long call never keeps more than the threshold on the heap.
+    """
+    def __init__(self, spill_threshold=DEFAULT_SPILL_THRESHOLD_BYTES, spool_dir=None):
+        self.spill_threshold = spill_threshold
+        self.spool_dir = spool_dir
+        self._memory = bytearray()
+        self._file = None
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    def append(self, data):
+        if not data:
+            return
+        if self._file is None:
+            self._memory += data
+            if len(self._memory) > self.spill_threshold:
+                self._spill()
+        else:
+            self._file.write(data)
+        self._length += len(data)
+
+    def _spill(self):
+        self._file = tempfile.TemporaryFile(prefix="capture_", dir=self.spool_dir)
+        self._file.write(self._memory)
+        self._memory = bytearray()
+        logger.info(f"Capture buffer passed {self.spill_threshold} bytes, spilled to disk")
+
+    def iter_chunks(self, chunk_size=64 * 1024):
+        """Yields the captured bytes in order without materialising them all at once."""
+        if self._file is None:
+            view = memoryview(self._memory)
+            for i in range(0, len(view), chunk_size):
+                yield bytes(view[i:i + chunk_size])
+            return
+        self._file.flush()
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        self._file.seek(0, os.SEEK_END)
+
+    def getvalue(self):
+        return b''.join(self.iter_chunks())
+
+    def clear(self):
+        self.close()
+        self._length = 0
+
+    def close(self):
+        self._memory = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,122 @@
+import asyncio
+
+from litellm import token_counter
+
+from .logger_config import configure_logger
+from .utils import format_messages
+from .conversation_history import HistorySnapshot
+from bolna.constants import CONTEXT_WINDOW_SUMMARY_TRIGGER, CONTEXT_WINDOW_SUMMARY_MAX_TOKENS
+from bolna.prompts import ROLLING_SUMMARY_PROMPT, ROLLING_SUMMARY_SYSTEM_PROMPT
+
+logger = configure_logger(__name__)
+
+
+class ContextWindow:
+    """
+    Keeps the messages an LLM agent is sent within max_tokens on long calls.
+
+    The system prompt and the last recent_turns turns (a user message and everything up to the next one) are always sent
+    verbatim. Once the prompt grows past CONTEXT_WINDOW_SUMMARY_TRIGGER of the budget, the turns before those are
+    folded in the background, by summarizer, into a rolling summary that is appended to the system prompt. Until the
+    summary lands, or if it still does not fit, the oldest turns are left out instead. Token counts are cached per
+    message, so building the window costs the same on every turn however long the call has been.
+    """
+    def __init__(self, model, max_tokens, recent_turns, summarizer):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.recent_turns = max(recent_turns, 1)
+        self.summarizer = summarizer
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_until = 0
+        self.summary_task = None
+        self._token_counts = []
+        self._system_message = None
+        self.stats = {"summaries": 0, "summary_failures": 0, "trimmed_turns": 0, "prompt_tokens": 0}
+
+    def count_tokens(self, index, message):
+        """Tokens of the message at index in the history, counted once per message."""
+        if index >= len(self._token_counts):
+            self._token_counts.extend([(None, 0)] * (index + 1 - len(self._token_counts)))
+        cached_message, tokens = self._token_counts[index]
+        if cached_message is not message:
+            # update() swaps in a new dict, so an edited message is counted again
+            try:
+                tokens = token_counter(model=self.model, messages=[message])
+            except Exception:
+                tokens = self.count_text_tokens(format_messages([message], use_system_prompt=True, include_tools=True))
+            self._token_counts[index] = (message, tokens)
+        return tokens
+
+    def count_text_tokens(self, text):
+        try:
+            return token_counter(model=self.model, text=text)
+        except Exception:
+            return len(text) // 4
+
+    def __get_system_message(self, system_message):
+        if not self.summary:
+            return system_message
+        if self._system_message is None or self._system_message[0] is not system_message:
+            content = ROLLING_SUMMARY_SYSTEM_PROMPT.format(self.summary)
+            if system_message is not None:
+                content = f"{system_message['content']}\n{content}"
+            self._system_message = (system_message, {"role": "system", "content": content})
+        return self._system_message[1]
+
+    def get_messages(self, history):
+        """The messages to send for history, a HistorySnapshot the turn can append to like history.snapshot()."""
+        system_message = history[0] if len(history) and history[0]["role"] == "system" else None
+        first = 1 if system_message is not None else 0
+        window_start = max(self.summarized_until, first)
+
+        tokens = [self.count_tokens(index, history[index]) for index in range(window_start, len(history))]
+        total = sum(tokens) + (self.count_tokens(0, system_message) if system_message is not None else 0)
+        total += self.summary_tokens
+        turn_starts = [index for index in range(window_start, len(history)) if history[index]["role"] == "user"]
+        recent_start = turn_starts[-self.recent_turns] if len(turn_starts) >= self.recent_turns else window_start
+
+        if total > self.max_tokens * CONTEXT_WINDOW_SUMMARY_TRIGGER and recent_start > window_start:
+            self.__start_summary(history, window_start, recent_start)
+
+        if total <= self.max_tokens and not self.summary:
+            self.stats["prompt_tokens"] = total
+            return history.snapshot()
+
+        cut = window_start
+        for turn_start in turn_starts:
+            if total <= self.max_tokens:
+                break
+            if turn_start > cut:
+                total -= sum(tokens[cut - window_start:turn_start - window_start])
+                cut = turn_start
+                self.stats["trimmed_turns"] += 1
+        if cut > window_start:
+            logger.info(f"Left {cut - window_start} messages out of the prompt to stay within {self.max_tokens} tokens")
+        self.stats["prompt_tokens"] = total
+
+        system_message = self.__get_system_message(system_message)
+        messages = ([system_message] if system_message is not None else []) + history[cut:]
+        return HistorySnapshot(messages, len(messages))
+
+    def __start_summary(self, history, start, end):
+        if self.summary_task is not None and not self.summary_task.done():
+            return
+        self.summary_task = asyncio.create_task(self.__summarize(history[start:end], end))
+
+    async def __summarize(self, messages, end):
+        transcript = format_messages(messages, include_tools=True)
+        prompt = [{"role": "system", "content": ROLLING_SUMMARY_PROMPT},
+                  {"role": "user", "content": f"Summary so far:\n{self.summary}\n\nNew messages:\n{transcript}"}]
+        summary = (await self.summarizer.generate(prompt, max_tokens=CONTEXT_WINDOW_SUMMARY_MAX_TOKENS))["summary"]
+        if not summary or not summary.strip():
+            self.stats["summary_failures"] += 1
+            return
+        logger.info(f"Folded messages up to {end} into the rolling summary")
+        self.summary, self.summarized_until = summary.strip(), end
+        self.summary_tokens = self.count_text_tokens(self.summary)
+        self._system_message = None
+        self.stats["summaries"] += 1
+
+    def get_stats(self):
+        return dict(self.stats, summarized_messages=self.summarized_until)
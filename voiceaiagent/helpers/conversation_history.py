@@ -0,0 +1,97 @@
+from collections.abc import Sequence
+from itertools import chain, islice
+
+
+class HistorySnapshot(Sequence):
+    """
+    The conversation history as it was when snapshot() was taken, plus whatever this turn appends to it.
+
+    Taking one is O(1): it shares the history's message list and only remembers its length, so messages the
+    history gains afterwards stay invisible. append() adds to a tail private to the snapshot. The plain list a provider
+    request needs is only built by to_list(), and every other consumer (agents indexing history[-1], format_messages)
+    reads the snapshot directly.
+    """
+    __slots__ = ("_messages", "_length", "_tail")
+
+    def __init__(self, messages, length):
+        self._messages = messages
+        self._length = length
+        self._tail = []
+
+    def __len__(self):
+        return self._length + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history snapshot index out of range")
+        return self._messages[index] if index < self._length else self._tail[index - self._length]
+
+    def __iter__(self):
+        return chain(islice(self._messages, self._length), self._tail)
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+    def append(self, message):
+        self._tail.append(message)
+
+    def extend(self, messages):
+        self._tail.extend(messages)
+
+    def to_list(self):
+        return self._messages[:self._length] + self._tail
+
+
+class ConversationHistory(Sequence):
+    """
+    Append-only list of the call's chat messages.
+
+    Messages are shared, never copied, between the history and its snapshots, so they must be treated as immutable:
+    edit one with update(), which swaps in a new dict, instead of assigning into it. update() edits the list in place
+    and copies it only if a snapshot still shares it; appends never copy. This replaces deep copying the whole history
+    on every turn.
+    """
+    __slots__ = ("_messages", "_shared")
+
+    def __init__(self, messages=None):
+        self._messages = list(messages) if messages is not None else []
+        self._shared = False
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __repr__(self):
+        return repr(self._messages)
+
+    def _own_messages(self):
+        if self._shared:
+            self._messages = self._messages[:]
+            self._shared = False
+
+    def append(self, message):
+        self._messages.append(message)
+
+    def extend(self, messages):
+        self._messages.extend(messages)
+
+    def update(self, index, **changes):
+        """Replaces the message at index with a copy that has changes applied."""
+        self._own_messages()
+        self._messages[index] = {**self._messages[index], **changes}
+
+    def snapshot(self):
+        self._shared = True
+        return HistorySnapshot(self._messages, len(self._messages))
+
+    def to_list(self):
+        return self._messages[:]
@@ -0,0 +1,99 @@
+import numpy as np
+
+# G.711 mu-law / A-law companding through lookup tables. The tables reproduce audioop bit for bit (same segment
+# search and bias as CPython's st_14linear2ulaw / st_linear2alaw), so swapping audioop out changes no samples.
+# Encode tables are indexed by the int16 sample reinterpreted as uint16, decode tables by the 8 bit code.
+
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+_ULAW_SEG_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32)
+_ALAW_SEG_END = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF], dtype=np.int32)
+
+
+def _build_ulaw_encode_table():
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    seg = np.searchsorted(_ULAW_SEG_END, magnitude)
+    code = np.where(seg >= 8, 0x7F, (np.minimum(seg, 7) << 4) | ((magnitude >> (np.minimum(seg, 7) + 1)) & 0xF))
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_ulaw_decode_table():
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((code & 0x0F) << 3) + _ULAW_BIAS) << ((code & 0x70) >> 4)
+    return np.where(code & 0x80, _ULAW_BIAS - t, t - _ULAW_BIAS).astype(np.int16)
+
+
+def _build_alaw_encode_table():
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    magnitude = np.where(pcm >= 0, pcm, -pcm - 1)
+    seg = np.searchsorted(_ALAW_SEG_END, magnitude)
+    shift = np.where(seg < 2, 1, np.minimum(seg, 7))
+    code = np.where(seg >= 8, 0x7F, (np.minimum(seg, 7) << 4) | ((magnitude >> shift) & 0xF))
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_alaw_decode_table():
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    seg = (code & 0x70) >> 4
+    t = (code & 0x0F) << 4
+    t = np.where(seg == 0, t + 8, (t + 0x108) << np.maximum(seg - 1, 0))
+    return np.where(code & 0x80, t, -t).astype(np.int16)
+
+
+ULAW_ENCODE_TABLE = _build_ulaw_encode_table()
+ULAW_DECODE_TABLE = _build_ulaw_decode_table()
+ALAW_ENCODE_TABLE = _build_alaw_encode_table()
+ALAW_DECODE_TABLE = _build_alaw_decode_table()
+for _table in (ULAW_ENCODE_TABLE, ULAW_DECODE_TABLE, ALAW_ENCODE_TABLE, ALAW_DECODE_TABLE):
+    _table.setflags(write=False)
+
+
+def _as_table_index(pcm):
+    # int16 samples reinterpreted as uint16, no copy
+    if isinstance(pcm, np.ndarray):
+        return pcm.view(np.uint16)
+    return np.frombuffer(pcm, dtype=np.uint16, count=len(pcm) // 2)
+
+
+def _as_uint8(codes):
+    if isinstance(codes, np.ndarray):
+        return codes
+    return np.frombuffer(codes, dtype=np.uint8)
+
+
+def encode_ulaw(pcm, out=None):
+    """int16 samples (array or PCM bytes) -> uint8 mu-law codes, written into out when given."""
+    return ULAW_ENCODE_TABLE.take(_as_table_index(pcm), out=out)
+
+
+def decode_ulaw(codes, out=None):
+    """uint8 mu-law codes (array or bytes) -> int16 samples, written into out when given."""
+    return ULAW_DECODE_TABLE.take(_as_uint8(codes), out=out)
+
+
+def encode_alaw(pcm, out=None):
+    return ALAW_ENCODE_TABLE.take(_as_table_index(pcm), out=out)
+
+
+def decode_alaw(codes, out=None):
+    return ALAW_DECODE_TABLE.take(_as_uint8(codes), out=out)
+
+
+# Drop-in replacements for the audioop functions we used, 16 bit samples only
+def lin2ulaw(pcm_bytes):
+    return encode_ulaw(pcm_bytes).tobytes()
+
+
+def ulaw2lin(ulaw_bytes):
+    return decode_ulaw(ulaw_bytes).tobytes()
+
+
+def lin2alaw(pcm_bytes):
+    return encode_alaw(pcm_bytes).tobytes()
+
+
+def alaw2lin(alaw_bytes):
+    return decode_alaw(alaw_bytes).tobytes()
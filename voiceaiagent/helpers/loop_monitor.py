@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+
+from .logger_config import configure_logger
+from .metrics import get_metrics_registry
+
+logger = configure_logger(__name__)
+
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", 0.1))
+SLOW_CALLBACK_THRESHOLD = float(os.getenv("SLOW_CALLBACK_THRESHOLD", 0.05))
+
+# Set by TaskManager.run so a slow callback can be traced back to the call it stalled in
+current_run_id = contextvars.ContextVar("current_run_id", default=None)
+
+_original_handle_run = asyncio.events.Handle._run
+
+
+def describe_callback(handle):
+    callback = handle._callback
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        return describe_task(task)
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+def describe_task(task):
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', repr(coro))})"
+
+
+class LoopMonitor:
+    """
+    Watches one event loop. A sampling task sleeps for interval and records how late it woke up (the scheduling
+    lag every other coroutine on the worker saw at that moment). While running it also wraps Handle._run, timing
+    every callback the loop executes; those that hold the loop longer than slow_callback_threshold are logged and
+    kept with their task/coroutine name and the run_id of the call they ran in. The wrapper costs two perf_counter
+    calls per callback.
+
+    uvloop (what uvicorn picks when it is installed) runs callbacks in C and never calls Handle._run. There a
+    watchdog thread notices when the sampler stops waking up and records the task the loop is running at that moment
+    instead; its run_id is only available from Python 3.12, where tasks expose their context.
+    """
+    def __init__(self, interval=LOOP_MONITOR_INTERVAL, slow_callback_threshold=SLOW_CALLBACK_THRESHOLD,
+                 window=600, max_slow_callbacks=100):
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.lags = deque(maxlen=window)
+        self.slow_callbacks = deque(maxlen=max_slow_callbacks)
+        self.slow_callback_count = 0
+        self.max_lag = 0.0
+        self.mode = None
+        self._task = None
+        self._watchdog = None
+        self._heartbeat = None
+        registry = get_metrics_registry()
+        self.lag_histogram = registry.histogram("voice_agent_event_loop_lag_seconds",
+                                                "How late the loop monitor woke up",
+                                                buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+        self.slow_callback_counter = registry.counter("voice_agent_slow_callbacks_total",
+                                                      "Callbacks that blocked the event loop past the threshold")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            loop = asyncio.get_running_loop()
+            self._heartbeat = time.monotonic()
+            if isinstance(loop, asyncio.BaseEventLoop):
+                self.mode = "handle"
+                self._install()
+            else:
+                self.mode = "watchdog"
+                logger.warning(f"{type(loop).__module__}.{type(loop).__name__} does not run callbacks through "
+                               f"Handle._run, attributing slow callbacks from a watchdog thread instead")
+                self._watchdog = threading.Thread(target=self._watch, args=(loop,), name="loop_monitor_watchdog",
+                                                  daemon=True)
+                self._watchdog.start()
+            self._task = asyncio.create_task(self._sample(), name="loop_monitor")
+        return self
+
+    async def stop(self):
+        self._uninstall()
+        self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _install(self):
+        monitor = self
+
+        def _timed_run(handle):
+            start = time.perf_counter()
+            _original_handle_run(handle)
+            duration = time.perf_counter() - start
+            if duration >= monitor.slow_callback_threshold:
+                monitor.record_slow_callback(handle, duration)
+
+        asyncio.events.Handle._run = _timed_run
+
+    def _uninstall(self):
+        asyncio.events.Handle._run = _original_handle_run
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            lag = max(loop.time() - expected, 0.0)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self.lag_histogram.observe(lag)
+
+    def _watch(self, loop):
+        """Polls the sampler's heartbeat; a missed one means some callback is holding the loop right now."""
+        watchdog = threading.current_thread()
+        blocked_since, blocked_by = None, None
+        while self._watchdog is watchdog and not loop.is_closed():
+            time.sleep(self.slow_callback_threshold / 2)
+            heartbeat = self._heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue >= self.slow_callback_threshold and blocked_since is None:
+                blocked_since = heartbeat + self.interval
+                blocked_by = asyncio.current_task(loop)
+            elif blocked_since is not None and heartbeat > blocked_since:
+                self._record_blocking_task(blocked_by, heartbeat - blocked_since)
+                blocked_since, blocked_by = None, None
+
+    def _record_blocking_task(self, task, duration):
+        if task is None:
+            self._record(repr(task), None, duration)
+            return
+        get_context = getattr(task, "get_context", None)
+        run_id = get_context().get(current_run_id) if get_context is not None else None
+        self._record(describe_task(task), run_id, duration)
+
+    def record_slow_callback(self, handle, duration):
+        try:
+            name = describe_callback(handle)
+            run_id = handle._context.get(current_run_id) if handle._context is not None else None
+        except Exception:
+            name, run_id = repr(handle), None
+        self._record(name, run_id, duration)
+
+    def _record(self, name, run_id, duration):
+        self.slow_callback_count += 1
+        self.slow_callback_counter.inc()
+        self.slow_callbacks.append({"callback": name, "run_id": run_id, "duration_ms": round(duration * 1000, 1),
+                                    "time": time.time()})
+        logger.warning(f"Event loop blocked for {duration * 1000:.1f} ms by {name} (run_id {run_id})")
+
+    def _percentile(self, q):
+        if not self.lags:
+            return None
+        ordered = sorted(self.lags)
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 2)
+
+    def get_stats(self):
+        return {"lag_p50_ms": self._percentile(0.5), "lag_p99_ms": self._percentile(0.99),
+                "lag_max_ms": round(self.max_lag * 1000, 2), "samples": len(self.lags),
+                "slow_callback_count": self.slow_callback_count, "recent_slow_callbacks": list(self.slow_callbacks),
+                "slow_callback_mode": self.mode}
+
+
+_loop_monitor = None
+
+
+def get_loop_monitor():
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = LoopMonitor()
+    return _loop_monitor
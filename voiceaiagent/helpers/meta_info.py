@@ -0,0 +1,18 @@
+class MetaInfo(dict):
+    """
+    The meta_info that travels with every packet between input handlers, transcribers, the task manager,
+    synthesizers and output handlers.
+
+    It is a dict, so every existing consumer (indexing, .get, json, logging) keeps working, but copies are shallow:
+    derive() is a single dict copy with the changes applied, where create_ws_data_packet used to deepcopy the whole
+    mapping for every audio frame. Values are treated as immutable; replace them (meta_info[key] = ...) rather than
+    mutating a list or dict stored in meta_info, since derived copies share them.
+    """
+    __slots__ = ()
+
+    def derive(self, **changes):
+        """Independent copy with changes applied; the original is left untouched."""
+        return MetaInfo(self, **changes)
+
+    def copy(self):
+        return MetaInfo(self)
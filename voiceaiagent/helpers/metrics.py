@@ -0,0 +1,270 @@
+import bisect
+import weakref
+
+from bolna.memory.cache.tts_audio_cache import get_tts_audio_cache
+from .logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+# Upper bounds in seconds, the last bucket is +Inf
+DEFAULT_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+def _format_labels(label_names, label_values):
+    if not label_names:
+        return ""
+    pairs = ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                     for name, value in zip(label_names, label_values))
+    return "{" + pairs + "}"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    """
+    A metric family. Children are created once per label combination and cached, so the hot path is a dict lookup
+    (or nothing at all when the caller keeps the child around) followed by an integer add. There are no locks:
+    metrics are updated from the event loop, and a scrape racing a worker thread can at worst be off by one sample.
+    """
+    metric_type = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *label_values):
+        child = self._children.get(label_values)
+        if child is None:
+            child = self._children[label_values] = self._new_child()
+        return child
+
+    def _samples(self):
+        for label_values, child in list(self._children.items()):
+            yield "", self.label_names, label_values, child.value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for suffix, label_names, label_values, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(label_names, label_values)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name, documentation, label_names=(), callback=None):
+        super().__init__(name, documentation, label_names)
+        # callback() returns {label_values: value}, evaluated only when scraped
+        self.callback = callback
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def _samples(self):
+        if self.callback is None:
+            yield from super()._samples()
+            return
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.error(f"Could not collect gauge {self.name}: {e}")
+            return
+        for label_values, value in values.items():
+            yield "", self.label_names, label_values, value
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _samples(self):
+        label_names = self.label_names + ("le",)
+        for label_values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), child.counts):
+                cumulative += count
+                yield "_bucket", label_names, label_values + (bound,), cumulative
+            yield "_sum", self.label_names, label_values, child.sum
+            yield "_count", self.label_names, label_values, cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=(), callback=None):
+        return self._register(Gauge(name, documentation, label_names, callback))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_metrics_registry = None
+
+
+def get_metrics_registry():
+    global _metrics_registry
+    if _metrics_registry is None:
+        _metrics_registry = MetricsRegistry()
+    return _metrics_registry
+
+
+class CallMetrics:
+    """
+    The voice agent's metric families on the process wide registry. Live per call state (queue depths, number of
+    active calls) is not pushed on every frame; calls are tracked in a weak set and read when /metrics is scraped.
+    """
+    QUEUES = ("audio_queue", "llm_queue", "synthesizer_queue", "buffered_output_queue")
+
+    def __init__(self, registry=None):
+        registry = registry or get_metrics_registry()
+        self._calls = weakref.WeakSet()
+        registry.gauge("voice_agent_active_calls", "Calls currently being handled by this process",
+                       callback=lambda: {(): len(self._calls)})
+        registry.gauge("voice_agent_queue_depth", "Items waiting in each per call queue, summed over active calls",
+                       ("queue",), callback=self._collect_queue_depths)
+        registry.gauge("voice_agent_output_buffered_seconds", "Seconds of audio waiting in output queues, summed over active calls",
+                       callback=lambda: {(): sum(call.buffered_output_queue.buffered_seconds for call in list(self._calls))})
+        registry.gauge("voice_agent_output_paced_ahead_seconds",
+                       "Seconds of sent audio the telephony providers still have to play, summed over active calls",
+                       callback=self._collect_paced_ahead_seconds)
+        self.calls_total = registry.counter("voice_agent_calls_total", "Calls handled since the process started")
+        self.interruptions = registry.counter("voice_agent_interruptions_total", "Times the caller interrupted the agent")
+        self.speculative_generations = registry.counter("voice_agent_speculative_generations_total",
+                                                        "Speculative LLM generations by outcome (promoted, discarded)",
+                                                        ("result",))
+        self.speculative_wasted_tokens = registry.counter("voice_agent_speculative_wasted_tokens_total",
+                                                          "Tokens spent on discarded speculative generations",
+                                                          ("kind",))
+        self.connect_time = registry.histogram("voice_agent_provider_connect_seconds",
+                                               "Time to open the provider connection", ("component", "provider"))
+        self.turn_spans = registry.histogram("voice_agent_turn_span_seconds",
+                                             "Duration of each stage of a turn (llm_first_token, voice_to_voice...)",
+                                             ("span",))
+        registry.gauge("voice_agent_tts_cache_hit_ratio", "Hit ratio of the shared TTS audio cache",
+                       callback=self._collect_tts_cache_hit_ratio)
+
+    def _collect_paced_ahead_seconds(self):
+        pacers = [call.audio_pacer for call in list(self._calls)]
+        return {(): sum(pacer.get_buffered_ahead() for pacer in pacers if pacer is not None)}
+
+    def _collect_queue_depths(self):
+        depths = dict.fromkeys(self.QUEUES, 0)
+        for call in list(self._calls):
+            for queue in self.QUEUES:
+                depths[queue] += getattr(call, queue).qsize()
+        return {(queue,): depth for queue, depth in depths.items()}
+
+    @staticmethod
+    def _collect_tts_cache_hit_ratio():
+        stats = get_tts_audio_cache().get_stats()
+        lookups = stats["hits"] + stats["misses"]
+        return {(): stats["hits"] / lookups if lookups else 0.0}
+
+    def call_started(self, call):
+        self._calls.add(call)
+        self.calls_total.inc()
+
+    def call_ended(self, call):
+        self._calls.discard(call)
+
+    def observe_connect_time(self, component, provider, connection_time_ms):
+        if connection_time_ms is not None:
+            self.connect_time.labels(component, provider).observe(connection_time_ms / 1000)
+
+
+_call_metrics = None
+
+
+def get_call_metrics():
+    global _call_metrics
+    if _call_metrics is None:
+        _call_metrics = CallMetrics()
+    return _call_metrics
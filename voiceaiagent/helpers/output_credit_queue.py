@@ -0,0 +1,75 @@
+import asyncio
+from collections import deque
+
+from .logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+
+class OutputCreditQueue:
+    """
+    Queue between the synthesizer listener and the output loop that is bounded by seconds of buffered audio.
+
+    Producers call put() (or wait_for_credit() followed by put_nowait()) and only block while the buffer already
+    holds max_buffered_seconds of audio; the output loop hands the credit back as it dequeues. A single message may
+    overshoot the budget so large chunks can never deadlock. clear() drops everything and refunds all credit in one
+    step, which is what interruption needs. Messages without audio (text, control packets) cost nothing.
+    """
+    def __init__(self, max_buffered_seconds, duration_fn):
+        self.max_buffered_seconds = max_buffered_seconds
+        self.duration_fn = duration_fn
+        self.buffered_seconds = 0.0
+        self._items = deque()
+        self._item_available = asyncio.Event()
+        self._credit_available = asyncio.Event()
+        self._credit_available.set()
+
+    def _cost(self, message):
+        try:
+            return self.duration_fn(message)
+        except Exception as e:
+            logger.error(f"Could not compute buffered duration of output message {e}")
+            return 0.0
+
+    def has_credit(self):
+        return self.buffered_seconds < self.max_buffered_seconds
+
+    async def wait_for_credit(self):
+        while not self.has_credit():
+            self._credit_available.clear()
+            await self._credit_available.wait()
+
+    async def put(self, message):
+        await self.wait_for_credit()
+        self.put_nowait(message)
+
+    def put_nowait(self, message):
+        cost = self._cost(message)
+        self._items.append((message, cost))
+        self.buffered_seconds += cost
+        if not self.has_credit():
+            self._credit_available.clear()
+        self._item_available.set()
+
+    async def get(self):
+        while not self._items:
+            self._item_available.clear()
+            await self._item_available.wait()
+        message, cost = self._items.popleft()
+        self.buffered_seconds = max(self.buffered_seconds - cost, 0.0) if self._items else 0.0
+        if self.has_credit():
+            self._credit_available.set()
+        return message
+
+    def empty(self):
+        return not self._items
+
+    def qsize(self):
+        return len(self._items)
+
+    def clear(self):
+        dropped = len(self._items)
+        self._items.clear()
+        self.buffered_seconds = 0.0
+        self._credit_available.set()
+        return dropped
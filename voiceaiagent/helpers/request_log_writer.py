@@ -0,0 +1,157 @@
+import os
+import json
+import asyncio
+from collections import deque
+
+from .logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+REQUEST_LOG_DIR = os.getenv("REQUEST_LOG_DIR", "./logs")
+REQUEST_LOG_JSONL = os.getenv("REQUEST_LOG_JSONL", "false").lower() == "true"
+REQUEST_LOG_MAX_BUFFERED = int(os.getenv("REQUEST_LOG_MAX_BUFFERED", 2000))
+REQUEST_LOG_FLUSH_INTERVAL = float(os.getenv("REQUEST_LOG_FLUSH_INTERVAL", 1.0))
+REQUEST_LOG_FLUSH_BATCH_SIZE = int(os.getenv("REQUEST_LOG_FLUSH_BATCH_SIZE", 100))
+
+CSV_HEADER = "Time,Component,Direction,Leg ID,Sequence ID,Model,Data,Input Tokens,Output Tokens,Characters,Latency,Cached,Final Transcript,Engine\n"
+
+
+def format_request_log_row(message):
+    component_details = [None, None, None, None, None]
+    message_data = message.get('data', '')
+    if message_data is None:
+        message_data = ''
+
+    row = [message['time'], message["component"], message["direction"], message["leg_id"], message['sequence_id'], message['model']]
+    if message["component"] in ("llm", "llm_hangup"):
+        component_details = [message_data, message.get('input_tokens', 0), message.get('output_tokens', 0), None, message.get('latency', None), message['cached'], None]
+    elif message["component"] == "transcriber":
+        component_details = [message_data, None, None, None, message.get('latency', None), False, message.get('is_final', False)]
+    elif message["component"] == "synthesizer":
+        component_details = [message_data, None, None, len(message_data), message.get('latency', None), message['cached'], None, message['engine']]
+    elif message["component"] == "function_call":
+        component_details = [message_data, None, None, None, message.get('latency', None), None, None, None]
+
+    row = row + component_details
+    return ','.join(['"' + str(item).replace('"', '""') + '"' if item is not None else '' for item in row]) + '\n'
+
+
+class RequestLogWriter:
+    """
+    Buffers the request log of one run in memory and appends it to {log_dir}/{run_id}.csv in batches from a single
+    background task, instead of opening the file for every event. A batch is written once flush_batch_size events
+    are waiting or flush_interval seconds have passed. The buffer is a ring of max_buffered events: if the disk
+    can't keep up the oldest events are dropped and counted rather than letting memory grow. With jsonl=True every
+    event is also written, unformatted, as one JSON object per line to {run_id}.jsonl.
+    """
+    def __init__(self, run_id, log_dir=REQUEST_LOG_DIR, jsonl=REQUEST_LOG_JSONL, max_buffered=REQUEST_LOG_MAX_BUFFERED,
+                 flush_interval=REQUEST_LOG_FLUSH_INTERVAL, flush_batch_size=REQUEST_LOG_FLUSH_BATCH_SIZE,
+                 idle_timeout=30):
+        self.run_id = run_id
+        self.log_dir = log_dir
+        self.jsonl = jsonl
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.idle_timeout = idle_timeout
+        self._buffer = deque(maxlen=max_buffered)
+        self._wakeup = asyncio.Event()
+        self._flush_task = None
+        self._closed = False
+        self.stats = {"logged": 0, "written": 0, "dropped": 0, "batches": 0, "write_errors": 0}
+
+    @property
+    def csv_path(self):
+        return os.path.join(self.log_dir, f"{self.run_id}.csv")
+
+    @property
+    def jsonl_path(self):
+        return os.path.join(self.log_dir, f"{self.run_id}.jsonl")
+
+    def log(self, message):
+        """Queues one event. Never blocks; starts the flush task if it isn't running."""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.stats["dropped"] += 1
+        self._buffer.append(message)
+        self.stats["logged"] += 1
+        if len(self._buffer) >= self.flush_batch_size:
+            self._wakeup.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._closed = False
+            self._flush_task = asyncio.create_task(self._run())
+
+    def _take_batch(self):
+        batch = list(self._buffer)
+        self._buffer.clear()
+        return batch
+
+    def _write_batch(self, batch):
+        os.makedirs(self.log_dir, exist_ok=True)
+        csv_lines = ''.join(format_request_log_row(message) for message in batch)
+        file_exists = os.path.exists(self.csv_path)
+        with open(self.csv_path, mode='a') as log_file:
+            log_file.write(csv_lines if file_exists else CSV_HEADER + csv_lines)
+        if self.jsonl:
+            with open(self.jsonl_path, mode='a') as log_file:
+                log_file.write(''.join(json.dumps(message, default=str) + '\n' for message in batch))
+
+    async def flush(self):
+        batch = self._take_batch()
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"Could not write {len(batch)} request logs for run {self.run_id}: {e}")
+
+    async def _run(self):
+        idle_for = 0.0
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._buffer:
+                idle_for = 0.0
+                await self.flush()
+            else:
+                idle_for += self.flush_interval
+                if idle_for >= self.idle_timeout:
+                    # nothing logged for a while and nobody closed us, the run is most likely gone
+                    if _request_log_writers.get(self.run_id) is self:
+                        del _request_log_writers[self.run_id]
+                    break
+        await self.flush()
+
+    async def close(self):
+        """Writes whatever is still buffered and stops the flush task."""
+        self._closed = True
+        self._wakeup.set()
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        else:
+            await self.flush()
+        if self.stats["dropped"]:
+            logger.error(f"Dropped {self.stats['dropped']} request logs for run {self.run_id}")
+
+    def get_stats(self):
+        return dict(self.stats, buffered=len(self._buffer))
+
+
+_request_log_writers = {}
+
+
+def get_request_log_writer(run_id):
+    writer = _request_log_writers.get(run_id)
+    if writer is None:
+        writer = _request_log_writers[run_id] = RequestLogWriter(run_id)
+    return writer
+
+
+async def close_request_log_writer(run_id):
+    writer = _request_log_writers.pop(run_id, None)
+    if writer is not None:
+        await writer.close()
@@ -0,0 +1,97 @@
+import re
+import time
+import asyncio
+
+from litellm import token_counter
+
+from .logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+NON_WORD_PATTERN = re.compile(r"[^\w\s']")
+# Disfluencies that carry no meaning; words like "no", "not" or "okay" never go here
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "uhm", "hmm", "hm", "er", "erm", "ah"}
+
+
+def normalize_transcript(text):
+    return " ".join(NON_WORD_PATTERN.sub(" ", (text or "").lower()).split())
+
+
+def transcript_words(text):
+    return [word for word in normalize_transcript(text).split() if word not in FILLER_WORDS]
+
+
+def transcripts_match(first, second):
+    """
+    Whether both transcripts say the same thing: the same words, ignoring case, punctuation and filler words. Anything
+    else, even a single changed word such as a negation or a digit, can change what the reply should be.
+    """
+    return transcript_words(first) == transcript_words(second)
+
+
+class SpeculativeGeneration:
+    """
+    An LLM response started from an interim transcript that stayed stable, before endpointing produced the final
+    transcript.
+
+    The LLM stream is consumed in the background into a buffer and nothing is synthesized. If the final transcript
+    matches, replay() yields the buffered messages followed by the rest of the live stream, so the normal generation
+    path can process it as if the request had just been made. Otherwise cancel() stops the request.
+    """
+    def __init__(self, transcript, messages, meta_info, llm_stream):
+        self.transcript = transcript
+        self.messages = messages
+        self.meta_info = meta_info
+        self.started_at = time.time()
+        self.chunks = []
+        self.done = False
+        self.failed = False
+        self._llm_stream = llm_stream
+        self._chunk_available = asyncio.Event()
+        self.task = asyncio.create_task(self._consume())
+
+    async def _consume(self):
+        try:
+            async for llm_message in self._llm_stream:
+                self.chunks.append(llm_message)
+                self._chunk_available.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed = True
+            logger.error(f"Speculative generation failed {e}")
+        finally:
+            self.done = True
+            self._chunk_available.set()
+
+    def matches(self, transcript):
+        return not self.failed and transcripts_match(self.transcript, transcript)
+
+    async def replay(self):
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                return
+            self._chunk_available.clear()
+            await self._chunk_available.wait()
+
+    async def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        await self._llm_stream.aclose()
+
+    def count_tokens(self, model):
+        """Prompt and completion tokens spent on this generation, for accounting discarded speculations."""
+        completion = "".join(chunk[0] for chunk in self.chunks if isinstance(chunk[0], str))
+        try:
+            return token_counter(model=model, messages=list(self.messages)), token_counter(model=model, text=completion)
+        except Exception as e:
+            logger.error(f"Could not count speculative tokens {e}")
+            return 0, 0
@@ -0,0 +1,245 @@
+import time
+import struct
+import asyncio
+import subprocess
+import threading
+
+import numpy as np
+from pydub import AudioSegment
+
+from .logger_config import configure_logger
+from .audio_codec import StreamingResampler, parse_wav_header, pcm_to_wav, to_float32, to_int16
+
+logger = configure_logger(__name__)
+
+RAW_SOURCE_FORMATS = ("pcm", "wav")
+FFMPEG_DECODE_WAIT = 0.02  # how long decode() waits for ffmpeg to return the audio of the chunk it was given
+FFMPEG_OUTPUT_SETTLE = 0.003  # output that keeps coming within this belongs to the same input
+
+
+class _FfmpegDecoder:
+    """
+    One ffmpeg process per utterance. Compressed audio (mp3, opus...) is written to stdin as it arrives and 16 bit PCM
+    at the target rate is collected from stdout on a reader thread, so decoder state survives chunk boundaries instead
+    of every fragment being decoded from scratch. ffmpeg only releases its last frame at the end of input, which is
+    why an utterance ends with finish() rather than leaving the process running for the next one. Writing and waiting
+    block, so use it off the event loop.
+    """
+    def __init__(self, source_format, sample_rate, num_channels):
+        command = [AudioSegment.converter, "-hide_banner", "-loglevel", "error", "-fflags", "nobuffer",
+                   "-probesize", "32", "-f", source_format, "-i", "pipe:0",
+                   "-f", "s16le", "-ac", str(num_channels), "-ar", str(sample_rate), "-flush_packets", "1", "pipe:1"]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        self._output = bytearray()
+        self._output_ready = threading.Condition()
+        self._eof = False
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_stdout, daemon=True)
+        self._reader.start()
+
+    def _read_stdout(self):
+        while True:
+            data = self.process.stdout.read1(8192)
+            with self._output_ready:
+                if data:
+                    self._output.extend(data)
+                else:
+                    self._eof = True
+                self._output_ready.notify_all()
+            if not data:
+                break
+
+    def _drain(self, timeout=0, settle=FFMPEG_OUTPUT_SETTLE):
+        """Waits up to timeout for output to start, then until it stopped for settle, and returns all of it."""
+        deadline = time.monotonic() + timeout
+        with self._output_ready:
+            while not self._output and not self._eof and time.monotonic() < deadline:
+                self._output_ready.wait(deadline - time.monotonic())
+            while self._output and not self._eof and time.monotonic() < deadline + timeout:
+                size = len(self._output)
+                self._output_ready.wait(settle)
+                if len(self._output) == size:
+                    break
+            data = bytes(self._output)
+            self._output.clear()
+        return data
+
+    def decode(self, chunk, timeout=FFMPEG_DECODE_WAIT):
+        """Returns the audio ffmpeg produced for chunk, waiting at most timeout for it."""
+        try:
+            self.process.stdin.write(chunk)
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            # expected when the transcoder was reset while this chunk was being written
+            if not self._closed:
+                logger.error(f"ffmpeg decoder is no longer accepting input {e}")
+        return self._drain(timeout)
+
+    def finish(self, timeout=5):
+        """Ends the input and returns everything left, including the last frame, then stops the process."""
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._reader.join(timeout)
+        self.close()
+        return self._drain()
+
+    def close(self):
+        self._closed = True
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+
+class StreamTranscoder:
+    """
+    Per call transcoder for streamed TTS audio. Feed it provider chunks with transcode() and it returns audio in the
+    target sample rate and output format ("wav" chunks with their own header, or raw "pcm"). Decoder and resampler
+    state is kept across chunks; call flush() at the end of each utterance, reset() on interruption and finish() at
+    the end of the stream.
+
+    source_format is "pcm" (16 bit little endian, needs source_sample_rate), "wav", or anything ffmpeg can decode.
+    Compressed input blocks for up to decode_wait while ffmpeg decodes it, so on the event loop use atranscode() and
+    aflush(), which do that on a worker thread. reset() may then run on the loop while a chunk is being decoded: the
+    decoder swap happens under a lock and audio from a decoder that was reset in the meantime is dropped.
+    """
+    def __init__(self, source_format, target_sample_rate, source_sample_rate=None, num_channels=1,
+                 output_format="wav", decode_wait=FFMPEG_DECODE_WAIT):
+        self.source_format = source_format
+        self.target_sample_rate = int(target_sample_rate)
+        self.source_sample_rate = int(source_sample_rate) if source_sample_rate else None
+        self.num_channels = num_channels
+        self.output_format = output_format
+        self.decode_wait = decode_wait
+        self.frame_width = 2 * num_channels
+        self._decoder = None
+        self._decoder_lock = threading.Lock()
+        self._resampler = None
+        self._header_buffer = b''
+        self._remainder = b''
+
+    def _ensure_resampler(self, sample_rate, num_channels):
+        if self._resampler is None:
+            self.num_channels = num_channels
+            self.frame_width = 2 * num_channels
+            self._resampler = StreamingResampler(sample_rate, self.target_sample_rate, num_channels)
+
+    def _decode_raw(self, chunk):
+        if self.source_format == "wav" and self._resampler is None:
+            self._header_buffer += chunk
+            try:
+                info = parse_wav_header(self._header_buffer)
+            except (ValueError, struct.error):
+                # header not complete yet, wait for more bytes
+                return b''
+            if info.sample_width != 2:
+                raise ValueError(f"StreamTranscoder only supports 16 bit WAV input, got {info.sample_width * 8} bit")
+            self._ensure_resampler(info.sample_rate, info.num_channels)
+            chunk = self._header_buffer[info.data_offset:]
+            self._header_buffer = b''
+        elif self._resampler is None:
+            if self.source_sample_rate is None:
+                raise ValueError("source_sample_rate is required for raw pcm input")
+            self._ensure_resampler(self.source_sample_rate, self.num_channels)
+        return chunk
+
+    def _frame_aligned(self, pcm):
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % self.frame_width
+        self._remainder = pcm[usable:]
+        return pcm[:usable]
+
+    def _resample(self, pcm, final=False):
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.num_channels).T
+        resampled = self._resampler.process(to_float32(samples))
+        if final:
+            resampled = np.concatenate((resampled, self._resampler.flush()), axis=1)
+        return to_int16(resampled.T.ravel()).tobytes()
+
+    def _encode(self, pcm):
+        if not pcm:
+            return b''
+        if self.output_format == "pcm":
+            return pcm
+        return pcm_to_wav(pcm, self.target_sample_rate, self.num_channels)
+
+    def transcode(self, chunk):
+        """Returns the audio that is ready for this chunk. Can be b'' while the decoder or resampler fills up."""
+        if not chunk:
+            return b''
+
+        if self.source_format in RAW_SOURCE_FORMATS:
+            pcm = self._frame_aligned(self._decode_raw(chunk))
+            if self._resampler is None or not pcm:
+                return b''
+            return self._encode(self._resample(pcm))
+
+        with self._decoder_lock:
+            if self._decoder is None:
+                self._decoder = self._new_decoder()
+            decoder = self._decoder
+        pcm = decoder.decode(chunk, self.decode_wait)
+        with self._decoder_lock:
+            if decoder is not self._decoder:
+                # reset (or a flush) retired this decoder while it was decoding, its audio is stale
+                return b''
+            return self._encode(self._frame_aligned(pcm))
+
+    def _new_decoder(self):
+        return _FfmpegDecoder(self.source_format, self.target_sample_rate, self.num_channels)
+
+    def _finish_decoder(self, respawn):
+        """Everything the current decoder still holds, with a fresh one (if respawn) already starting for what follows."""
+        with self._decoder_lock:
+            decoder = self._decoder
+            if decoder is None:
+                return b''
+            self._decoder = self._new_decoder() if respawn else None
+            remainder, self._remainder = self._remainder, b''
+        pcm = remainder + decoder.finish()
+        # a partial frame left at the end of the utterance can't belong to the next one
+        return pcm[:len(pcm) - len(pcm) % self.frame_width]
+
+    async def atranscode(self, chunk):
+        if self.source_format in RAW_SOURCE_FORMATS:
+            return self.transcode(chunk)
+        return await asyncio.to_thread(self.transcode, chunk)
+
+    def flush(self):
+        """Ends the current utterance, returning any audio held back, and leaves the transcoder ready for the next one."""
+        if self.source_format in RAW_SOURCE_FORMATS:
+            pcm = self._frame_aligned(b'')
+            audio = self._resample(pcm, final=True) if self._resampler is not None else b''
+            self.reset()
+        else:
+            # ending the input is the only way to get ffmpeg's last frame out, so each utterance gets its own process
+            audio = self._finish_decoder(respawn=True)
+        return self._encode(audio)
+
+    async def aflush(self):
+        if self.source_format in RAW_SOURCE_FORMATS:
+            return self.flush()
+        return await asyncio.to_thread(self.flush)
+
+    def finish(self):
+        """Ends the stream, returning everything left including what the decoder still holds. Blocking."""
+        if self.source_format in RAW_SOURCE_FORMATS:
+            return self.flush()
+        audio = self._finish_decoder(respawn=False)
+        self.reset()
+        return self._encode(audio)
+
+    def reset(self):
+        """Drops all buffered audio, e.g. when the caller interrupts the agent mid utterance."""
+        with self._decoder_lock:
+            decoder, self._decoder = self._decoder, None
+            self._resampler = None
+            self._header_buffer = b''
+            self._remainder = b''
+        if decoder is not None:
+            decoder.close()
+
+    def close(self):
+        self.reset()
@@ -0,0 +1,149 @@
+import bisect
+import time
+from collections import OrderedDict
+
+from .logger_config import configure_logger
+from .metrics import get_call_metrics
+
+logger = configure_logger(__name__)
+
+# Upper bounds in ms, the last bucket is +Inf
+LATENCY_BUCKETS_MS = (50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+# Child spans of a turn in the order they normally happen
+TURN_SPANS = ("endpointing", "llm_first_token", "llm_completion", "tts_first_byte", "first_audio_sent",
+              "first_mark_ack")
+
+
+class LatencyHistogram:
+    """Cumulative bucketed histogram of durations in ms, same shape as a Prometheus histogram."""
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        self.max = max(self.max, value_ms)
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, the resolution a bucketed histogram allows."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum_ms": round(self.sum, 1), "max_ms": round(self.max, 1),
+                "mean_ms": round(self.sum / self.count, 1) if self.count else None,
+                "p50_ms": self.quantile(0.5), "p90_ms": self.quantile(0.9), "p99_ms": self.quantile(0.99),
+                "buckets": buckets}
+
+
+class TurnTracer:
+    """
+    Lightweight per call tracing. Every turn gets a root span keyed by sequence_id, opened when the user's final
+    transcript comes in (backdated to when they last spoke if that is known) and closed when the first mark for the
+    response is acknowledged. Components start and end named child spans on it; only the first occurrence of each
+    child span counts, so "first token" and "first byte" style spans can be ended from inside streaming loops.
+
+    get_timeline() is the per call view, get_histograms() aggregates the duration of each child span and of the
+    overall voice to voice latency (turn start to first audio sent) across the turns of the call.
+    """
+    def __init__(self, max_turns=500):
+        self.call_started_at = time.time()
+        self.max_turns = max_turns
+        self.turns = OrderedDict()
+        self.histograms = {}
+        self.user_spoke_at = None
+
+    def note_user_speech(self, timestamp=None):
+        """Called for every interim result, the next turn is backdated to the last one."""
+        self.user_spoke_at = timestamp or time.time()
+
+    def take_speech_end(self, default):
+        """When the user stopped talking this turn, default if no interim result said so. Resets for the next turn."""
+        speech_ended_at, self.user_spoke_at = self.user_spoke_at or default, None
+        return speech_ended_at
+
+    def start_turn(self, sequence_id, turn_id=None, start_time=None, **attributes):
+        if sequence_id in self.turns:
+            return
+        now = time.time()
+        self.turns[sequence_id] = {"turn_id": turn_id, "start": start_time or now, "end": None,
+                                   "attributes": attributes, "spans": {}}
+        if len(self.turns) > self.max_turns:
+            self.turns.popitem(last=False)
+
+    def start_span(self, sequence_id, name, timestamp=None):
+        turn = self.turns.get(sequence_id)
+        if turn is None or name in turn["spans"]:
+            return
+        turn["spans"][name] = {"start": timestamp or time.time(), "end": None}
+
+    def end_span(self, sequence_id, name, timestamp=None, start_time=None):
+        """Ends the child span, opening it at start_time (or the start of the turn) if nobody started it."""
+        turn = self.turns.get(sequence_id)
+        if turn is None:
+            return
+        span = turn["spans"].get(name)
+        if span is None:
+            span = turn["spans"][name] = {"start": start_time or turn["start"], "end": None}
+        if span["end"] is not None:
+            return
+        span["end"] = timestamp or time.time()
+        self._observe(name, span["end"] - span["start"])
+        if name == "first_audio_sent":
+            self._observe("voice_to_voice", span["end"] - turn["start"])
+        elif name == "first_mark_ack":
+            self.end_turn(sequence_id, span["end"])
+
+    def end_turn(self, sequence_id, timestamp=None):
+        turn = self.turns.get(sequence_id)
+        if turn is not None and turn["end"] is None:
+            turn["end"] = timestamp or time.time()
+
+    def _observe(self, name, seconds):
+        if name not in self.histograms:
+            self.histograms[name] = LatencyHistogram()
+        self.histograms[name].observe(max(seconds, 0) * 1000)
+        get_call_metrics().turn_spans.labels(name).observe(max(seconds, 0))
+
+    @staticmethod
+    def _ms(start, end):
+        return round((end - start) * 1000, 1) if start is not None and end is not None else None
+
+    def get_timeline(self):
+        timeline = []
+        for sequence_id, turn in self.turns.items():
+            spans = {}
+            for name, span in turn["spans"].items():
+                spans[name] = {"start_ms": self._ms(turn["start"], span["start"]),
+                               "duration_ms": self._ms(span["start"], span["end"])}
+            timeline.append({"sequence_id": sequence_id, "turn_id": turn["turn_id"],
+                             "start_ms": self._ms(self.call_started_at, turn["start"]),
+                             "duration_ms": self._ms(turn["start"], turn["end"]),
+                             "spans": spans, **turn["attributes"]})
+        return timeline
+
+    def get_histograms(self):
+        return {name: histogram.to_dict() for name, histogram in self.histograms.items()}
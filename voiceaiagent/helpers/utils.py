@@ -3,25 +3,22 @@ import json
 import asyncio
 import math
 import re
-import copy
 import hashlib
 import os
 import traceback
 import io
 import wave
 import numpy as np
-import aiofiles
-import torch
-import torchaudio
-from scipy.io import wavfile
 from botocore.exceptions import BotoCoreError, ClientError
 from aiobotocore.session import AioSession
 from contextlib import AsyncExitStack
 from dotenv import load_dotenv
 from pydantic import create_model
 from .logger_config import configure_logger
+from . import audio_codec, g711
+from .request_log_writer import get_request_log_writer
+from .meta_info import MetaInfo
 from bolna.constants import PREPROCESS_DIR, PRE_FUNCTION_CALL_MESSAGE, DEFAULT_LANGUAGE_CODE, TRANSFERING_CALL_FILLER
-from pydub import AudioSegment
 
 logger = configure_logger(__name__)
 load_dotenv()
@@ -53,11 +50,24 @@ def write_json_file(file_path, data):
         json.dump(data, file, indent=4, ensure_ascii=False)
 
 
+def get_provider_base_url(env_name, default):
+    """Base URL of a provider's API, overridable with env_name (e.g. to point at a local emulator)."""
+    return os.getenv(env_name, default).rstrip("/")
+
+
+def to_websocket_url(base_url):
+    """https://host -> wss://host and http://host -> ws://host, so one base URL covers a provider's HTTP and websocket APIs."""
+    if base_url.startswith("https://"):
+        return "wss://" + base_url[len("https://"):]
+    if base_url.startswith("http://"):
+        return "ws://" + base_url[len("http://"):]
+    return base_url
+
+
 def create_ws_data_packet(data, meta_info=None, is_md5_hash=False, llm_generated=False):
-    metadata = copy.deepcopy(meta_info)
+    metadata = None
     if meta_info is not None: #It'll be none in case we connect through dashboard playground
-        metadata["is_md5_hash"] = is_md5_hash
-        metadata["llm_generated"] = llm_generated
+        metadata = MetaInfo(meta_info, is_md5_hash=is_md5_hash, llm_generated=llm_generated)
     return {
         'data': data,
         'meta_info': metadata
@@ -92,13 +102,7 @@ def float32_to_int16(float_audio):
     return int16_audio
 
 def wav_bytes_to_pcm(wav_bytes):
-    wav_buffer = io.BytesIO(wav_bytes)
-    rate, data = wavfile.read(wav_buffer)
-    if data.dtype == np.int16:
-        return data.tobytes()
-    if data.dtype == np.float32:
-        data = float32_to_int16(data)
-        return data.tobytes()
+    return audio_codec.wav_to_pcm(wav_bytes)
 
 
 # def wav_bytes_to_pcm(wav_bytes):
@@ -116,11 +120,7 @@ def wav_bytes_to_pcm(wav_bytes):
 
 
 def raw_to_mulaw(raw_bytes):
-    # Convert bytes to numpy array of int16 values
-    samples = np.frombuffer(raw_bytes, dtype=np.int16)
-    samples = samples.astype(np.float32) / (2 ** 15)
-    mulaw_encoded = mu_law_encode(samples)
-    return mulaw_encoded
+    return g711.encode_ulaw(raw_bytes)
 
 
 async def get_s3_file(bucket_name = BUCKET_NAME, file_key = ""):
@@ -352,51 +352,20 @@ def yield_chunks_from_memory(audio_bytes, chunk_size=512):
 
 
 def pcm_to_wav_bytes(pcm_data, sample_rate=16000, num_channels=1, sample_width=2):
-    buffer = io.BytesIO()
-    bit_depth = 16 
-    if len(pcm_data)%2 == 1:
-        pcm_data += b'\x00'
-    tensor_pcm = torch.frombuffer(pcm_data, dtype=torch.int16)
-    tensor_pcm = tensor_pcm.float() / (2**(bit_depth - 1))  
-    tensor_pcm = tensor_pcm.unsqueeze(0)  
-    torchaudio.save(buffer, tensor_pcm, sample_rate, format='wav')
-    return buffer.getvalue()
+    return audio_codec.pcm_to_wav(pcm_data, sample_rate, num_channels, sample_width)
 
 
 def convert_audio_to_wav(audio_bytes, source_format = 'flac'):
     logger.info(f"CONVERTING AUDIO TO WAV {source_format}")
-    audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=source_format)
-    logger.info(f"GOT audio wav {audio}")
-    buffer = io.BytesIO()
-    audio.export(buffer, format="wav")
-    logger.info(f"SENDING BACK WAV")
-    return buffer.getvalue()
+    return audio_codec.convert_to_wav(audio_bytes, source_format)
 
 
 def resample(audio_bytes, target_sample_rate, format = "mp3"):
-    audio_buffer = io.BytesIO(audio_bytes)
-    waveform, orig_sample_rate = torchaudio.load(audio_buffer, format = format)
-    if orig_sample_rate == target_sample_rate:
-        return audio_bytes
-    resampler = torchaudio.transforms.Resample(orig_sample_rate, target_sample_rate)
-    audio_waveform = resampler(waveform)
-    audio_buffer = io.BytesIO()
-    logger.info(f"Resampling from {orig_sample_rate} to {target_sample_rate}")
-    torchaudio.save(audio_buffer, audio_waveform, target_sample_rate, format="wav")
-    return audio_buffer.getvalue()
+    return audio_codec.convert_to_wav(audio_bytes, format, target_sample_rate=target_sample_rate)
 
 
 def merge_wav_bytes(wav_files_bytes):
-    combined = AudioSegment.empty()
-    for wav_bytes in wav_files_bytes:
-        file_like_object = io.BytesIO(wav_bytes)
-
-        audio_segment = AudioSegment.from_file(file_like_object, format="wav")
-        combined += audio_segment
-
-    buffer = io.BytesIO()
-    combined.export(buffer, format="wav")
-    return buffer.getvalue()
+    return audio_codec.merge_wav(wav_files_bytes)
 
 
 def calculate_audio_duration(size_bytes, sampling_rate, bit_depth = 16, channels = 1, format = "wav"):
@@ -435,92 +404,24 @@ Message type
 
 
 async def write_request_logs(message, run_id):
-    component_details = [None, None, None, None, None]
-    message_data = message.get('data', '')
-    if message_data is None:
-        message_data = ''
-
-    row = [message['time'], message["component"], message["direction"], message["leg_id"], message['sequence_id'], message['model']]
-    if message["component"] in ("llm", "llm_hangup"):
-        component_details = [message_data, message.get('input_tokens', 0), message.get('output_tokens', 0), None, message.get('latency', None), message['cached'], None]
-    elif message["component"] == "transcriber":
-        component_details = [message_data, None, None, None, message.get('latency', None), False, message.get('is_final', False)]
-    elif message["component"] == "synthesizer":
-        component_details = [message_data, None, None, len(message_data), message.get('latency', None), message['cached'], None, message['engine']]
-    elif message["component"] == "function_call":
-        component_details = [message_data, None, None, None, message.get('latency', None), None, None, None]
-
-    row = row + component_details
-
-    header = "Time,Component,Direction,Leg ID,Sequence ID,Model,Data,Input Tokens,Output Tokens,Characters,Latency,Cached,Final Transcript,Engine\n"
-    log_string = ','.join(['"' + str(item).replace('"', '""') + '"' if item is not None else '' for item in row]) + '\n'
-    log_dir = f"./logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_file_path = f"{log_dir}/{run_id}.csv"
-    file_exists = os.path.exists(log_file_path)
-
-    async with aiofiles.open(log_file_path, mode='a') as log_file:
-        if not file_exists:
-            await log_file.write(header+log_string)
-        else:
-            await log_file.write(log_string)
-
-
-async def save_audio_file_to_s3(conversation_recording, sampling_rate = 24000, assistant_id=None, run_id=None):
-    last_frame_end_time = conversation_recording['output'][0]['start_time']
-    logger.info(f"LENGTH OF OUTPUT AUDIO {len(conversation_recording['output'])}")
-    initial_gap = (last_frame_end_time - conversation_recording["metadata"]["started"] ) *1000
-    logger.info(f"Initial gap {initial_gap}")
-    combined_audio = AudioSegment.silent(duration=initial_gap, frame_rate=sampling_rate)
-    for i, frame in enumerate(conversation_recording['output']):
-        frame_start_time =  frame['start_time']
-        logger.info(f"Processing frame {i}, fram start time = {last_frame_end_time}, frame start time= {frame_start_time}")
-        if last_frame_end_time < frame_start_time:
-            gap_duration_samples = frame_start_time - last_frame_end_time
-            silence = AudioSegment.silent(duration=gap_duration_samples*1000, frame_rate=sampling_rate)
-            combined_audio += silence
-        last_frame_end_time = frame_start_time + frame['duration']
-        frame_as = AudioSegment.from_file(io.BytesIO(frame['data']), format = "wav")
-        combined_audio +=frame_as
-
-    webm_segment = AudioSegment.from_file(io.BytesIO(conversation_recording['input']["data"]))
-    wav_bytes = io.BytesIO()
-    webm_segment.export(wav_bytes, format="wav")
-    wav_bytes.seek(0)  # Reset the pointer to the start
-    waveform, sample_rate = torchaudio.load(wav_bytes)
-    resampler = torchaudio.transforms.Resample(orig_freq=sample_rate, new_freq=sampling_rate)
-    downsampled_waveform = resampler(waveform)
-    torchaudio_wavio = io.BytesIO()
-    torchaudio.save(torchaudio_wavio, downsampled_waveform, sampling_rate, format= "wav")
-    audio_segment_bytes = io.BytesIO()
-    combined_audio.export(audio_segment_bytes, format="wav")
-    audio_segment_bytes.seek(0)
-    waveform_audio_segment, sample_rate = torchaudio.load(audio_segment_bytes)
-
-    if waveform_audio_segment.shape[0] > 1:
-        waveform_audio_segment = waveform_audio_segment[:1, :]
-
-    # Adjust shapes to be [1, N] if not already
-    downsampled_waveform = downsampled_waveform.unsqueeze(0) if downsampled_waveform.dim() == 1 else downsampled_waveform
-    waveform_audio_segment = waveform_audio_segment.unsqueeze(0) if waveform_audio_segment.dim() == 1 else waveform_audio_segment
-
-    # Ensure both waveforms have the same length
-    max_length = max(downsampled_waveform.size(1), waveform_audio_segment.size(1))
-    downsampled_waveform_padded = torch.nn.functional.pad(downsampled_waveform, (0, max_length - downsampled_waveform.size(1)))
-    waveform_audio_segment_padded = torch.nn.functional.pad(waveform_audio_segment, (0, max_length - waveform_audio_segment.size(1)))
-    stereo_waveform = torch.cat((downsampled_waveform_padded, waveform_audio_segment_padded), 0)
-
-    # Verify the stereo waveform shape is [2, M]
-    assert stereo_waveform.shape[0] == 2, "Stereo waveform should have 2 channels."
-    key = f'{assistant_id + run_id}.wav'
+    get_request_log_writer(run_id).log(message)
 
-    audio_buffer = io.BytesIO()
-    torchaudio.save(audio_buffer, stereo_waveform, 24000, format="wav")
-    audio_buffer.seek(0)
 
-    logger.info(f"Storing in {RECORDING_BUCKET_URL}{key}")
-    await store_file(bucket_name=RECORDING_BUCKET_NAME, file_key=key, file_data=audio_buffer, content_type="wav")
-    
+async def save_audio_file_to_s3(call_recorder, assistant_id=None, run_id=None):
+    """Finalizes the CallRecorder's spool file off the event loop and streams it to the recording bucket."""
+    if call_recorder.is_empty():
+        logger.info("Nothing was recorded for this call")
+        call_recorder.close()
+        return ""
+
+    key = f'{assistant_id + run_id}.wav'
+    try:
+        recording_file = await asyncio.to_thread(call_recorder.finalize)
+        logger.info(f"Storing in {RECORDING_BUCKET_URL}{key}")
+        await store_file(bucket_name=RECORDING_BUCKET_NAME, file_key=key, file_data=recording_file, content_type="wav")
+    finally:
+        call_recorder.close()
+
     return f'{RECORDING_BUCKET_URL}{key}'
 
 
@@ -561,7 +462,7 @@ def convert_to_request_log(message, meta_info, model, component="transcriber", d
     else:
         log['is_final'] = False #This is logged only for users to know final transcript from the transcriber
     log['engine'] = engine
-    asyncio.create_task(write_request_logs(log, run_id))
+    get_request_log_writer(run_id).log(log)
 
 
 def get_route_info(message, route_layer):
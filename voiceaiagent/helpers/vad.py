@@ -1,30 +1,54 @@
 import os
-import subprocess
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import torch
 import numpy as np
 import onnxruntime
 from .logger_config import configure_logger
+from .audio_codec import to_float32
 logger = configure_logger(__name__)
 
+SAMPLE_RATES = (8000, 16000)
+
+
+def create_vad_session(num_threads=1):
+    path = VAD.download()
+    opts = onnxruntime.SessionOptions()
+    opts.log_severity_level = 3
+    opts.inter_op_num_threads = 1
+    opts.intra_op_num_threads = num_threads
+    return onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'], sess_options=opts)
+
+
+def get_state_layout(session):
+    """
+    Returns (state_names, state_dim, context_samples_per_8k) for the loaded silero export. v4 models carry separate
+    h and c tensors of shape (2, batch, 64), v5 models a single (2, batch, 128) state and expect the tail of the
+    previous frame prepended to each input.
+    """
+    input_names = [i.name for i in session.get_inputs()]
+    if "state" in input_names:
+        return ("state",), 128, 32
+    return ("h", "c"), 64, 0
+
 
 class VAD():
+    """Single stream silero VAD. Use VADEngine when scoring many calls at once."""
 
-    def __init__(self):
-        path = self.download()
-        opts = onnxruntime.SessionOptions()
-        opts.log_severity_level = 3
-        opts.inter_op_num_threads = 1
-        opts.intra_op_num_threads = 1
-        self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'], sess_options=opts)
+    def __init__(self, session=None):
+        self.session = session or create_vad_session()
+        self.state_names, self.state_dim, self.context_per_8k = get_state_layout(self.session)
         self.reset_states()
-        self.sample_rates = [8000, 16000]
+        self.sample_rates = list(SAMPLE_RATES)
 
     def _validate_input(self, x, sr: int):
-        if x.dim() == 1:
-            x = x.unsqueeze(0)
-        if x.dim() > 2:
-            raise ValueError(f"Too many dimensions for input audio chunk {x.dim()}")
+        x = to_float32(np.asarray(x))
+        if x.ndim == 1:
+            x = x[np.newaxis, :]
+        if x.ndim > 2:
+            raise ValueError(f"Too many dimensions for input audio chunk {x.ndim}")
 
         if sr != 16000 and (sr % 16000 == 0):
             step = sr // 16000
@@ -37,18 +61,16 @@ class VAD():
         if sr / x.shape[1] > 31.25:
             raise ValueError("Input audio chunk is too short")
 
-        return x, sr
+        return np.ascontiguousarray(x), sr
 
     def reset_states(self, batch_size=1):
-        self._h = np.zeros((2, batch_size, 64)).astype('float32')
-        self._c = np.zeros((2, batch_size, 64)).astype('float32')
+        self._states = {name: np.zeros((2, batch_size, self.state_dim), dtype=np.float32) for name in self.state_names}
+        self._context = None
         self._last_sr = 0
         self._last_batch_size = 0
 
     def __call__(self, x, sr: int):
-
         x, sr = self._validate_input(x, sr)
-        logger.info(f"Validation done")
         batch_size = x.shape[0]
 
         if not self._last_batch_size:
@@ -58,17 +80,19 @@ class VAD():
         if (self._last_batch_size) and (self._last_batch_size != batch_size):
             self.reset_states(batch_size)
 
-        if sr in [8000, 16000]:
-            ort_inputs = {'input': x.numpy(), 'h': self._h, 'c': self._c, 'sr': np.array(sr, dtype='int64')}
-            ort_outs = self.session.run(None, ort_inputs)
-            out, self._h, self._c = ort_outs
-        else:
-            raise ValueError()
+        context_size = self.context_per_8k * sr // 8000
+        if context_size:
+            if self._context is None:
+                self._context = np.zeros((batch_size, context_size), dtype=np.float32)
+            x = np.concatenate([self._context, x], axis=1)
+            self._context = x[:, -context_size:]
+
+        ort_inputs = {'input': x, 'sr': np.array(sr, dtype='int64'), **self._states}
+        out, *states = self.session.run(None, ort_inputs)
+        self._states = dict(zip(self.state_names, states))
 
         self._last_sr = sr
         self._last_batch_size = batch_size
-
-        out = torch.tensor(out)
         return out
 
     def audio_forward(self, x, sr: int, num_samples: int = 512):
@@ -77,7 +101,7 @@ class VAD():
 
         if x.shape[1] % num_samples:
             pad_num = num_samples - (x.shape[1] % num_samples)
-            x = torch.nn.functional.pad(x, (0, pad_num), 'constant', value=0.0)
+            x = np.pad(x, ((0, 0), (0, pad_num)))
 
         self.reset_states(x.shape[0])
         for i in range(0, x.shape[1], num_samples):
@@ -85,8 +109,7 @@ class VAD():
             out_chunk = self.__call__(wavs_batch, sr)
             outs.append(out_chunk)
 
-        stacked = torch.cat(outs, dim=1)
-        return stacked.cpu()
+        return np.concatenate(outs, axis=1)
 
     @staticmethod
     def download(model_url="https://github.com/snakers4/silero-vad/raw/master/files/silero_vad.onnx"):
@@ -110,3 +133,251 @@ class VAD():
                 logger.error(f"Failed to download the model. {e}")
 
         return model_filename
+
+
+class VADStream:
+    """
+    One call's view of a VADEngine. feed() accepts audio of any length (int16 pcm bytes or a sample array at the
+    engine's rate), cuts it into frames and queues them for scoring; probabilities of each frame, in order, show up
+    on the probabilities queue. process() is the awaitable form that returns the probabilities for what was fed.
+    """
+    def __init__(self, engine, slot, stream_id):
+        self.engine = engine
+        self.slot = slot
+        self.stream_id = stream_id
+        self.closed = False
+        self.queued = False
+        self.reset_pending = False
+        self.probabilities = asyncio.Queue()
+        self.frames = deque()
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._context = np.zeros(engine.context_size, dtype=np.float32)
+
+    def _to_samples(self, audio):
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            audio = np.frombuffer(audio, dtype=np.int16)
+        return to_float32(np.asarray(audio)).reshape(-1)
+
+    def feed(self, audio):
+        if self.closed:
+            raise RuntimeError(f"VAD stream {self.stream_id} is closed")
+        samples = self._to_samples(audio)
+        if len(self._remainder):
+            samples = np.concatenate([self._remainder, samples])
+        frame_size = self.engine.frame_size
+        usable = len(samples) - len(samples) % frame_size
+        futures = [self.engine.submit(self, samples[i:i + frame_size]) for i in range(0, usable, frame_size)]
+        self._remainder = samples[usable:].copy()
+        return futures
+
+    async def process(self, audio):
+        futures = self.feed(audio)
+        return list(await asyncio.gather(*futures)) if futures else []
+
+    def reset(self):
+        """Forgets buffered audio and recurrent state, e.g. at the start of a new turn."""
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self.engine.reset_stream(self)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.engine.unregister_stream(self)
+
+
+class VADEngine:
+    """
+    Process wide silero VAD for every concurrent call at one sample rate. All streams share a single ONNX session;
+    each stream owns a slot in the batched recurrent state arrays, so the next pending frame of every stream is
+    scored together in one session.run and the updated state is scattered back to the slots. A stream never has
+    more than one frame in a batch because frame n+1 depends on the state frame n leaves behind.
+
+    Inference runs on a single worker thread; frames that arrive while a batch is running are picked up by the next
+    one, so the batch size grows with load instead of with a timer.
+    """
+    def __init__(self, session=None, sample_rate=16000, max_batch_size=128, initial_capacity=16):
+        if sample_rate not in SAMPLE_RATES:
+            raise ValueError(f"Supported sampling rates: {SAMPLE_RATES}")
+        self.session = session or create_vad_session()
+        self.sample_rate = sample_rate
+        self.frame_size = 512 if sample_rate == 16000 else 256
+        self.max_batch_size = max_batch_size
+        self.state_names, self.state_dim, context_per_8k = get_state_layout(self.session)
+        self.context_size = context_per_8k * sample_rate // 8000
+        self._sr = np.array(sample_rate, dtype='int64')
+        self._states = {name: np.zeros((2, initial_capacity, self.state_dim), dtype=np.float32)
+                        for name in self.state_names}
+        self._capacity = initial_capacity
+        self._free_slots = list(range(initial_capacity - 1, -1, -1))
+        self._streams = {}
+        self._ready = deque()
+        self._closing = []
+        self._worker = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vad")
+        self._next_stream_id = 0
+        self.stats = {"frames": 0, "batches": 0, "max_batch_size": 0}
+
+    def register_stream(self, stream_id=None):
+        if stream_id is None:
+            stream_id = self._next_stream_id
+            self._next_stream_id += 1
+        if not self._free_slots:
+            self._grow()
+        stream = VADStream(self, self._free_slots.pop(), stream_id)
+        self._clear_slot(stream.slot)
+        self._streams[stream_id] = stream
+        return stream
+
+    def unregister_stream(self, stream):
+        stream.closed = True
+        self._streams.pop(stream.stream_id, None)
+        self._cancel_frames(stream)
+        if self._worker is None or self._worker.done():
+            self._free_slots.append(stream.slot)
+        else:
+            # a running batch may still scatter state into this slot, hand it back once that batch is done
+            self._closing.append(stream.slot)
+
+    def reset_stream(self, stream):
+        self._cancel_frames(stream)
+        stream._context = np.zeros(self.context_size, dtype=np.float32)
+        if self._worker is None or self._worker.done():
+            self._clear_slot(stream.slot)
+        else:
+            stream.reset_pending = True
+
+    def _cancel_frames(self, stream):
+        for _, future in stream.frames:
+            future.cancel()
+        stream.frames.clear()
+
+    def _clear_slot(self, slot):
+        for state in self._states.values():
+            # slots past the end of the arrays are not allocated yet and start out zeroed once they are
+            if slot < state.shape[1]:
+                state[:, slot, :] = 0
+
+    def _grow(self):
+        capacity = self._capacity
+        self._capacity = capacity * 2
+        self._free_slots.extend(range(capacity * 2 - 1, capacity - 1, -1))
+        if self._worker is None or self._worker.done():
+            self._resize_states()
+        # otherwise a running batch still reads and scatters into the current arrays, they get resized once it is done
+
+    def _resize_states(self):
+        for name, state in self._states.items():
+            capacity = state.shape[1]
+            if capacity < self._capacity:
+                grown = np.zeros((2, self._capacity, self.state_dim), dtype=np.float32)
+                grown[:, :capacity, :] = state
+                self._states[name] = grown
+
+    def submit(self, stream, frame):
+        """Queues one frame of stream and returns a future for its speech probability."""
+        future = asyncio.get_running_loop().create_future()
+        if not stream.queued:
+            stream.queued = True
+            self._ready.append(stream)
+        stream.frames.append((frame, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return future
+
+    def _take_batch(self):
+        batch = []
+        while self._ready and len(batch) < self.max_batch_size:
+            stream = self._ready.popleft()
+            stream.queued = False
+            if stream.closed or not stream.frames:
+                continue
+            frame, future = stream.frames.popleft()
+            batch.append((stream, frame, future))
+        return batch
+
+    def infer(self, slots, frames):
+        """
+        Scores one frame per slot in a single session.run, advancing those slots' state. frames is (batch,
+        frame_size) float32, already prefixed with context samples for models that need it.
+        """
+        index = np.asarray(slots)
+        ort_inputs = {'input': frames, 'sr': self._sr}
+        for name, state in self._states.items():
+            ort_inputs[name] = state[:, index, :]
+        out, *states = self.session.run(None, ort_inputs)
+        for name, state in zip(self.state_names, states):
+            self._states[name][:, index, :] = state
+        return out[:, 0]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._ready:
+                batch = self._take_batch()
+                if not batch:
+                    continue
+                frames = np.empty((len(batch), self.context_size + self.frame_size), dtype=np.float32)
+                for row, (stream, frame, _) in enumerate(batch):
+                    frames[row, :self.context_size] = stream._context
+                    frames[row, self.context_size:] = frame
+                    if self.context_size:
+                        stream._context = frames[row, -self.context_size:].copy()
+                    # the stream's next frame can go into the following batch
+                    if stream.frames and not stream.queued:
+                        stream.queued = True
+                        self._ready.append(stream)
+
+                try:
+                    probabilities = await loop.run_in_executor(self._executor, self.infer,
+                                                               [stream.slot for stream, _, _ in batch], frames)
+                except Exception as e:
+                    logger.error(f"VAD batch of {len(batch)} frames failed {e}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                finally:
+                    # resets and slot changes deferred while the batch ran apply whether or not it succeeded
+                    self._settle_streams()
+
+                self.stats["frames"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+                for (stream, _, future), probability in zip(batch, probabilities):
+                    if stream.closed:
+                        continue
+                    probability = float(probability)
+                    if not future.done():
+                        future.set_result(probability)
+                    stream.probabilities.put_nowait(probability)
+        finally:
+            self._settle_streams()
+
+    def _settle_streams(self):
+        self._resize_states()
+        self._free_slots.extend(self._closing)
+        self._closing.clear()
+        for stream in self._streams.values():
+            if stream.reset_pending:
+                stream.reset_pending = False
+                self._clear_slot(stream.slot)
+
+    def get_stats(self):
+        frames, batches = self.stats["frames"], self.stats["batches"]
+        return dict(self.stats, streams=len(self._streams), mean_batch_size=frames / batches if batches else 0)
+
+
+_vad_session = None
+_vad_engines = {}
+_vad_lock = threading.Lock()
+
+
+def get_vad_engine(sample_rate=16000):
+    """Returns the process wide engine for sample_rate; engines for different rates share one ONNX session."""
+    global _vad_session
+    with _vad_lock:
+        if sample_rate not in _vad_engines:
+            if _vad_session is None:
+                _vad_session = create_vad_session()
+            _vad_engines[sample_rate] = VADEngine(session=_vad_session, sample_rate=sample_rate)
+        return _vad_engines[sample_rate]
@@ -1,6 +1,5 @@
 import asyncio
 import base64
-import time
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from bolna.helpers.logger_config import configure_logger
@@ -47,9 +46,7 @@ class DailyInputHandler:
                 'sequence': self.input_types['audio']
             })
         if self.conversation_recording:
-            if self.conversation_recording["metadata"]["started"] == 0:
-                self.conversation_recording["metadata"]["started"] = time.time()
-            self.conversation_recording['input']['data'] += data
+            self.conversation_recording.record_input(data)
 
         self.queues['transcriber'].put_nowait(ws_data_packet)
 
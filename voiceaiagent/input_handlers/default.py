@@ -28,6 +28,7 @@ class DefaultInputHandler:
         self._is_audio_being_played_to_user = False
         self.observable_variables = observable_variables
         self.mark_event_meta_data = mark_event_meta_data
+        self.turn_tracer = None
         self.audio_chunks_received = 0
         self.update_start_ts = time.time()
         self.io_provider = 'default'
@@ -88,6 +89,9 @@ class DefaultInputHandler:
             self.update_is_audio_being_played(True)
             return
 
+        if self.turn_tracer is not None and mark_event_meta_data_obj.get("is_first_chunk"):
+            self.turn_tracer.end_span(mark_event_meta_data_obj.get("sequence_id"), "first_mark_ack")
+
         self.audio_chunks_received += 1
         self.response_heard_by_user += mark_event_meta_data_obj.get("text_synthesized")
 
@@ -118,9 +122,7 @@ class DefaultInputHandler:
                 'sequence': self.input_types['audio']
             })
         if self.conversation_recording:
-            if self.conversation_recording["metadata"]["started"] ==0:
-                self.conversation_recording["metadata"]["started"] = time.time()
-            self.conversation_recording['input']['data'] += data
+            self.conversation_recording.record_input(data)
 
         self.queues['transcriber'].put_nowait(ws_data_packet)
     
@@ -70,12 +70,6 @@ class TelephonyInputHandler(DefaultInputHandler):
                     media_ts = int(media_data["timestamp"])
 
                     if 'chunk' in packet['media'] or ('track' in packet['media'] and packet['media']['track'] == 'inbound'):
-                        meta_info = {
-                            'io': self.io_provider,
-                            'call_sid': self.call_sid,
-                            'stream_sid': self.stream_sid,
-                            'sequence': self.input_types['audio']
-                        }
                         '''
                         if self.last_media_received + 20 < media_ts:
                             bytes_to_fill = 8 * (media_ts - (self.last_media_received + 20))
@@ -90,6 +84,13 @@ class TelephonyInputHandler(DefaultInputHandler):
                         if self.message_count == 10:
                             merged_audio = b''.join(buffer)
                             buffer = []
+                            # only built once per ingested 100 ms, not for every 20 ms media event
+                            meta_info = {
+                                'io': self.io_provider,
+                                'call_sid': self.call_sid,
+                                'stream_sid': self.stream_sid,
+                                'sequence': self.input_types['audio']
+                            }
                             await self.ingest_audio(merged_audio, meta_info)
                             self.message_count = 0
                     else:
@@ -1,2 +1,3 @@
 from .openai_llm import OpenAiLLM
 from .litellm import LiteLLM
+from .client_registry import LLMClientRegistry, get_llm_client_registry
@@ -0,0 +1,100 @@
+import os
+import asyncio
+import importlib.util
+
+import httpx
+import litellm
+from openai import AsyncOpenAI
+
+from bolna.helpers.logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+LLM_CLIENT_MAX_CONNECTIONS = int(os.getenv("LLM_CLIENT_MAX_CONNECTIONS", 200))
+LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS", 50))
+LLM_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("LLM_CLIENT_KEEPALIVE_EXPIRY", 120))
+LLM_CLIENT_CONNECT_TIMEOUT = float(os.getenv("LLM_CLIENT_CONNECT_TIMEOUT", 5))
+LLM_CLIENT_TIMEOUT = float(os.getenv("LLM_CLIENT_TIMEOUT", 600))
+# HTTP/2 needs the optional h2 package (httpx[http2]); without it the pool falls back to HTTP/1.1 keep-alive
+LLM_CLIENT_HTTP2 = os.getenv("LLM_CLIENT_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+LLM_PRECONNECT_URLS = [url.strip() for url in os.getenv("LLM_PRECONNECT_URLS", "").split(",") if url.strip()]
+
+
+class LLMClientRegistry:
+    """
+    Process wide LLM clients shared by every call.
+
+    OpenAI compatible clients are keyed by (provider, base_url, api_key) and all of them, as well as litellm's
+    openai compatible providers, send through one pooled httpx client with HTTP/2 and long lived keep-alive
+    connections. A new call therefore reuses a warm connection instead of paying for its own TCP and TLS handshake on
+    the first turn. preconnect() opens those connections ahead of the first call.
+    """
+    def __init__(self, max_connections=LLM_CLIENT_MAX_CONNECTIONS,
+                 max_keepalive_connections=LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry=LLM_CLIENT_KEEPALIVE_EXPIRY, http2=LLM_CLIENT_HTTP2):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
+        self._http_client = None
+        self._clients = {}
+        self.stats = {"clients_created": 0, "clients_reused": 0, "preconnects": 0, "preconnect_errors": 0}
+
+    def get_http_client(self):
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                http2=self.http2, limits=self.limits, follow_redirects=True,
+                timeout=httpx.Timeout(LLM_CLIENT_TIMEOUT, connect=LLM_CLIENT_CONNECT_TIMEOUT))
+        return self._http_client
+
+    def get_openai_client(self, provider="openai", base_url=None, api_key=None):
+        key = (provider, base_url, api_key)
+        client = self._clients.get(key)
+        if client is not None and not client.is_closed():
+            self.stats["clients_reused"] += 1
+            return client
+        logger.info(f"Creating shared {provider} client for base url {base_url}")
+        client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=self.get_http_client())
+        self._clients[key] = client
+        self.stats["clients_created"] += 1
+        return client
+
+    def configure_litellm(self):
+        """Makes litellm send its openai compatible requests through the shared pool as well."""
+        if litellm.aclient_session is not self.get_http_client():
+            litellm.aclient_session = self.get_http_client()
+
+    async def _preconnect(self, url):
+        try:
+            # any response, even a 404 or 401, leaves a warm connection in the pool
+            await self.get_http_client().head(url)
+            self.stats["preconnects"] += 1
+        except Exception as e:
+            self.stats["preconnect_errors"] += 1
+            logger.error(f"Could not preconnect to {url} {e}")
+
+    async def preconnect(self, urls=None):
+        urls = urls if urls is not None else LLM_PRECONNECT_URLS
+        if not urls:
+            return
+        logger.info(f"Preconnecting LLM clients to {urls}")
+        await asyncio.gather(*(self._preconnect(url) for url in urls))
+
+    def get_stats(self):
+        return dict(self.stats, clients=len(self._clients), http2=self.http2)
+
+    async def close(self):
+        self._clients = {}
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+_llm_client_registry = None
+
+
+def get_llm_client_registry():
+    global _llm_client_registry
+    if _llm_client_registry is None:
+        _llm_client_registry = LLMClientRegistry()
+    return _llm_client_registry
@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from bolna.constants import DEFAULT_LANGUAGE_CODE
 from bolna.helpers.utils import json_to_pydantic_schema, convert_to_request_log, compute_function_pre_call_message
 from .llm import BaseLLM
+from .client_registry import get_llm_client_registry
 from bolna.helpers.logger_config import configure_logger
 
 logger = configure_logger(__name__)
@@ -50,6 +51,7 @@ class LiteLLM(BaseLLM):
             self.trigger_function_call = False
         self.run_id = kwargs.get("run_id", None)
         self.gave_out_prefunction_call_message = False
+        get_llm_client_registry().configure_litellm()
 
     async def generate_stream(self, messages, synthesize=True, meta_info=None):
         answer, buffer = "", ""
@@ -59,7 +61,7 @@ class LiteLLM(BaseLLM):
         called_fun = None
 
         model_args = self.model_args.copy()
-        model_args["messages"] = messages
+        model_args["messages"] = list(messages)
         model_args["stream"] = True
 
         if self.trigger_function_call:
@@ -183,12 +185,14 @@ class LiteLLM(BaseLLM):
 
         self.started_streaming = False
 
-    async def generate(self, messages, stream=False, request_json=False, meta_info = None):
+    async def generate(self, messages, stream=False, request_json=False, meta_info = None, max_tokens=None):
         text = ""
         model_args = self.model_args.copy()
         model_args["model"] = self.model
-        model_args["messages"] = messages
+        model_args["messages"] = list(messages)
         model_args["stream"] = stream
+        if max_tokens is not None:
+            model_args["max_tokens"] = max_tokens
 
         if request_json is True:
             model_args['response_format'] = {
@@ -1,12 +1,13 @@
 import asyncio
 import os
 from dotenv import load_dotenv
-from openai import AsyncOpenAI, OpenAI
+from openai import OpenAI
 import json, requests, time
 
 from bolna.constants import CHECKING_THE_DOCUMENTS_FILLER, DEFAULT_LANGUAGE_CODE
 from bolna.helpers.utils import convert_to_request_log, compute_function_pre_call_message
 from .llm import BaseLLM
+from .client_registry import get_llm_client_registry
 from bolna.helpers.logger_config import configure_logger
 
 logger = configure_logger(__name__)
@@ -38,10 +39,10 @@ class OpenAiLLM(BaseLLM):
         if kwargs.get("provider", "openai") == "custom":
             base_url = kwargs.get("base_url")
             api_key = kwargs.get('llm_key', None)
-            self.async_client = AsyncOpenAI(base_url=base_url, api_key= api_key)
+            self.async_client = get_llm_client_registry().get_openai_client("custom", base_url=base_url, api_key=api_key)
         else:
             llm_key = kwargs.get('llm_key', os.getenv('OPENAI_API_KEY'))
-            self.async_client = AsyncOpenAI(api_key=llm_key)
+            self.async_client = get_llm_client_registry().get_openai_client(api_key=llm_key)
             api_key = llm_key
         self.assistant_id = kwargs.get("assistant_id", None)
         if self.assistant_id:
@@ -64,7 +65,7 @@ class OpenAiLLM(BaseLLM):
         model_args = {
             **self.model_args,
             "response_format": response_format,
-            "messages": messages,
+            "messages": list(messages),
             "stream": True,
             "stop": ["User:"],
             "user": f"{self.run_id}#{meta_info['turn_id']}"
@@ -187,11 +188,14 @@ class OpenAiLLM(BaseLLM):
 
         self.started_streaming = False
     
-    async def generate(self, messages, request_json=False):
+    async def generate(self, messages, request_json=False, max_tokens=None):
         response_format = self.get_response_format(request_json)
+        # Uncapped unless the caller asks, extraction and post call summaries need the whole answer
+        model_args = {"max_tokens": max_tokens} if max_tokens is not None else {}
 
-        completion = await self.async_client.chat.completions.create(model=self.model, temperature=0.0, messages=messages,
-                                                                     stream=False, response_format=response_format)
+        completion = await self.async_client.chat.completions.create(model=self.model, temperature=0.0, messages=list(messages),
+                                                                     stream=False, response_format=response_format,
+                                                                     **model_args)
         res = completion.choices[0].message.content
         return res
 
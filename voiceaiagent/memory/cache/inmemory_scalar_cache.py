@@ -1,33 +1,133 @@
+from collections import OrderedDict
+import os
+import sys
+import time
+
 from .base_cache import BaseCache
 from bolna.helpers.logger_config import configure_logger
-import time
 logger = configure_logger(__name__)
 
+DEFAULT_MAX_ENTRIES = int(os.getenv("SCALAR_CACHE_MAX_ENTRIES", 10000))
+DEFAULT_MAX_BYTES = int(os.getenv("SCALAR_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
 class InmemoryScalarCache(BaseCache):
-    def __init__(self, ttl = -1):
-        self.data_dict = {} #Permanent means permenant only during the duration of the call
-        self.ttl_dict = {}
+    """
+    Bounded LRU cache with an optional cache wide TTL (ttl = -1 means entries never expire). Both bounds default to
+    finite limits; pass None explicitly to lift one.
+
+    data_dict is kept in LRU order and ttl_dict in expiry order. Because every entry shares the same TTL, expired
+    entries always sit at the front of ttl_dict, so both eviction and the periodic expiry sweep are O(1) per entry
+    removed. Expired entries are also dropped lazily when they are read.
+    """
+    def __init__(self, ttl=-1, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, sweep_interval=60):
+        self.data_dict = OrderedDict()
+        self.ttl_dict = OrderedDict()
+        self.size_dict = {}
         self.ttl = ttl
-    
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.total_bytes = 0
+        self.next_sweep_at = time.time() + sweep_interval
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def _sizeof(value):
+        if isinstance(value, (bytes, bytearray, memoryview, str)):
+            return len(value)
+        return sys.getsizeof(value)
+
+    def __len__(self):
+        return len(self.data_dict)
+
+    def __contains__(self, key):
+        return key in self.data_dict and not self._is_expired(key, time.time())
+
+    def _is_expired(self, key, now):
+        return self.ttl != -1 and self.ttl_dict[key] <= now
+
+    def _remove(self, key):
+        del self.data_dict[key]
+        self.ttl_dict.pop(key, None)
+        self.total_bytes -= self.size_dict.pop(key, 0)
+
+    def _maybe_sweep(self, now):
+        if self.ttl != -1 and now >= self.next_sweep_at:
+            self.purge_expired(now)
+
+    def purge_expired(self, now=None):
+        if self.ttl == -1:
+            return 0
+        now = now or time.time()
+        removed = 0
+        while self.ttl_dict:
+            key, expires_at = next(iter(self.ttl_dict.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+            removed += 1
+        self.stats["expirations"] += removed
+        self.next_sweep_at = now + self.sweep_interval
+        return removed
+
+    def _enforce_bounds(self):
+        while self.data_dict and ((self.max_entries is not None and len(self.data_dict) > self.max_entries) or
+                                  (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            self._remove(next(iter(self.data_dict)))
+            self.stats["evictions"] += 1
+
     def get(self, key):
+        now = time.time()
+        self._maybe_sweep(now)
         if key in self.data_dict:
-            if self.ttl == -1:
-                return self.data_dict[key] 
-            if time.time() - self.ttl_dict[key] < 0:
+            if not self._is_expired(key, now):
+                self.data_dict.move_to_end(key)
+                self.stats["hits"] += 1
                 return self.data_dict[key]
-            #del self.ttl_dict[key]
-            #del self.data_dict[key]
-        
+            self._remove(key)
+            self.stats["expirations"] += 1
+
+        self.stats["misses"] += 1
         logger.info(f"Cache miss for key {key}")
         return None
-    
+
     def set(self, key, value):
+        now = time.time()
+        self._maybe_sweep(now)
+        if key in self.data_dict:
+            self._remove(key)
+        size = self._sizeof(value)
         self.data_dict[key] = value
-        self.ttl_dict[key] = time.time() + self.ttl
-    
+        self.ttl_dict[key] = now + self.ttl
+        self.size_dict[key] = size
+        self.total_bytes += size
+        self._enforce_bounds()
+
+    def get_many(self, keys):
+        """Returns a dict with the keys that are present and not expired."""
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set_many(self, mapping):
+        for key, value in mapping.items():
+            self.set(key, value)
+
+    def delete(self, key):
+        if key in self.data_dict:
+            self._remove(key)
+
+    def get_stats(self):
+        return dict(self.stats, entries=len(self.data_dict), bytes=self.total_bytes)
+
     def flush_cache(self, only_ephemeral = True):
-        if only_ephemeral:
-            self.data_dict.clear()
+        self.data_dict.clear()
         self.ttl_dict.clear()
-    
-
+        self.size_dict.clear()
+        self.total_bytes = 0
+        if not only_ephemeral:
+            self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
@@ -0,0 +1,245 @@
+import os
+import mmap
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+from .base_cache import BaseCache
+from bolna.constants import PREPROCESS_DIR
+from bolna.helpers.logger_config import configure_logger
+
+logger = configure_logger(__name__)
+
+TTSCacheKey = namedtuple("TTSCacheKey", ["provider", "model", "voice", "format", "sample_rate", "text"])
+
+DEFAULT_MAX_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MAX_MEMORY_BYTES", 256 * 1024 * 1024))
+DEFAULT_MAX_DISK_BYTES = int(os.getenv("TTS_CACHE_MAX_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+
+
+class TTSAudioCache(BaseCache):
+    """
+    Process wide cache of synthesized audio shared by every call and synthesizer.
+
+    The memory tier is an LRU bounded by total bytes. The optional disk tier keeps evicted and newly synthesized
+    phrases as files under disk_dir (also LRU bounded by bytes) and reads them back through mmap, promoting them to
+    memory on a hit. A disk hit is a read-only memoryview of the mapping, not a copy. get_or_synthesize de-duplicates
+    concurrent misses so N calls asking for the same greeting at once trigger exactly one upstream request.
+
+    The lock only guards the bookkeeping, file I/O runs outside it. get and set touch the disk tier on the calling
+    thread; on the event loop use aget, aset and get_or_synthesize, which do it in a worker thread.
+    """
+    def __init__(self, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES, disk_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0, "deduplicated": 0}
+        if self.disk_dir:
+            self._scan_disk()
+
+    @staticmethod
+    def make_key(provider, model, voice, audio_format, sample_rate, text):
+        return TTSCacheKey(provider, model, voice, audio_format, str(sample_rate), text)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha1(repr(tuple(key)).encode()).hexdigest() + ".audio")
+
+    def _scan_disk(self):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        for file_name in os.listdir(self.disk_dir):
+            if file_name.endswith(".audio"):
+                stat = os.stat(os.path.join(self.disk_dir, file_name))
+                entries.append((stat.st_atime, file_name, stat.st_size))
+        for _, file_name, size in sorted(entries):
+            self._disk[file_name] = size
+            self._disk_bytes += size
+        logger.info(f"TTS disk cache at {self.disk_dir} has {len(self._disk)} entries, {self._disk_bytes} bytes")
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        file_name = os.path.basename(path)
+        with self._lock:
+            if file_name not in self._disk:
+                return None
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read TTS disk cache entry {path}: {e}")
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(file_name, 0)
+            return None
+        with self._lock:
+            if file_name in self._disk:
+                self._disk.move_to_end(file_name)
+        # the mapping outlives the file (even once it is evicted) and is unmapped when the last view of it is dropped
+        return memoryview(mapped)
+
+    def _write_disk(self, key, value):
+        path = self._disk_path(key)
+        file_name = os.path.basename(path)
+        with self._lock:
+            if file_name in self._disk:
+                self._disk.move_to_end(file_name)
+                return
+        if len(value) > self.max_disk_bytes:
+            return
+        try:
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Could not write TTS disk cache entry {path}: {e}")
+            return
+        evicted = []
+        with self._lock:
+            if file_name not in self._disk:
+                self._disk[file_name] = len(value)
+                self._disk_bytes += len(value)
+            while self._disk_bytes > self.max_disk_bytes and self._disk:
+                evicted_name, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                evicted.append(evicted_name)
+        for evicted_name in evicted:
+            try:
+                os.remove(os.path.join(self.disk_dir, evicted_name))
+            except OSError:
+                pass
+
+    def _store_memory(self, key, value):
+        if len(value) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = value
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    def _get_memory(self, key):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+            return value
+
+    def _promote(self, key, value):
+        """Accounts for the disk lookup that returned value (None on a miss) and keeps a hit in memory."""
+        with self._lock:
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self._store_memory(key, value)
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            return value
+
+    def get(self, key):
+        value = self._get_memory(key)
+        if value is None:
+            value = self._promote(key, self._read_disk(key) if self.disk_dir else None)
+        return value
+
+    async def aget(self, key):
+        value = self._get_memory(key)
+        if value is None:
+            value = self._promote(key, await asyncio.to_thread(self._read_disk, key) if self.disk_dir else None)
+        return value
+
+    def _store(self, key, value):
+        value = bytes(value)
+        with self._lock:
+            self._store_memory(key, value)
+        return value
+
+    def set(self, key, value):
+        if not value:
+            return
+        value = self._store(key, value)
+        if self.disk_dir:
+            self._write_disk(key, value)
+
+    async def aset(self, key, value):
+        if not value:
+            return
+        value = self._store(key, value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, value)
+
+    async def get_or_synthesize(self, key, synthesize):
+        """
+        Returns (audio, is_cached). synthesize is a zero-argument coroutine function and only runs when nobody has
+        the phrase cached or in flight; concurrent callers for the same key wait on that one request.
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            return value, True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["deduplicated"] += 1
+            try:
+                return await asyncio.shield(inflight), True
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # the caller that owned the request went away, try again ourselves
+                return await self.get_or_synthesize(key, synthesize)
+
+        future = asyncio.get_running_loop().create_future()
+        # followers may not exist, so don't let an unobserved exception get logged as never retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await self.aget(key)
+            if value is not None:
+                future.set_result(value)
+                return value, True
+            value = await synthesize()
+            future.set_result(value)
+            # followers already have the audio, only this caller waits for the disk write
+            await self.aset(key, value)
+            return value, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, memory_entries=len(self._memory), memory_bytes=self._memory_bytes,
+                        disk_entries=len(self._disk), disk_bytes=self._disk_bytes, inflight=len(self._inflight))
+
+    def flush_cache(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+
+_tts_audio_cache = None
+
+
+def get_tts_audio_cache():
+    global _tts_audio_cache
+    if _tts_audio_cache is None:
+        disk_dir = None
+        if os.getenv("TTS_CACHE_DISK", "false").lower() == "true":
+            disk_dir = os.path.join(os.getenv("AGENT_DATA_DIR", PREPROCESS_DIR), "tts_cache")
+        _tts_audio_cache = TTSAudioCache(disk_dir=disk_dir)
+    return _tts_audio_cache
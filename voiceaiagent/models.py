@@ -3,6 +3,8 @@ from typing import Optional, List, Union, Dict, Callable
 from pydantic import BaseModel, Field, field_validator, ValidationError, Json
 from pydantic_core import PydanticCustomError
 from .providers import *
+from .constants import DEFAULT_MAX_BUFFERED_OUTPUT_SECONDS, DEFAULT_OUTPUT_PACING_LEAD_MS, DEFAULT_SPECULATIVE_STABILITY_MS, \
+    DEFAULT_CONTEXT_WINDOW_RECENT_TURNS
 
 AGENT_WELCOME_MESSAGE = "This call is being recorded for quality assurance and training. Please speak now."
 
@@ -153,6 +155,7 @@ class Llm(BaseModel):
     provider: Optional[str] = "openai"
     base_url: Optional[str] = None
     routes: Optional[Routes] = None
+    context_window_max_tokens: Optional[int] = None  # overrides the task's context_window_max_tokens for this agent
 
 
 class SimpleLlmAgent(Llm):
@@ -314,6 +317,12 @@ class ConversationConfig(BaseModel):
     check_user_online_message: Optional[str] = "Hey, are you still there"
     check_if_user_online: Optional[bool] = True
     generate_precise_transcript: Optional[bool] = False
+    max_buffered_output_seconds: Optional[float] = DEFAULT_MAX_BUFFERED_OUTPUT_SECONDS  # synthesized audio allowed ahead of playback
+    output_pacing_lead_ms: Optional[int] = DEFAULT_OUTPUT_PACING_LEAD_MS  # audio kept queued at the telephony provider, 0 disables pacing
+    speculative_generation: Optional[bool] = False  # start the LLM on interim transcripts before endpointing
+    speculative_stability_ms: Optional[int] = DEFAULT_SPECULATIVE_STABILITY_MS  # how long the interim transcript has to stay unchanged
+    context_window_max_tokens: Optional[int] = None  # prompt token budget per LLM agent, None sends the whole history
+    context_window_recent_turns: Optional[int] = DEFAULT_CONTEXT_WINDOW_RECENT_TURNS  # turns always sent verbatim, older ones get summarized
 
     @field_validator('hangup_after_silence', mode='before')
     def set_hangup_after_silence(cls, v):
@@ -1,7 +1,6 @@
 import base64
 import json
 import os
-import audioop
 import uuid
 import traceback
 from dotenv import load_dotenv
@@ -1,9 +1,9 @@
 import base64
 import json
 import os
-import audioop
 from dotenv import load_dotenv
 from bolna.helpers.logger_config import configure_logger
+from bolna.helpers.g711 import lin2ulaw
 from bolna.output_handlers.telephony import TelephonyOutputHandler
 
 logger = configure_logger(__name__)
@@ -29,7 +29,7 @@ class TwilioOutputHandler(TelephonyOutputHandler):
     async def form_media_message(self, audio_data, audio_format="wav"):
         if audio_format != "mulaw":
             logger.info(f"Converting to mulaw")
-            audio_data = audioop.lin2ulaw(audio_data, 2)
+            audio_data = lin2ulaw(audio_data)
         base64_audio = base64.b64encode(audio_data).decode("utf-8")
         message = {
             'event': 'media',
@@ -55,6 +55,17 @@ Only output the persona, do NOT include anything else in your output.
 If there were any proper nouns, or number or date or time involved explicitly maintain it.
 """
 
+ROLLING_SUMMARY_PROMPT = """
+You maintain a running summary of an ongoing phone conversation between a user and an agent, so the agent can keep the conversation going without the full transcript.
+You will get the summary so far and the messages that came after it; the agent's tool calls appear as `tool_response` entries.
+Rewrite the summary to include the new messages. Keep every fact the agent may need later: names, numbers, dates, times, addresses, order or booking details, what the user asked for, what was already answered or promised, and tool results.
+Keep it under 200 words. Only output the summary, do NOT include anything else in your output.
+"""
+
+ROLLING_SUMMARY_SYSTEM_PROMPT = """### Summary of the conversation so far
+Earlier messages of this conversation are not included below. This is what happened in them:
+{}"""
+
 FILLER_PROMPT = "Please, do not start your response with fillers like Got it, Noted.\nAbstain from using any greetings like hey, hello at the start of your conversation"
 
 DATE_PROMPT = '''### Today Current Date and Time:\n {} at {} local time in the {} timezone. Use this information to ensure all time-related responses are accurate and contextually relevant based on the user's location.'''
@@ -5,7 +5,7 @@ import time
 from dotenv import load_dotenv
 from bolna.helpers.logger_config import configure_logger
 from bolna.helpers.utils import create_ws_data_packet
-from bolna.memory.cache.inmemory_scalar_cache import InmemoryScalarCache
+from bolna.memory.cache.tts_audio_cache import get_tts_audio_cache
 from .base_synthesizer import BaseSynthesizer
 import azure.cognitiveservices.speech as speechsdk
 
@@ -26,7 +26,7 @@ class AzureSynthesizer(BaseSynthesizer):
         self.synthesized_characters = 0
         self.caching = caching
         if caching:
-            self.cache = InmemoryScalarCache()
+            self.cache = get_tts_audio_cache()
         self.loop = asyncio.get_event_loop()
 
         # Initialize Azure Speech Config
@@ -72,6 +72,51 @@ class AzureSynthesizer(BaseSynthesizer):
             logger.error(f"Speech synthesis failed: {result.reason}")
             return None
 
+    async def __request_audio(self, text, chunk_queue, done_event):
+        """(audio, is_cached) for text. Concurrent calls asking for the same phrase share one Azure request."""
+        if not self.caching:
+            return await self.__synthesize_streaming(text, chunk_queue, done_event), False
+        return await self.cache.get_or_synthesize(self.get_cache_key(text),
+                                                  lambda: self.__synthesize_streaming(text, chunk_queue, done_event))
+
+    async def __synthesize_streaming(self, text, chunk_queue, done_event):
+        """Puts audio on chunk_queue as Azure streams it and returns the whole of it once synthesis completes."""
+        # Create synthesizer for each request to avoid blocking
+        synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+        audio_chunks = []
+        start_time = time.perf_counter()
+
+        def speech_synthesizer_synthesizing_handler(evt):
+            try:
+                if self.connection_time is None:
+                    # runs on the speech SDK's thread, the metrics are only touched from the loop
+                    self.loop.call_soon_threadsafe(self.set_connection_time, "azuretts",
+                                                   round((time.perf_counter() - start_time) * 1000))
+
+                audio_chunks.append(evt.result.audio_data)
+                # Use run_coroutine_threadsafe to safely put data from another thread
+                asyncio.run_coroutine_threadsafe(
+                    chunk_queue.put(evt.result.audio_data),
+                    self.loop
+                )
+            except Exception as e:
+                logger.error(f"Error in synthesizing handler: {e}")
+
+        def speech_synthesizer_completed_handler(evt):
+            async def set_done_event():
+                done_event.set()
+
+            asyncio.run_coroutine_threadsafe(set_done_event(), self.loop)
+
+        synthesizer.synthesizing.connect(speech_synthesizer_synthesizing_handler)
+        synthesizer.synthesis_completed.connect(speech_synthesizer_completed_handler)
+
+        # Start the synthesis (non-blocking)
+        synthesizer.speak_text_async(text)
+        logger.debug(f"Azure TTS request sent for {len(text)} chars")
+        await done_event.wait()
+        return b"".join(audio_chunks)
+
     async def generate(self):
         try:
             while True:
@@ -83,75 +128,21 @@ class AzureSynthesizer(BaseSynthesizer):
                     logger.debug(f"Not synthesizing text as the sequence_id ({meta_info.get('sequence_id')}) of it is not in the list of sequence_ids present in the task manager.")
                     return
 
-                # Check cache if enabled
-                if self.caching and self.cache.get(text):
-                    logger.debug(f"Cache hit and hence returning quickly {text}")
-                    audio_data = self.cache.get(text)
-                    
-                    # Set metadata and yield the cached audio
-                    if not self.first_chunk_generated:
-                        meta_info["is_first_chunk"] = True
-                        self.first_chunk_generated = True
-                    else:
-                        meta_info["is_first_chunk"] = False
-                        
-                    if "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]:
-                        meta_info["end_of_synthesizer_stream"] = True
-                        self.first_chunk_generated = False
-                    
-                    meta_info['text'] = text
-                    meta_info['format'] = 'wav'
-                    meta_info["text_synthesized"] = f"{text} "
-                    meta_info["mark_id"] = str(uuid.uuid4())
-                    yield create_ws_data_packet(audio_data, meta_info)
-                    continue
-
-                # Create synthesizer for each request to avoid blocking
-                synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
-
-                # Set up streaming events
                 chunk_queue = asyncio.Queue()
                 done_event = asyncio.Event()
                 start_time = time.perf_counter()
+                request = asyncio.create_task(self.__request_audio(text, chunk_queue, done_event))
+                try:
+                    # Stream chunks as they arrive when this call synthesizes the phrase, a cache hit or a request
+                    # another call already has in flight only resolves request
+                    while not request.done() or not chunk_queue.empty():
+                        try:
+                            # Get available chunk or wait briefly
+                            chunk = await asyncio.wait_for(chunk_queue.get(), timeout=0.01)
+                        except asyncio.TimeoutError:
+                            # No chunk ready, just continue and check the request again
+                            continue
 
-                def speech_synthesizer_synthesizing_handler(evt):
-                    try:
-                        if self.connection_time is None:
-                            self.connection_time = round((time.perf_counter() - start_time) * 1000)
-
-                        # Use run_coroutine_threadsafe to safely put data from another thread
-                        asyncio.run_coroutine_threadsafe(
-                            chunk_queue.put(evt.result.audio_data), 
-                            self.loop
-                        )
-                    except Exception as e:
-                        logger.error(f"Error in synthesizing handler: {e}")
-
-                def speech_synthesizer_completed_handler(evt):
-                    async def set_done_event():
-                        done_event.set()
-
-                    asyncio.run_coroutine_threadsafe(set_done_event(), self.loop)
-
-                synthesizer.synthesizing.connect(speech_synthesizer_synthesizing_handler)
-                synthesizer.synthesis_completed.connect(speech_synthesizer_completed_handler)
-                
-                # Start the synthesis (non-blocking)
-                start_time = time.perf_counter()
-                synthesizer.speak_text_async(text)
-                logger.debug(f"Azure TTS request sent for {len(text)} chars")
-                full_audio = bytearray()
-                
-                # Process chunks as they arrive
-                while not done_event.is_set() or not chunk_queue.empty():
-                    try:
-                        # Get available chunk or wait briefly
-                        chunk = await asyncio.wait_for(chunk_queue.get(), timeout=0.01)
-                        
-                        # Collect full audio for caching if enabled
-                        if self.caching:
-                            full_audio.extend(chunk)
-                        
                         # Log first chunk latency
                         if not self.first_chunk_generated:
                             first_chunk_time = round((time.perf_counter() - start_time) * 1000)
@@ -166,29 +157,45 @@ class AzureSynthesizer(BaseSynthesizer):
                             self.first_chunk_generated = True
                         else:
                             meta_info["is_first_chunk"] = False
-                        
+
                         # Track if this is the end
                         if done_event.is_set() and chunk_queue.empty():
                             if "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]:
                                 meta_info["end_of_synthesizer_stream"] = True
                                 self.first_chunk_generated = False
-                        
+
                         meta_info['text'] = text
                         meta_info['format'] = 'wav'
                         meta_info["text_synthesized"] = f"{text} "
                         meta_info["mark_id"] = str(uuid.uuid4())
                         yield create_ws_data_packet(chunk, meta_info)
-                        
-                    except asyncio.TimeoutError:
-                        # No chunk ready, just continue and check done_event again
-                        continue
-                
-                # Cache the complete audio if enabled
-                if self.caching and full_audio:
-                    logger.debug(f"Caching audio for text: {text}")
-                    self.cache.set(text, bytes(full_audio))
-                
-                self.synthesized_characters += len(text)
+
+                    audio_data, is_cached = request.result()
+                finally:
+                    if not request.done():
+                        request.cancel()
+
+                if not is_cached:
+                    self.synthesized_characters += len(text)
+                    continue
+
+                logger.debug(f"Cache hit and hence returning quickly {text}")
+                # Set metadata and yield the cached audio
+                if not self.first_chunk_generated:
+                    meta_info["is_first_chunk"] = True
+                    self.first_chunk_generated = True
+                else:
+                    meta_info["is_first_chunk"] = False
+
+                if "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]:
+                    meta_info["end_of_synthesizer_stream"] = True
+                    self.first_chunk_generated = False
+
+                meta_info['text'] = text
+                meta_info['format'] = 'wav'
+                meta_info["text_synthesized"] = f"{text} "
+                meta_info["mark_id"] = str(uuid.uuid4())
+                yield create_ws_data_packet(audio_data, meta_info)
         except asyncio.CancelledError:
             logger.debug("Azure synthesizer task was cancelled - shutting down cleanly")
             raise
@@ -1,6 +1,8 @@
-import io
-import torchaudio
 from bolna.helpers.logger_config import configure_logger
+from bolna.helpers.audio_codec import convert_to_wav
+from bolna.helpers.stream_transcoder import StreamTranscoder
+from bolna.helpers.metrics import get_call_metrics
+from bolna.memory.cache.tts_audio_cache import TTSAudioCache
 import asyncio
 
 logger = configure_logger(__name__)
@@ -13,6 +15,13 @@ class BaseSynthesizer:
         self.internal_queue = asyncio.Queue()
         self.task_manager_instance = task_manager_instance
         self.connection_time = None
+        self.stream_transcoder = None
+
+    def set_connection_time(self, provider, connection_time_ms):
+        """Keeps the first connect time of the call and reports it to /metrics as soon as the connection is up."""
+        if self.connection_time is None:
+            self.connection_time = connection_time_ms
+            get_call_metrics().observe_connect_time("synthesizer", provider, connection_time_ms)
 
     def clear_internal_queue(self):
         logger.info(f"Clearing out internal queue")
@@ -40,10 +49,25 @@ class BaseSynthesizer:
         pass
 
     async def cleanup(self):
-        pass
+        self.close_stream_transcoder()
 
     async def handle_interruption(self):
-        pass
+        self.reset_stream_transcoder()
+
+    def get_stream_transcoder(self, source_format, target_sample_rate, **kwargs):
+        """Lazily creates the transcoder used for this call's streamed audio so decoder state spans chunks."""
+        if self.stream_transcoder is None:
+            self.stream_transcoder = StreamTranscoder(source_format, target_sample_rate, **kwargs)
+        return self.stream_transcoder
+
+    def reset_stream_transcoder(self):
+        if self.stream_transcoder is not None:
+            self.stream_transcoder.reset()
+
+    def close_stream_transcoder(self):
+        if self.stream_transcoder is not None:
+            self.stream_transcoder.close()
+            self.stream_transcoder = None
 
     def text_chunker(self, text):
         """Split text into chunks, ensuring to not break sentences."""
@@ -63,18 +87,17 @@ class BaseSynthesizer:
             yield buffer.strip() + " "
 
     def resample(self, audio_bytes):
-        audio_buffer = io.BytesIO(audio_bytes)
-        waveform, orig_sample_rate = torchaudio.load(audio_buffer)
-        resampler = torchaudio.transforms.Resample(orig_sample_rate, 8000)
-        audio_waveform = resampler(waveform)
-        audio_buffer = io.BytesIO()
-        torchaudio.save(audio_buffer, audio_waveform, 8000, format="wav")
-        audio_buffer.seek(0)
-        audio_data = audio_buffer.read()
-        return audio_data
+        return convert_to_wav(audio_bytes, target_sample_rate=8000)
 
     def get_engine(self):
         return "default"
 
+    def get_cache_key(self, text):
+        """Key for the shared TTS cache; subclasses override it when voice/format/rate live under other names."""
+        audio_format = getattr(self, "format", getattr(self, "audio_format", None))
+        sample_rate = getattr(self, "sample_rate", getattr(self, "sampling_rate", None))
+        return TTSAudioCache.make_key(type(self).__name__, self.get_engine(), getattr(self, "voice", None),
+                                      audio_format, sample_rate, text)
+
     def supports_websocket(self):
         return True
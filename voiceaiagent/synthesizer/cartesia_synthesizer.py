@@ -1,5 +1,4 @@
 import asyncio
-import copy
 import uuid
 
 import websockets
@@ -10,10 +9,11 @@ import os
 import traceback
 from collections import deque
 
-from bolna.memory.cache.inmemory_scalar_cache import InmemoryScalarCache
+from bolna.memory.cache.tts_audio_cache import TTSAudioCache, get_tts_audio_cache
 from .base_synthesizer import BaseSynthesizer
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import convert_audio_to_wav, create_ws_data_packet, resample
+from bolna.helpers.utils import create_ws_data_packet, get_provider_base_url, to_websocket_url
+from bolna.helpers.meta_info import MetaInfo
 
 logger = configure_logger(__name__)
 
@@ -37,15 +37,16 @@ class CartesiaSynthesizer(BaseSynthesizer):
         self.meta_info = None
         self.caching = caching
         if self.caching:
-            self.cache = InmemoryScalarCache()
+            self.cache = get_tts_audio_cache()
         self.synthesized_characters = 0
         self.previous_request_ids = []
         self.websocket_holder = {"websocket": None}
         self.context_id = None
         self.sender_task = None
 
-        self.ws_url = f"wss://api.cartesia.ai/tts/websocket?api_key={self.api_key}&cartesia_version=2024-06-10"
-        self.api_url = "https://api.cartesia.ai/tts/bytes"
+        self.base_url = get_provider_base_url('CARTESIA_BASE_URL', "https://api.cartesia.ai")
+        self.ws_url = f"{to_websocket_url(self.base_url)}/tts/websocket?api_key={self.api_key}&cartesia_version=2024-06-10"
+        self.api_url = f"{self.base_url}/tts/bytes"
         self.turn_id = 0
         self.sequence_id = 0
         self.context_ids_to_ignore = set()
@@ -54,7 +55,12 @@ class CartesiaSynthesizer(BaseSynthesizer):
     def get_engine(self):
         return self.model
 
+    def get_cache_key(self, text):
+        # the HTTP path always asks Cartesia for 44.1kHz mp3, whatever the configured format and rate
+        return TTSAudioCache.make_key(type(self).__name__, self.model, self.voice_id, "mp3", 44100, text)
+
     async def handle_interruption(self):
+        self.reset_stream_transcoder()
         try:
             if self.context_id:
                 self.context_ids_to_ignore.add(self.context_id)
@@ -174,7 +180,9 @@ class CartesiaSynthesizer(BaseSynthesizer):
                 logger.info("Payload was null")
 
     async def synthesize(self, text):
-        audio = await self.__generate_http(text)
+        if not self.caching:
+            return await self.__generate_http(text)
+        audio, _ = await self.cache.get_or_synthesize(self.get_cache_key(text), lambda: self.__generate_http(text))
         return audio
 
     async def __generate_http(self, text,):
@@ -211,8 +219,16 @@ class CartesiaSynthesizer(BaseSynthesizer):
                     audio = message
                 else:
                     self.meta_info['format'] = "wav"
-                    audio = resample(convert_audio_to_wav(message, source_format="mp3"), int(self.sampling_rate),
-                                     format="wav")
+                    transcoder = self.get_stream_transcoder("mp3", int(self.sampling_rate))
+                    if message != b'\x00':
+                        audio = await transcoder.atranscode(message)
+                        if not audio:
+                            continue
+                    else:
+                        tail = await transcoder.aflush()
+                        if tail:
+                            yield create_ws_data_packet(tail, self.meta_info)
+                        audio = message
 
                 if not self.first_chunk_generated:
                     self.meta_info["is_first_chunk"] = True
@@ -264,7 +280,7 @@ class CartesiaSynthesizer(BaseSynthesizer):
             meta_info, text, self.current_text = message.get("meta_info"), message.get("data"), message.get("data")
             self.synthesized_characters += len(text) if text is not None else 0
             end_of_llm_stream = "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]
-            self.meta_info = copy.deepcopy(meta_info)
+            self.meta_info = MetaInfo(meta_info)
             meta_info["text"] = text
             if not self.context_id:
                 self.update_context(meta_info)
@@ -279,6 +295,7 @@ class CartesiaSynthesizer(BaseSynthesizer):
 
     async def cleanup(self):
         self.conversation_ended = True
+        self.close_stream_transcoder()
         logger.info("cleaning cartesia synthesizer tasks")
         if self.sender_task:
             try:
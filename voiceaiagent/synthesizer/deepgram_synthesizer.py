@@ -1,17 +1,19 @@
-import copy
 import aiohttp
 import os
 import uuid
 from dotenv import load_dotenv
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import convert_audio_to_wav, create_ws_data_packet
-from bolna.memory.cache.inmemory_scalar_cache import InmemoryScalarCache
+from bolna.helpers.utils import create_ws_data_packet, get_provider_base_url
+from bolna.helpers.meta_info import MetaInfo
+from bolna.helpers.audio_codec import convert_to_wav
+from bolna.memory.cache.tts_audio_cache import get_tts_audio_cache
 from .base_synthesizer import BaseSynthesizer
 
 logger = configure_logger(__name__)
 load_dotenv()
 DEEPGRAM_HOST = os.getenv('DEEPGRAM_HOST', 'api.deepgram.com')
-DEEPGRAM_TTS_URL = "https://{}/v1/speak".format(DEEPGRAM_HOST)
+DEEPGRAM_BASE_URL = get_provider_base_url('DEEPGRAM_BASE_URL', "https://{}".format(DEEPGRAM_HOST))
+DEEPGRAM_TTS_URL = "{}/v1/speak".format(DEEPGRAM_BASE_URL)
 
 
 class DeepgramSynthesizer(BaseSynthesizer):
@@ -28,7 +30,7 @@ class DeepgramSynthesizer(BaseSynthesizer):
         self.synthesized_characters = 0
         self.caching = caching
         if caching:
-            self.cache = InmemoryScalarCache()
+            self.cache = get_tts_audio_cache()
 
     def get_synthesized_characters(self):
         return self.synthesized_characters
@@ -77,7 +79,7 @@ class DeepgramSynthesizer(BaseSynthesizer):
         try:
             audio = await self.__generate_http(text)
             if self.format == "mp3":
-                audio = convert_audio_to_wav(audio, source_format="mp3")
+                audio = convert_to_wav(audio, source_format="mp3")
             return audio
         except Exception as e:
             logger.error(f"Could not synthesize {e}")
@@ -91,22 +93,20 @@ class DeepgramSynthesizer(BaseSynthesizer):
                 logger.info(f"Not synthesizing text as the sequence_id ({meta_info.get('sequence_id')}) of it is not in the list of sequence_ids present in the task manager.")
                 return
             if self.caching:
-                logger.info(f"Caching is on")
-                if self.cache.get(text):
+                message, is_cached = await self.cache.get_or_synthesize(self.get_cache_key(text),
+                                                                        lambda: self.__generate_http(text))
+                if is_cached:
                     logger.info(f"Cache hit and hence returning quickly {text}")
-                    message = self.cache.get(text)
                 else:
-                    logger.info(f"Not a cache hit {list(self.cache.data_dict)}")
+                    logger.info(f"Not a cache hit for {text}")
                     self.synthesized_characters += len(text)
-                    message = await self.__generate_http(text)
-                    self.cache.set(text, message)
             else:
                 logger.info(f"No caching present")
                 self.synthesized_characters += len(text)
                 message = await self.__generate_http(text)
 
             if self.format == "mp3":
-                message = convert_audio_to_wav(message, source_format="mp3")
+                message = convert_to_wav(message, source_format="mp3")
             if not self.first_chunk_generated:
                 meta_info["is_first_chunk"] = True
                 self.first_chunk_generated = True
@@ -123,4 +123,4 @@ class DeepgramSynthesizer(BaseSynthesizer):
 
     async def push(self, message):
         logger.info(f"Pushed message to internal queue {message}")
-        self.internal_queue.put_nowait(copy.deepcopy(message))
+        self.internal_queue.put_nowait({**message, "meta_info": MetaInfo(message["meta_info"])})
@@ -1,5 +1,4 @@
 import asyncio
-import copy
 import uuid
 import time
 import websockets
@@ -10,10 +9,12 @@ import os
 import traceback
 from collections import deque
 
-from bolna.memory.cache.inmemory_scalar_cache import InmemoryScalarCache
+from bolna.memory.cache.tts_audio_cache import TTSAudioCache, get_tts_audio_cache
 from .base_synthesizer import BaseSynthesizer
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import convert_audio_to_wav, create_ws_data_packet, resample
+from bolna.helpers.utils import create_ws_data_packet, get_provider_base_url, to_websocket_url
+from bolna.helpers.meta_info import MetaInfo
+from bolna.helpers.audio_codec import convert_to_wav
 
 logger = configure_logger(__name__)
 
@@ -30,8 +31,9 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
         self.sampling_rate = sampling_rate
         self.audio_format = "mp3"
         self.use_mulaw = kwargs.get("use_mulaw", True)
-        self.ws_url = f"wss://api.elevenlabs.io/v1/text-to-speech/{self.voice}/multi-stream-input?model_id={self.model}&output_format={'ulaw_8000' if self.use_mulaw else 'mp3_44100_128'}&inactivity_timeout=170&sync_alignment=true"
-        self.api_url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice}?optimize_streaming_latency=2&output_format="
+        self.base_url = get_provider_base_url('ELEVENLABS_BASE_URL', "https://api.elevenlabs.io")
+        self.ws_url = f"{to_websocket_url(self.base_url)}/v1/text-to-speech/{self.voice}/multi-stream-input?model_id={self.model}&output_format={'ulaw_8000' if self.use_mulaw else 'mp3_44100_128'}&inactivity_timeout=170&sync_alignment=true"
+        self.api_url = f"{self.base_url}/v1/text-to-speech/{self.voice}?optimize_streaming_latency=2&output_format="
         self.first_chunk_generated = False
         self.last_text_sent = False
         self.text_queue = deque()
@@ -40,7 +42,7 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
         self.similarity_boost = similarity_boost
         self.caching = caching
         if self.caching:
-            self.cache = InmemoryScalarCache()
+            self.cache = get_tts_audio_cache()
         self.synthesized_characters = 0
         self.previous_request_ids = []
         self.websocket_holder = {"websocket": None}
@@ -48,6 +50,7 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
         self.conversation_ended = False
         self.current_text = ""
         self.context_id = None
+        self.pending_text_synthesized = ""
 
     # Ensuring we only do wav output for now
     def get_format(self, format, sampling_rate):
@@ -61,6 +64,8 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
         return self.model
 
     async def handle_interruption(self):
+        self.reset_stream_transcoder()
+        self.pending_text_synthesized = ""
         try:
             if self.context_id:
                 interrupt_message = {
@@ -210,6 +215,10 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
     def get_synthesized_characters(self):
         return self.synthesized_characters
 
+    def get_cache_key(self, text):
+        return TTSAudioCache.make_key(type(self).__name__, self.model, self.voice, self.get_format(self.audio_format, self.sampling_rate),
+                                      self.sampling_rate, text)
+
     # Currently we are only supporting wav output but soon we will incorporate conver
     async def generate(self):
         try:
@@ -227,9 +236,22 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
                     else:
                         self.meta_info['format'] = "wav"
                         audio = message
+                        transcoder = self.get_stream_transcoder("mp3", int(self.sampling_rate))
                         if message != b'\x00':
-                            audio = resample(convert_audio_to_wav(message, source_format="mp3"), int(self.sampling_rate),
-                                             format="wav")
+                            audio = await transcoder.atranscode(message)
+                            if not audio:
+                                # decoder is still filling up, carry the text over to the next chunk we emit
+                                self.pending_text_synthesized += text_synthesized
+                                continue
+                        else:
+                            tail = await transcoder.aflush()
+                            if tail:
+                                self.meta_info["text_synthesized"] = self.pending_text_synthesized
+                                self.pending_text_synthesized = ""
+                                self.meta_info["mark_id"] = str(uuid.uuid4())
+                                yield create_ws_data_packet(tail, self.meta_info)
+                        text_synthesized = self.pending_text_synthesized + text_synthesized
+                        self.pending_text_synthesized = ""
 
                     if not self.first_chunk_generated:
                         self.meta_info["is_first_chunk"] = True
@@ -258,18 +280,15 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
                     meta_info, text = message.get("meta_info"), message.get("data")
                     audio = None
                     if self.caching:
-                        if self.cache.get(text):
+                        audio, is_cached = await self.cache.get_or_synthesize(self.get_cache_key(text),
+                                                                              lambda: self.__generate_http(text))
+                        meta_info['is_cached'] = is_cached
+                        if is_cached:
                             logger.info(f"Cache hit and hence returning quickly {text}")
-                            audio = self.cache.get(text)
-                            meta_info['is_cached'] = True
                         else:
                             c = len(text)
                             self.synthesized_characters += c
-                            logger.info(
-                                f"Not a cache hit {list(self.cache.data_dict)} and hence increasing characters by {c}")
-                            meta_info['is_cached'] = False
-                            audio = await self.__generate_http(text)
-                            self.cache.set(text, audio)
+                            logger.info(f"Not a cache hit and hence increasing characters by {c}")
                     else:
                         meta_info['is_cached'] = False
                         audio = await self.__generate_http(text)
@@ -287,9 +306,8 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
                         meta_info['format'] = "mulaw"
                     else:
                         meta_info['format'] = "wav"
-                        wav_bytes = convert_audio_to_wav(audio, source_format="mp3")
                         logger.info(f"self.sampling_rate {self.sampling_rate}")
-                        audio = resample(wav_bytes, int(self.sampling_rate), format="wav")
+                        audio = convert_to_wav(audio, source_format="mp3", target_sample_rate=int(self.sampling_rate))
                     yield create_ws_data_packet(audio, meta_info)
 
         except Exception as e:
@@ -312,8 +330,7 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
                 "xi_api_key": self.api_key
             }
             await websocket.send(json.dumps(bos_message))
-            if not self.connection_time:
-                self.connection_time = round((time.perf_counter() - start_time) * 1000)
+            self.set_connection_time("elevenlabs", round((time.perf_counter() - start_time) * 1000))
 
             logger.info(f"Connected to {self.ws_url}")
             return websocket
@@ -339,7 +356,7 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
             self.synthesized_characters += len(text) if text is not None else 0
             end_of_llm_stream = "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]
             logger.info(f"end_of_llm_stream: {end_of_llm_stream}")
-            self.meta_info = copy.deepcopy(meta_info)
+            self.meta_info = MetaInfo(meta_info)
             meta_info["text"] = text
             if not self.context_id:
                 self.context_id = str(uuid.uuid4())
@@ -351,6 +368,7 @@ class ElevenlabsSynthesizer(BaseSynthesizer):
 
     async def cleanup(self):
         self.conversation_ended = True
+        self.close_stream_transcoder()
         logger.info("cleaning elevenlabs synthesizer tasks")
         if self.sender_task:
             try:
@@ -2,9 +2,10 @@ from collections import deque
 import os
 from dotenv import load_dotenv
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import convert_audio_to_wav, create_ws_data_packet, resample
+from bolna.helpers.utils import create_ws_data_packet
+from bolna.helpers.audio_codec import convert_to_wav
 from .base_synthesizer import BaseSynthesizer
-from openai import AsyncOpenAI
+from bolna.llms.client_registry import get_llm_client_registry
 import io
 
 logger = configure_logger(__name__)
@@ -18,7 +19,7 @@ class OPENAISynthesizer(BaseSynthesizer):
         self.voice = voice
         self.sample_rate = sampling_rate
         api_key = kwargs.get("synthesizer_key", os.getenv("OPENAI_API_KEY"))
-        self.async_client = AsyncOpenAI(api_key= api_key)
+        self.async_client = get_llm_client_registry().get_openai_client(api_key=api_key)
         self.model = model
         self.first_chunk_generated = False 
         self.text_queue = deque()
@@ -74,12 +75,20 @@ class OPENAISynthesizer(BaseSynthesizer):
                     return
 
                 if self.stream:
+                    transcoder = self.get_stream_transcoder("mp3", self.sample_rate)
                     async for chunk in self.__generate_stream(text):
+                        audio = await transcoder.atranscode(chunk)
+                        if not audio:
+                            continue
                         if not self.first_chunk_generated:
                             meta_info["is_first_chunk"] = True
                             self.first_chunk_generated = True
-                        yield create_ws_data_packet(resample(convert_audio_to_wav(chunk, 'mp3'), self.sample_rate, format="wav"), meta_info)
-                        
+                        yield create_ws_data_packet(audio, meta_info)
+
+                    audio = await transcoder.aflush()
+                    if audio:
+                        yield create_ws_data_packet(audio, meta_info)
+
                     if "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]:
                         meta_info["end_of_synthesizer_stream"] = True
                         self.first_chunk_generated = False
@@ -95,7 +104,7 @@ class OPENAISynthesizer(BaseSynthesizer):
                     if "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]:
                         meta_info["end_of_synthesizer_stream"] = True
                         self.first_chunk_generated = False 
-                    yield create_ws_data_packet(resample(convert_audio_to_wav(audio, 'mp3'), self.sample_rate, format="wav"), meta_info)
+                    yield create_ws_data_packet(convert_to_wav(audio, 'mp3', target_sample_rate=self.sample_rate), meta_info)
 
         except Exception as e:
                 logger.error(f"Error in openai generate {e}")
@@ -6,8 +6,9 @@ from botocore.exceptions import BotoCoreError, ClientError
 from aiobotocore.session import AioSession
 from contextlib import AsyncExitStack
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import convert_audio_to_wav, create_ws_data_packet
-from bolna.memory.cache.inmemory_scalar_cache import InmemoryScalarCache
+from bolna.helpers.utils import create_ws_data_packet
+from bolna.helpers.audio_codec import convert_to_wav
+from bolna.memory.cache.tts_audio_cache import get_tts_audio_cache
 from .base_synthesizer import BaseSynthesizer
 
 logger = configure_logger(__name__)
@@ -30,7 +31,7 @@ class PollySynthesizer(BaseSynthesizer):
         self.synthesized_characters = 0
         self.caching = caching
         if caching:
-            self.cache = InmemoryScalarCache()
+            self.cache = get_tts_audio_cache()
 
     def get_synthesized_characters(self):
         return self.synthesized_characters
@@ -98,7 +99,7 @@ class PollySynthesizer(BaseSynthesizer):
         try:
             audio = await self.__generate_http(text)
             if self.format == "mp3":
-                audio = convert_audio_to_wav(audio, source_format="mp3")
+                audio = convert_to_wav(audio, source_format="mp3")
             return audio
         except Exception as e:
             logger.error(f"Could not synthesize {e}")
@@ -115,21 +116,19 @@ class PollySynthesizer(BaseSynthesizer):
                 return
 
             if self.caching:
-                logger.info(f"Caching is on")
-                if self.cache.get(text):
+                message, is_cached = await self.cache.get_or_synthesize(self.get_cache_key(text),
+                                                                        lambda: self.__generate_http(text))
+                if is_cached:
                     logger.info(f"Cache hit and hence returning quickly {text}")
-                    message = self.cache.get(text)
                 else:
-                    logger.info(f"Not a cache hit {list(self.cache.data_dict)}")
+                    logger.info(f"Not a cache hit for {text}")
                     self.synthesized_characters += len(text)
-                    message = await self.__generate_http(text)
-                    self.cache.set(text, message)
             else:
                 logger.info(f"No caching present")
                 self.synthesized_characters += len(text)
                 message = await self.__generate_http(text)
             if self.format == "mp3":
-                message = convert_audio_to_wav(message, source_format="mp3")
+                message = convert_to_wav(message, source_format="mp3")
             if not self.first_chunk_generated:
                 meta_info["is_first_chunk"] = True
                 self.first_chunk_generated = True
@@ -5,7 +5,7 @@ import traceback
 import base64
 from .base_synthesizer import BaseSynthesizer
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import create_ws_data_packet
+from bolna.helpers.utils import create_ws_data_packet, get_provider_base_url
 
 logger = configure_logger(__name__)
 
@@ -18,7 +18,7 @@ class SarvamSynthesizer(BaseSynthesizer):
         self.model = model
         self.stream = False
         self.sampling_rate = int(sampling_rate)
-        self.api_url = f"https://api.sarvam.ai/text-to-speech"
+        self.api_url = f"{get_provider_base_url('SARVAM_BASE_URL', 'https://api.sarvam.ai')}/text-to-speech"
 
         self.language = language
         self.loudness = 1.0
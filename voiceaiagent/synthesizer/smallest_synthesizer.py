@@ -4,7 +4,6 @@ import uuid
 import traceback
 from collections import deque
 import asyncio
-import copy
 import websockets
 import json
 import base64
@@ -12,7 +11,8 @@ import time
 
 from .base_synthesizer import BaseSynthesizer
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import create_ws_data_packet
+from bolna.helpers.utils import create_ws_data_packet, get_provider_base_url, to_websocket_url
+from bolna.helpers.meta_info import MetaInfo
 
 logger = configure_logger(__name__)
 
@@ -27,8 +27,9 @@ class SmallestSynthesizer(BaseSynthesizer):
         self.stream = stream
         self.sampling_rate = int(sampling_rate)
         self.language = language
-        self.api_url = f"https://waves-api.smallest.ai/api/v1/{self.model}/get_speech"
-        self.ws_url = "wss://waves-api.smallest.ai/api/v1/lightning-v2/get_speech/stream?timeout=60"
+        self.base_url = get_provider_base_url('SMALLEST_BASE_URL', "https://waves-api.smallest.ai")
+        self.api_url = f"{self.base_url}/api/v1/{self.model}/get_speech"
+        self.ws_url = f"{to_websocket_url(self.base_url)}/api/v1/lightning-v2/get_speech/stream?timeout=60"
         self.first_chunk_generated = False
         self.last_text_sent = False
         self.meta_info = None
@@ -224,8 +225,7 @@ class SmallestSynthesizer(BaseSynthesizer):
                 'Authorization': 'Token {}'.format(self.api_key)
             }
             websocket = await websockets.connect(websocket_url, additional_headers=additional_headers)
-            if not self.connection_time:
-                self.connection_time = round((time.perf_counter() - start_time) * 1000)
+            self.set_connection_time("smallest", round((time.perf_counter() - start_time) * 1000))
 
             logger.info(f"Connected to {self.ws_url}")
             return websocket
@@ -251,7 +251,7 @@ class SmallestSynthesizer(BaseSynthesizer):
             self.synthesized_characters += len(text) if text is not None else 0
             end_of_llm_stream = "end_of_llm_stream" in meta_info and meta_info["end_of_llm_stream"]
             logger.info(f"end_of_llm_stream: {end_of_llm_stream}")
-            self.meta_info = copy.deepcopy(meta_info)
+            self.meta_info = MetaInfo(meta_info)
             meta_info["text"] = text
             self.sender_task = asyncio.create_task(self.sender(text, meta_info.get("sequence_id"), end_of_llm_stream))
             self.text_queue.append(meta_info)
@@ -3,6 +3,7 @@ import time
 import uuid
 from dotenv import load_dotenv
 from bolna.helpers.logger_config import configure_logger
+from bolna.helpers.metrics import get_call_metrics
 
 load_dotenv()
 logger = configure_logger(__name__)
@@ -21,6 +22,12 @@ class BaseTranscriber:
         self.current_request_id = None
         self.connection_time = None
 
+    def set_connection_time(self, provider, connection_time_ms):
+        """Keeps the first connect time of the call and reports it to /metrics as soon as the connection is up."""
+        if self.connection_time is None:
+            self.connection_time = connection_time_ms
+            get_call_metrics().observe_connect_time("transcriber", provider, connection_time_ms)
+
     def update_meta_info(self):
         self.meta_info['request_id'] = self.current_request_id if self.current_request_id else None
         self.meta_info['previous_request_id'] = self.previous_request_id
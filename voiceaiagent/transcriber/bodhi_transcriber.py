@@ -1,5 +1,4 @@
 import asyncio
-from audioop import ulaw2lin
 import traceback
 import uuid
 import numpy as np
@@ -14,6 +13,7 @@ from dotenv import load_dotenv
 from .base_transcriber import BaseTranscriber
 from bolna.helpers.logger_config import configure_logger
 from bolna.helpers.utils import create_ws_data_packet
+from bolna.helpers.g711 import ulaw2lin
 import ssl
 
 torch.set_num_threads(1)
@@ -162,7 +162,7 @@ class BodhiTranscriber(BaseTranscriber):
                 audio_chunk = ws_data_packet.get('data')
                 if self.provider in ["twilio", "exotel"]:
                     logger.info(f"It is a telephony provider")
-                    audio_chunk = ulaw2lin(audio_chunk, 2)
+                    audio_chunk = ulaw2lin(audio_chunk)
 
                 await ws.send(audio_chunk)
         except Exception as e:
@@ -12,7 +12,7 @@ from websockets.asyncio.client import ClientConnection
 
 from .base_transcriber import BaseTranscriber
 from bolna.helpers.logger_config import configure_logger
-from bolna.helpers.utils import create_ws_data_packet
+from bolna.helpers.utils import create_ws_data_packet, get_provider_base_url, to_websocket_url
 
 
 #torch.set_num_threads(1)
@@ -38,6 +38,7 @@ class DeepgramTranscriber(BaseTranscriber):
         self.encoding = encoding
         self.api_key = kwargs.get("transcriber_key", os.getenv('DEEPGRAM_AUTH_TOKEN'))
         self.deepgram_host = os.getenv('DEEPGRAM_HOST', 'api.deepgram.com')
+        self.base_url = get_provider_base_url('DEEPGRAM_BASE_URL', f"https://{self.deepgram_host}")
         self.transcriber_output_queue = output_queue
         self.transcription_task = None
         self.keywords = keywords
@@ -46,7 +47,7 @@ class DeepgramTranscriber(BaseTranscriber):
         logger.info(f"self.stream: {self.stream}")
         self.interruption_signalled = False
         if not self.stream:
-            self.api_url = f"https://{self.deepgram_host}/v1/listen?model={self.model}&filler_words=true&language={self.language}"
+            self.api_url = f"{self.base_url}/v1/listen?model={self.model}&filler_words=true&language={self.language}"
             self.session = aiohttp.ClientSession()
             if self.keywords is not None:
                 keyword_string = "&keywords=" + "&keywords=".join(self.keywords.split(","))
@@ -117,7 +118,7 @@ class DeepgramTranscriber(BaseTranscriber):
             else:
                 dg_params['keywords'] = "&keywords=".join(self.keywords.split(","))
 
-        websocket_api = 'wss://{}/v1/listen?'.format(self.deepgram_host)
+        websocket_api = '{}/v1/listen?'.format(to_websocket_url(self.base_url))
         websocket_url = websocket_api + urlencode(dg_params)
         logger.info(f"Deepgram websocket url: {websocket_url}")
         return websocket_url
@@ -241,7 +242,9 @@ class DeepgramTranscriber(BaseTranscriber):
                     if transcript.strip():
                         data = {
                             "type": "interim_transcript_received",
-                            "content": transcript
+                            "content": transcript,
+                            # everything heard since the last final transcript, what the final one will be built from
+                            "utterance": f"{self.final_transcript} {transcript}".strip()
                         }
                         yield create_ws_data_packet(data, self.meta_info)
 
@@ -331,8 +334,7 @@ class DeepgramTranscriber(BaseTranscriber):
         try:
             start_time = time.perf_counter()
             async with await self.deepgram_connect() as deepgram_ws:
-                if not self.connection_time:
-                    self.connection_time = round((time.perf_counter() - start_time) * 1000)
+                self.set_connection_time("deepgram", round((time.perf_counter() - start_time) * 1000))
 
                 if self.stream:
                     self.sender_task = asyncio.create_task(self.sender_stream(deepgram_ws))
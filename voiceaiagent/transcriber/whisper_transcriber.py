@@ -10,8 +10,9 @@ import time
 from .base_transcriber import BaseTranscriber
 from bolna.helpers.logger_config import configure_logger
 from bolna.helpers.utils import create_ws_data_packet, int2float
-from bolna.helpers.vad import VAD
-from audioop import ulaw2lin, ratecv
+from bolna.helpers.vad import get_vad_engine
+from bolna.helpers.g711 import decode_ulaw
+from bolna.helpers.audio_codec import StreamingResampler, int16_to_float32, to_int16
 import json
 import os
 import time
@@ -24,6 +25,9 @@ torch.set_num_threads(1)
 
 logger = configure_logger(__name__)
 
+# Silero's usual hysteresis, speech starts above the first and ends below the second
+VAD_SPEECH_THRESHOLD = 0.5
+VAD_SILENCE_THRESHOLD = 0.35
 
 
 
@@ -43,6 +47,8 @@ class WhisperTranscriber(BaseTranscriber):
         self.heartbeat_task = None
         self.sender_task = None
         self.transcription_task = None
+        self.vad_task = None
+        self.vad_stream = None
 
         # MODEL CONF
         self.model:str = model
@@ -63,6 +69,7 @@ class WhisperTranscriber(BaseTranscriber):
         self.connection_start_time:float = None
         self.process_interim_results:bool = True
         self.audio_frame_duration:float = 0.0
+        self.telephony_resampler = StreamingResampler(8000, 16000)
         self.audio_cursor = 0.0
         self.transcription_cursor = 0.0
 
@@ -139,9 +146,11 @@ class WhisperTranscriber(BaseTranscriber):
 
                 if self.provider in ["twilio", "exotel", "plivo"]:
                     logger.info(f"It is a telephony provider")
-                    audio_chunk = ulaw2lin(audio_chunk, 2)
-                    audio_chunk = ratecv(audio_chunk, 2, 1, 8000, 16000, None)[0]
+                    samples = int16_to_float32(decode_ulaw(audio_chunk))
+                    audio_chunk = to_int16(self.telephony_resampler.process(samples[None, :])[0]).tobytes()
                     
+                if self.vad_stream is not None:
+                    self.vad_stream.feed(audio_chunk)
                 audio_chunk = self.bytes_to_float_array(audio_chunk).tobytes()
                 # save the audio cursor here
                 self.audio_cursor = self.num_frames * self.audio_frame_duration
@@ -264,6 +273,31 @@ class WhisperTranscriber(BaseTranscriber):
 
 
 
+    async def open_vad_stream(self):
+        """Scores the caller's audio on the process wide VAD engine to signal speech_started before whisper does."""
+        try:
+            engine = await asyncio.to_thread(get_vad_engine, 16000)
+        except Exception as e:
+            logger.error(f"Local VAD is not available, continuing without speech_started events {e}")
+            return
+        self.vad_stream = engine.register_stream()
+        self.vad_task = asyncio.create_task(self.watch_vad())
+
+    async def watch_vad(self):
+        while True:
+            probability = await self.vad_stream.probabilities.get()
+            if not self.caller_speaking and probability >= VAD_SPEECH_THRESHOLD:
+                self.caller_speaking = True
+                await self.push_to_transcriber_queue(create_ws_data_packet("speech_started", self.meta_info))
+            elif self.caller_speaking and probability < VAD_SILENCE_THRESHOLD:
+                self.caller_speaking = False
+
+    def close_vad_stream(self):
+        if self.vad_task is not None:
+            self.vad_task.cancel()
+        if self.vad_stream is not None:
+            self.vad_stream.close()
+
     def whisper_connect(self):
         websocket_url = self.get_whisper_ws_url()
         whisper_ws:websockets.connect = websockets.connect(websocket_url)
@@ -328,6 +362,7 @@ class WhisperTranscriber(BaseTranscriber):
     async def transcribe(self):
         logger.info(f"STARTED TRANSCRIBING")
         try:
+            await self.open_vad_stream()
             async with self.whisper_connect() as whisper_ws:
                 self.current_request_id = self.generate_request_id()
                 await whisper_ws.send(json.dumps(
@@ -358,6 +393,8 @@ class WhisperTranscriber(BaseTranscriber):
             await self.push_to_transcriber_queue(create_ws_data_packet("transcriber_connection_closed", self.meta_info))
         except Exception as e:
             logger.error(f"Error in transcribe: {e}")
+        finally:
+            self.close_vad_stream()
 
 
 